@@ -1,10 +1,52 @@
-from fastapi import FastAPI, HTTPException, Query
+import os
+import base64
+import mimetypes
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from fastapi import FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List
-from db_engine.sqlite_engine import get_connection
-from crawler.utility import get_store_ads
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from typing import Optional
+from db_engine.sqlite_engine import (
+    close_pool,
+    get_connection,
+    get_image_blob,
+    get_pool,
+    get_pool_stats,
+)
+from crawler.blob_store import get_blob_path, get_variants
+from crawler.crawler_configs import IMAGE_VARIANTS
+from crawler.image_utils import SNIFF_BYTES, sniff_image_type
+from crawler.storage import (
+    WEEKLY_AD_CACHE,
+    get_store_ads_json,
+    get_store_week_folder,
+)
+from json_stream import iter_json_array
+
+# Digest-addressed images (/blob/, /dbimage/) never change, so clients and
+# proxies may keep them for a year without revalidating.
+IMAGE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Images named after the product are overwritten when a week is recrawled, so
+# clients must revalidate them with the ETag before reuse.
+WEEK_IMAGE_CACHE_CONTROL = "no-cache"
+
+# Upper bound on /weeklyad/ page size so one request's memory stays bounded.
+MAX_PAGE_SIZE = 500
+NEXT_CURSOR_HEADER = "X-Next-After-Id"
+# Rows pulled from the cursor per fetchmany() while streaming.
+STREAM_BATCH_ROWS = 100
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Create the connection pool (and run schema init) once per worker.
+    get_pool()
+    yield
+    close_pool()
 
-app = FastAPI()
+
+app = FastAPI(lifespan=lifespan)
 
 # CORS configuration - adjust `allow_origins` for production
 app.add_middleware(
@@ -13,19 +55,119 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 
 @app.get("/weeklyad/")
-def get_weekly_ad(storename: str = Query(...), week: str = Query(...)):
+def get_weekly_ad(
+    response: Response,
+    storename: str = Query(...),
+    week: str = Query(...),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after_id: int = Query(0, ge=0),
+    include_images: bool = Query(True),
+    stream: bool = Query(False),
+):
     """
     Retrieve weekly ad for a store for a particular week.
     week should be in YYYY-MM-DD format (weekly_ad_starting_date).
+
+    Without paging parameters the whole week is returned with base64 images.
+    Passing `limit` and/or `after_id` returns one page ordered by id; when more
+    rows follow, the X-Next-After-Id header holds the cursor for the next page.
+    With include_images=false, items carry `image_hash` (fetch it from
+    /dbimage/{image_hash}) instead of inline image bytes.
+    With stream=true the whole week is streamed as a JSON array straight from
+    the database cursor (limit/after_id do not apply).
+    """
+    if stream:
+        items = _open_weekly_ad_stream(storename, week, include_images)
+        return StreamingResponse(iter_json_array(items), media_type="application/json")
+
+    if limit is None and after_id == 0 and include_images:
+        return _get_full_weekly_ad(storename, week)
+
+    page_size = limit or MAX_PAGE_SIZE
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        # One extra row tells us whether another page exists.
+        cursor.execute(
+            _weekly_ad_query(include_images), (storename, week, after_id, page_size + 1)
+        )
+        rows = cursor.fetchall()
+
+    if not rows and after_id == 0:
+        raise HTTPException(
+            status_code=404, detail="No weekly ad found for this store and week."
+        )
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        response.headers[NEXT_CURSOR_HEADER] = str(rows[-1][0])
+
+    return [_weekly_ad_item(row, include_images) for row in rows]
+
+
+def _weekly_ad_query(include_images: bool) -> str:
+    """Rows of one store/week after a given id; LIMIT -1 means no limit."""
+    if include_images:
+        return """SELECT r.id, r.product, r.price, i.data FROM crawler_results r
+                  LEFT JOIN images i ON i.hash = r.image_hash
+                  WHERE r.storename = ? AND r.weekly_ad_starting_date = ? AND r.id > ?
+                  ORDER BY r.id LIMIT ?"""
+    return """SELECT id, product, price, image_hash FROM crawler_results
+              WHERE storename = ? AND weekly_ad_starting_date = ? AND id > ?
+              ORDER BY id LIMIT ?"""
+
+
+def _weekly_ad_item(row, include_images: bool) -> dict:
+    row_id, product, price, image = row
+    item = {"id": row_id, "product": product, "price": price}
+    if include_images:
+        item["image_base64"] = base64.b64encode(image).decode() if image else None
+    else:
+        item["image_hash"] = image
+    return item
+
+
+def _open_weekly_ad_stream(storename: str, week: str, include_images: bool):
     """
+    Start the week query and return an iterator of items fed by fetchmany.
+    The first batch is read eagerly so a missing week is a 404 rather than an
+    empty stream; the pooled connection is held until the iterator finishes.
+    """
+    conn = get_connection()
+    try:
+        cursor = conn.execute(_weekly_ad_query(include_images), (storename, week, 0, -1))
+        batch = cursor.fetchmany(STREAM_BATCH_ROWS)
+    except Exception:
+        conn.close()
+        raise
+    if not batch:
+        conn.close()
+        raise HTTPException(
+            status_code=404, detail="No weekly ad found for this store and week."
+        )
+
+    def items(batch):
+        try:
+            while batch:
+                for row in batch:
+                    yield _weekly_ad_item(row, include_images)
+                batch = cursor.fetchmany(STREAM_BATCH_ROWS)
+        finally:
+            conn.close()
+
+    return items(batch)
+
+
+def _get_full_weekly_ad(storename: str, week: str):
     with get_connection() as conn:
         cursor = conn.cursor()
         cursor.execute(
-            """SELECT product, price, image FROM crawler_results WHERE storename = ? AND weekly_ad_starting_date = ?""",
+            """SELECT r.product, r.price, i.data FROM crawler_results r
+               LEFT JOIN images i ON i.hash = r.image_hash
+               WHERE r.storename = ? AND r.weekly_ad_starting_date = ?""",
             (storename, week),
         )
         rows = cursor.fetchall()
@@ -34,8 +176,6 @@ def get_weekly_ad(storename: str = Query(...), week: str = Query(...)):
                 status_code=404, detail="No weekly ad found for this store and week."
             )
         # Return image as base64 string for API response
-        import base64
-
         results = []
         for product, price, image in rows:
             img_b64 = base64.b64encode(image).decode() if image else None
@@ -44,46 +184,220 @@ def get_weekly_ad(storename: str = Query(...), week: str = Query(...)):
             )
         return results
 
+
+@app.get("/dbimage/{image_hash}")
+def get_db_image(image_hash: str, request: Request):
+    """
+    Serve an image stored in SQLite by its content hash. The bytes behind a
+    hash never change, so the response is cacheable forever.
+    """
+    etag = f'"{image_hash}"'
+    if _is_not_modified(request, etag, mtime=None):
+        return Response(
+            status_code=304,
+            headers={"ETag": etag, "Cache-Control": IMAGE_CACHE_CONTROL},
+        )
+
+    data = get_image_blob(image_hash)
+    if data is None:
+        raise HTTPException(status_code=404, detail="Image not found.")
+    return Response(
+        content=data,
+        media_type=sniff_image_type(data) or "application/octet-stream",
+        headers={"ETag": etag, "Cache-Control": IMAGE_CACHE_CONTROL},
+    )
+
+
 @app.get("/weeklyadfromfile/")
-def get_weekly_ad_from_file(storename: str = Query(...), week: str = Query(...)):
+def get_weekly_ad_from_file(
+    storename: str = Query(...),
+    week: str = Query(...),
+):
     """
     Retrieve weekly ad for a store for a particular week from a JSON file.
     week should be in YYYY-Www format (ISO week date).
     """
     try:
-        data = get_store_ads(storename, week)
+        payload = get_store_ads_json(storename, week)
     except FileNotFoundError:
         raise HTTPException(
             status_code=404,
             detail="No weekly ad file found for this store and week.",
         )
 
-    return data
+    # The cache already holds the encoded JSON, so skip FastAPI's re-serialization.
+    return Response(content=payload, media_type="application/json")
+
 
+@app.get("/stats/")
+def get_stats():
+    """
+    Report in-process cache and connection pool counters for monitoring.
+    """
+    return {"weekly_ad_cache": WEEKLY_AD_CACHE.stats(), "db_pool": get_pool_stats()}
 
 
 @app.get("/getimagebytes/")
 def get_image_bytes(
+    request: Request,
+    storename: Optional[str] = Query(None),
+    week: Optional[str] = Query(None),
+    image_filename: Optional[str] = Query(None),
+    image_digest: Optional[str] = Query(None),
+    size: Optional[str] = Query(None),
+):
+    """
+    Retrieve image bytes for a given image filename from the store's weekly ad folder,
+    or for an image_digest from the shared blob store.
+    week should be in YYYY-MM-DD format (weekly_ad_starting_date).
+
+    Digest lookups never change, so they carry immutable caching headers;
+    size picks a resized variant (see /blob/{digest}).
+
+    Deprecated: returns base64 inside JSON. Use /image/ or /blob/{digest}
+    which stream raw bytes with caching headers.
+    """
+    if image_digest is not None:
+        image_digest, cache_control = _resolve_variant(image_digest, size)
+        etag = f'"{image_digest}"'
+        headers = {"ETag": etag, "Cache-Control": cache_control}
+        if _is_not_modified(request, etag, mtime=None):
+            return Response(status_code=304, headers=headers)
+        file_path = get_blob_path(image_digest)
+        if file_path is None:
+            raise HTTPException(status_code=404, detail="Image not found.")
+    elif storename and week and image_filename:
+        headers = None
+        if not all(_is_plain_name(name) for name in (storename, week, image_filename)):
+            raise HTTPException(status_code=400, detail="Invalid image path.")
+        folder_path = get_store_week_folder(storename, week, create_if_not_exists=False)
+        file_path = os.path.join(folder_path, image_filename)
+        if not os.path.isfile(file_path):
+            raise HTTPException(status_code=404, detail="Image file not found.")
+    else:
+        raise HTTPException(
+            status_code=400,
+            detail="Pass image_digest, or storename, week and image_filename.",
+        )
+
+    with open(file_path, "rb") as f:
+        image_bytes = f.read()
+
+    image_b64 = base64.b64encode(image_bytes).decode()
+    return JSONResponse({"image_bytes": image_b64}, headers=headers)
+
+
+def _resolve_variant(digest: str, size: Optional[str]):
+    """
+    Pick the blob to serve: the original, or its `size` variant once one has
+    been generated.
+
+    Returns:
+        tuple: (digest to serve, Cache-Control value). A fallback to the
+        original must be revalidated, since the variant may appear later.
+    """
+    if size is None:
+        return digest, IMAGE_CACHE_CONTROL
+    if size not in IMAGE_VARIANTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown size; expected one of: {', '.join(IMAGE_VARIANTS)}.",
+        )
+    variant = get_variants(digest).get(size)
+    if variant is None:
+        return digest, "no-cache"
+    return variant, IMAGE_CACHE_CONTROL
+
+
+@app.get("/blob/{digest}")
+def get_blob(digest: str, request: Request, size: Optional[str] = Query(None)):
+    """
+    Stream an image from the content-addressed blob store. A digest always
+    names the same bytes, so the response is cacheable forever.
+    size=thumb|medium serves the resized WebP variant instead, falling back
+    to the original while no variant exists.
+    """
+    digest, cache_control = _resolve_variant(digest, size)
+    etag = f'"{digest}"'
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if _is_not_modified(request, etag, mtime=None):
+        return Response(status_code=304, headers=headers)
+
+    file_path = get_blob_path(digest)
+    if file_path is None:
+        raise HTTPException(status_code=404, detail="Image not found.")
+    with open(file_path, "rb") as f:
+        head = f.read(SNIFF_BYTES)
+    media_type = sniff_image_type(head) or "application/octet-stream"
+    return FileResponse(file_path, media_type=media_type, headers=headers)
+
+
+def _is_plain_name(name: str) -> bool:
+    """True for a single path component: no separators, not absolute, not "." or ".."."""
+    return (
+        name not in ("", ".", "..")
+        and os.path.basename(name) == name
+        and not os.path.isabs(name)
+        and (os.altsep is None or os.altsep not in name)
+    )
+
+
+def _image_etag(stat_result) -> str:
+    """Validator built from the file's mtime and size; changes whenever the file is rewritten."""
+    return f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+
+
+def _is_not_modified(request: Request, etag: str, mtime: Optional[float]) -> bool:
+    """Evaluate If-None-Match / If-Modified-Since against the current file state."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and mtime is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return int(mtime) <= since
+    return False
+
+
+@app.get("/image/")
+def get_image(
+    request: Request,
     storename: str = Query(...),
     week: str = Query(...),
     image_filename: str = Query(...),
 ):
     """
-    Retrieve image bytes for a given image filename from the store's weekly ad folder.
-    week should be in YYYY-MM-DD format (weekly_ad_starting_date).
+    Stream an ad image as raw bytes with the matching Content-Type.
+    Supports ETag/Last-Modified revalidation (304) and byte ranges.
     """
-    import os
-    import base64
-    from crawler.utility import get_store_week_folder
+    # Only plain names are joined; anything else could escape the week folder.
+    if not all(_is_plain_name(name) for name in (storename, week, image_filename)):
+        raise HTTPException(status_code=400, detail="Invalid image filename.")
 
-    folder_path = get_store_week_folder(storename, week)
+    folder_path = get_store_week_folder(storename, week, create_if_not_exists=False)
     file_path = os.path.join(folder_path, image_filename)
 
-    if not os.path.exists(file_path):
+    try:
+        stat_result = os.stat(file_path)
+    except OSError:
         raise HTTPException(status_code=404, detail="Image file not found.")
 
-    with open(file_path, "rb") as f:
-        image_bytes = f.read()
+    etag = _image_etag(stat_result)
+    if _is_not_modified(request, etag, stat_result.st_mtime):
+        return Response(
+            status_code=304,
+            headers={"ETag": etag, "Cache-Control": WEEK_IMAGE_CACHE_CONTROL},
+        )
 
-    image_b64 = base64.b64encode(image_bytes).decode()
-    return {"image_bytes": image_b64}
\ No newline at end of file
+    media_type = mimetypes.guess_type(image_filename)[0] or "application/octet-stream"
+    return FileResponse(
+        file_path,
+        media_type=media_type,
+        stat_result=stat_result,
+        headers={"ETag": etag, "Cache-Control": WEEK_IMAGE_CACHE_CONTROL},
+    )
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""Measure API worker cold-start cost: import time and RSS of `import api`.
+
+Each sample runs in a fresh interpreter so nothing is already imported.
+The "with selenium" row first runs the selenium imports crawler.utility used
+to do at module level, which is what every worker paid before the storage
+functions moved out into crawler.storage.
+
+Usage:
+  python benchmarks/bench_api_import.py --runs 10
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+{preload}
+import api
+elapsed = time.perf_counter() - t0
+try:
+    import resource
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and KiB elsewhere
+    rss_kib = rss // 1024 if sys.platform == "darwin" else rss
+except ImportError:
+    rss_kib = None
+print(json.dumps({{"seconds": elapsed, "rss_kib": rss_kib,
+                   "selenium_loaded": "selenium" in sys.modules}}))
+"""
+
+SELENIUM_PRELOAD = """
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.chrome.options import Options
+from selenium import webdriver
+"""
+
+
+def sample(preload: str) -> dict:
+    out = subprocess.check_output(
+        [sys.executable, "-c", PROBE.format(preload=preload)],
+        cwd=BACKEND_DIR,
+        text=True,
+    )
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def report(label: str, preload: str, runs: int):
+    samples = [sample(preload) for _ in range(runs)]
+    times = [s["seconds"] * 1000 for s in samples]
+    rss = [s["rss_kib"] for s in samples if s["rss_kib"] is not None]
+    rss_text = f"{statistics.median(rss) / 1024:8.1f} MiB" if rss else "     n/a"
+    print(
+        f"{label:<28} median {statistics.median(times):8.1f} ms  "
+        f"min {min(times):8.1f} ms  rss {rss_text}  "
+        f"selenium loaded: {samples[0]['selenium_loaded']}"
+    )
+
+
+def main():
+    ap = argparse.ArgumentParser(description="API import-time benchmark")
+    ap.add_argument("--runs", type=int, default=5)
+    args = ap.parse_args()
+
+    report("import api", "", args.runs)
+    try:
+        report("import api (with selenium)", SELENIUM_PRELOAD, args.runs)
+    except subprocess.CalledProcessError:
+        print("selenium is not installed; skipping the comparison row")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""Compare Kroger card extraction: per-card locators (one browser round-trip
+per count/get_attribute/inner_text) vs kroger_cards.extract_card_records
+(a single page.evaluate).
+
+The saved card fixture is repeated to the requested card count and loaded
+with page.set_content, so no network access is needed. Requires Playwright
+with Chromium installed (python -m playwright install chromium).
+
+Usage:
+  python benchmarks/bench_card_extraction.py --cards 300
+"""
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from playwright.sync_api import sync_playwright
+
+from crawler.kroger_cards import CARD_SELECTOR, extract_card_records, pick_img_src
+
+FIXTURE = Path(__file__).resolve().parent / "fixtures" / "kroger_cards.html"
+
+
+def _first_text(card, selector) -> str:
+    texts = card.locator(selector)
+    for i in range(texts.count()):
+        text = texts.nth(i).inner_text().strip()
+        if text:
+            return text
+    return ""
+
+
+def _price(card, selector) -> str:
+    heading = card.locator(selector)
+    if heading.count() == 0:
+        return ""
+    return (heading.first.get_attribute("aria-label") or heading.first.inner_text() or "").strip()
+
+
+def iter_cards_by_locator(page):
+    """Yield (name, image_url, price) per card, one browser round-trip per field.
+
+    The extractor the crawler used before kroger_cards: same Omni/Feature
+    rules, walked through Playwright locators.
+    """
+    cards = page.locator(CARD_SELECTOR)
+    for i in range(cards.count()):
+        card = cards.nth(i)
+        class_attr = card.get_attribute("class") or ""
+        if "SWA-Omni" in class_attr:
+            description, promo = ".SWA-OmniDescriptionBlock .kds-Text--m", ".SWA-OmniPricePrefix"
+            heading = ".SWA-OmniPriceHeading"
+        elif "SWA-Feature" in class_attr:
+            description, promo, heading = ".SWA-FeatureDealDescription", None, ".SWA-FeaturePriceHeading"
+        else:
+            yield None, None, None
+            continue
+        img = card.locator("img").first
+        has_img = card.locator("img").count() > 0
+        image_url = pick_img_src(img.get_attribute) if has_img else ""
+        name = _first_text(card, description) or ((img.get_attribute("alt") or "").strip() if has_img else "")
+        price = _price(card, heading)
+        if promo:
+            prefix = card.locator(promo)
+            promo_text = prefix.first.inner_text().strip() if prefix.count() > 0 else ""
+            price = f"{promo_text} {price}".strip()
+        yield name, image_url, price
+
+
+def build_page(cards: int) -> str:
+    html = FIXTURE.read_text(encoding="utf-8")
+    grid = re.search(r'(<div class="SWA-Grid" id="cards">)(.*?)(\n</div>\n</body>)', html, re.S)
+    block = grid.group(2)
+    per_block = block.count('class="kds-Card')
+    repeats = max(1, -(-cards // per_block))
+    return html[: grid.start(2)] + block * repeats + html[grid.end(2):]
+
+
+def timed(label: str, extract):
+    start = time.perf_counter()
+    rows = extract()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {len(rows):5d} deals  {elapsed * 1000:9.1f} ms")
+    return rows, elapsed
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Kroger card extraction benchmark")
+    ap.add_argument("--cards", type=int, default=300)
+    args = ap.parse_args()
+
+    with sync_playwright() as p:
+        browser = p.chromium.launch()
+        page = browser.new_page()
+        page.set_content(build_page(args.cards))
+
+        slow_rows, slow = timed(
+            "locators (per card)", lambda: [c for c in iter_cards_by_locator(page) if all(c)]
+        )
+        fast_rows, fast = timed(
+            "page.evaluate (bulk)",
+            lambda: [
+                c for c in ((r["name"], r["image_url"], r["price"]) for r in extract_card_records(page))
+                if all(c)
+            ],
+        )
+        browser.close()
+
+    if slow_rows != fast_rows:
+        sys.exit("bulk extraction disagrees with the locator-based extractor")
+    print(f"speedup: {slow / fast:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""Compare SQLite ingest throughput: per-row insert_crawler_result vs
+insert_crawler_results_many (chunked executemany transactions).
+
+Runs against a throwaway database in a temp directory.
+
+Usage:
+  python benchmarks/bench_ingest.py --rows 2000 --image-kib 20
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from db_engine import sqlite_engine
+
+
+def make_rows(count: int, image_kib: int):
+    image = os.urandom(image_kib * 1024)
+    return [
+        ("kroger", "2025-01-06", f"Product {i}", f"https://example.com/{i}.png", image, "$1.00")
+        for i in range(count)
+    ]
+
+
+def run(label: str, rows, ingest):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        sqlite_engine.DB_PATH = Path(tmpdir) / "bench.db"
+        sqlite_engine.get_pool()
+        start = time.perf_counter()
+        ingest(rows)
+        elapsed = time.perf_counter() - start
+        sqlite_engine.close_pool()
+    print(f"{label:<38} {len(rows):6d} rows  {elapsed:8.3f} s  {len(rows) / elapsed:10.0f} rows/s")
+    return elapsed
+
+
+def per_row(rows):
+    for row in rows:
+        sqlite_engine.insert_crawler_result(*row)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="SQLite crawler ingest benchmark")
+    ap.add_argument("--rows", type=int, default=2000)
+    ap.add_argument("--image-kib", type=int, default=20)
+    ap.add_argument("--chunk-size", type=int, default=500)
+    args = ap.parse_args()
+
+    rows = make_rows(args.rows, args.image_kib)
+    original_db_path = sqlite_engine.DB_PATH
+    try:
+        slow = run("insert_crawler_result (per row)", rows, per_row)
+        fast = run(
+            f"insert_crawler_results_many ({args.chunk_size})",
+            rows,
+            lambda r: sqlite_engine.insert_crawler_results_many(r, chunk_size=args.chunk_size),
+        )
+        run(
+            "insert_crawler_results_many (upsert)",
+            rows,
+            lambda r: sqlite_engine.insert_crawler_results_many(
+                r, chunk_size=args.chunk_size, upsert=True
+            ),
+        )
+    finally:
+        sqlite_engine.DB_PATH = original_db_path
+    print(f"speedup: {slow / fast:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""Compare peak memory and time-to-first-byte of /weeklyad/ response building:
+the buffered path (full list -> FastAPI serialization) vs stream=true
+(cursor fetchmany -> incremental JSON chunks).
+
+Both paths run in-process against a throwaway database, with tracemalloc
+tracking peak Python allocations.
+
+Usage:
+  python benchmarks/bench_streaming.py --rows 2000 --image-kib 30
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from fastapi.encoders import jsonable_encoder
+
+import api
+from db_engine import sqlite_engine
+from json_stream import dumps, iter_json_array
+
+STORE = "kroger"
+WEEK = "2025-01-06"
+
+
+def populate(rows: int, image_kib: int):
+    sqlite_engine.insert_crawler_results_many(
+        (STORE, WEEK, f"Product {i}", None, os.urandom(image_kib * 1024), "$1.00")
+        for i in range(rows)
+    )
+
+
+def buffered():
+    # What FastAPI does for a returned list: jsonable_encoder then encode.
+    rows = api._get_full_weekly_ad(STORE, WEEK)
+    yield dumps(jsonable_encoder(rows))
+
+
+def streamed(include_images: bool):
+    def run():
+        items = api._open_weekly_ad_stream(STORE, WEEK, include_images)
+        yield from iter_json_array(items)
+    return run
+
+
+def measure(label: str, body_factory):
+    tracemalloc.start()
+    start = time.perf_counter()
+    first_byte = None
+    total = 0
+    for chunk in body_factory():
+        if first_byte is None:
+            first_byte = time.perf_counter() - start
+        total += len(chunk)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        f"{label:<26} ttfb {first_byte * 1000:9.1f} ms  total {elapsed * 1000:9.1f} ms  "
+        f"peak {peak / 2**20:8.1f} MiB  body {total / 2**20:8.1f} MiB"
+    )
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Streaming vs buffered /weeklyad/ benchmark")
+    ap.add_argument("--rows", type=int, default=2000)
+    ap.add_argument("--image-kib", type=int, default=30)
+    args = ap.parse_args()
+
+    original_db_path = sqlite_engine.DB_PATH
+    with tempfile.TemporaryDirectory() as tmpdir:
+        sqlite_engine.DB_PATH = Path(tmpdir) / "bench.db"
+        try:
+            populate(args.rows, args.image_kib)
+            measure("buffered (images)", buffered)
+            measure("stream=true (images)", streamed(True))
+            measure("stream=true (no images)", streamed(False))
+        finally:
+            sqlite_engine.close_pool()
+            sqlite_engine.DB_PATH = original_db_path
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,333 @@
+"""Content-addressed image store shared by every store and week.
+
+Each image is saved once under DATA_BASE_DIR/blobs/<aa>/<bb>/<sha256>, where
+aa and bb are the first two byte pairs of its SHA-256 digest. Blobs are
+written atomically, made read-only and never modified afterwards, so the
+weekly ad JSON can reference an image by its digest (item["image_digest"])
+and HTTP clients can cache it forever.
+
+Resized variants of an image (see crawler.image_variants) are blobs too; a
+small "<digest>.variants.json" sidecar next to the original maps variant
+names to their digests, and "<digest>.meta.json" holds its dimensions,
+format and blurhash.
+
+Blobs no longer referenced by any weekly ad or by the HTTP cache index
+(crawler.http_cache) are removed by collect_garbage(), which is also
+available from the command line:
+    python -m crawler.blob_store gc [--dry-run] [--grace-hours 1]
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import stat
+import time
+import uuid
+from typing import Iterable, Iterator, Optional, Tuple
+
+from crawler.crawler_configs import FILE_SYSTEM_CONFIG
+from crawler.http_cache import HttpCacheIndex
+from crawler.storage import _write_atomic, compact_all
+
+BLOBS_DIRNAME = "blobs"
+VARIANTS_SUFFIX = ".variants.json"
+METADATA_SUFFIX = ".meta.json"
+WEEKLY_AD_FILENAME = "weekly_ad.json"
+
+# Blobs younger than this are never collected: a crawl may have stored them
+# without having saved the items that reference them yet. Reusing a blob (a
+# dedupe hit or an HTTP 304) refreshes its mtime, so the window counts from
+# the last crawl that used it.
+DEFAULT_GC_GRACE_SECONDS = 3600
+
+_DIGEST_RE = re.compile(r"^[0-9a-f]{64}$")
+# Published blobs are never written again.
+_READ_ONLY = stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH
+
+
+def is_digest(value) -> bool:
+    return isinstance(value, str) and _DIGEST_RE.match(value) is not None
+
+
+def _base_dir() -> str:
+    return FILE_SYSTEM_CONFIG.get(
+        "DATA_BASE_DIR", os.path.join(os.path.dirname(__file__), "grocery_data")
+    )
+
+
+def get_blobs_folder() -> str:
+    return os.path.join(_base_dir(), BLOBS_DIRNAME)
+
+
+def blob_path(digest: str) -> str:
+    """Sharded location of a blob; raises ValueError for anything but a SHA-256 hex digest."""
+    if not is_digest(digest):
+        raise ValueError(f"Not a SHA-256 hex digest: {digest!r}")
+    return os.path.join(get_blobs_folder(), digest[:2], digest[2:4], digest)
+
+
+def get_blob_path(digest: str) -> Optional[str]:
+    """Path of a stored blob, or None when the digest is invalid or unknown."""
+    try:
+        path = blob_path(digest)
+    except ValueError:
+        return None
+    return path if os.path.isfile(path) else None
+
+
+def _touch(path: str) -> bool:
+    """Refresh a blob's mtime; False when it is gone."""
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def touch_blob(digest: str) -> bool:
+    """Mark a stored blob as just used (see DEFAULT_GC_GRACE_SECONDS); False when it is unknown."""
+    path = get_blob_path(digest)
+    return path is not None and _touch(path)
+
+
+def _place(tmp_path: str, path: str):
+    """
+    Rename a finished temp file to blob `path` and make it read-only.
+
+    Another writer may have published the same content meanwhile. POSIX
+    replaces it (the bytes are identical); Windows refuses to replace a
+    read-only file, and then the existing blob wins and the temp file goes.
+    """
+    try:
+        os.replace(tmp_path, path)
+    except PermissionError:
+        if not os.path.exists(path):
+            raise
+        os.remove(tmp_path)
+        return
+    os.chmod(path, _READ_ONLY)
+
+
+def _publish(digest: str, write) -> str:
+    """Create blob `digest` by calling write(file) on a temp file, unless it already exists."""
+    path = blob_path(digest)
+    if os.path.exists(path) and _touch(path):
+        return path
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        _place(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return path
+
+
+def put_bytes(data: bytes) -> Tuple[str, str]:
+    """
+    Store data unless an identical blob already exists.
+
+    Returns:
+        tuple: (digest, blob path)
+    """
+    digest = hashlib.sha256(data).hexdigest()
+    return digest, _publish(digest, lambda f: f.write(data))
+
+
+def put_stream(chunks: Iterable[bytes]) -> Tuple[str, str]:
+    """
+    Store a stream of byte chunks without holding it in memory.
+
+    The chunks are hashed while they are written to a temp file, which is
+    renamed into place only after the stream is exhausted. If the iterable
+    raises (a dropped connection, a failed validation) the temp file is
+    removed and nothing is published.
+
+    Returns:
+        tuple: (digest, blob path)
+    """
+    root = get_blobs_folder()
+    os.makedirs(root, exist_ok=True)
+    tmp_path = os.path.join(root, f".{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp")
+    digest = hashlib.sha256()
+    try:
+        with open(tmp_path, "wb") as f:
+            for chunk in chunks:
+                digest.update(chunk)
+                f.write(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+        digest = digest.hexdigest()
+        path = blob_path(digest)
+        if os.path.exists(path) and _touch(path):
+            os.remove(tmp_path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            _place(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return digest, path
+
+
+def put_file(src_path: str, chunk_size: int = 1024 * 1024) -> Tuple[str, str]:
+    """Store a copy of an existing file; returns (digest, blob path)."""
+    with open(src_path, "rb") as f:
+        return put_stream(iter(lambda: f.read(chunk_size), b""))
+
+
+def _read_sidecar(digest: str, suffix: str) -> dict:
+    if not is_digest(digest):
+        return {}
+    try:
+        with open(blob_path(digest) + suffix, "rb") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def _write_sidecar(digest: str, suffix: str, data: dict):
+    _write_atomic(blob_path(digest) + suffix, json.dumps(data, sort_keys=True).encode("utf-8"))
+
+
+def get_variants(digest: str) -> dict:
+    """Variant name -> digest recorded for an original blob ({} if none)."""
+    variants = _read_sidecar(digest, VARIANTS_SUFFIX)
+    return {name: d for name, d in variants.items() if is_digest(d)}
+
+
+def set_variants(digest: str, variants: dict):
+    """Record the variants generated for an original blob."""
+    _write_sidecar(digest, VARIANTS_SUFFIX, variants)
+
+
+def get_metadata(digest: str) -> dict:
+    """Image metadata (size, format, blurhash, ...) recorded for a blob ({} if none)."""
+    return _read_sidecar(digest, METADATA_SUFFIX)
+
+
+def set_metadata(digest: str, metadata: dict):
+    _write_sidecar(digest, METADATA_SUFFIX, metadata)
+
+
+def iter_blobs() -> Iterator[Tuple[str, str]]:
+    """Yield (digest, path) for every stored blob."""
+    root = get_blobs_folder()
+    if not os.path.isdir(root):
+        return
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            if is_digest(filename):
+                yield filename, os.path.join(dirpath, filename)
+
+
+def referenced_digests() -> set:
+    """Digests referenced by any compacted weekly ad under DATA_BASE_DIR, or by the HTTP cache index."""
+    base_dir = _base_dir()
+    digests = set()
+    if not os.path.isdir(base_dir):
+        return digests
+    # A 304 hands the cached blob back to the next crawl, so it must survive.
+    digests.update(d for d in HttpCacheIndex().digests() if is_digest(d))
+    for storename in os.listdir(base_dir):
+        store_dir = os.path.join(base_dir, storename)
+        if storename == BLOBS_DIRNAME or not os.path.isdir(store_dir):
+            continue
+        for week in os.listdir(store_dir):
+            json_path = os.path.join(store_dir, week, WEEKLY_AD_FILENAME)
+            try:
+                with open(json_path, "rb") as f:
+                    items = json.load(f)
+            except (OSError, ValueError):
+                continue
+            for item in items if isinstance(items, list) else []:
+                if isinstance(item, dict) and is_digest(item.get("image_digest")):
+                    digests.add(item["image_digest"])
+    # Variants live as long as their original does.
+    for digest in list(digests):
+        digests.update(get_variants(digest).values())
+    return digests
+
+
+def collect_garbage(grace_seconds: float = DEFAULT_GC_GRACE_SECONDS, dry_run: bool = False) -> dict:
+    """
+    Delete blobs that no weekly ad or HTTP cache entry references and that
+    were not stored or reused within grace_seconds.
+    Pending segments are compacted first so their references are counted.
+
+    Returns:
+        dict: kept / removed blob counts and bytes freed.
+    """
+    compact_all()
+    referenced = referenced_digests()
+    cutoff = time.time() - grace_seconds
+    kept = removed = freed = 0
+    for digest, path in iter_blobs():
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        if digest in referenced or st.st_mtime > cutoff:
+            kept += 1
+            continue
+        if not dry_run:
+            try:
+                # Windows cannot delete a read-only file
+                os.chmod(path, stat.S_IREAD | stat.S_IWRITE)
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            except PermissionError as e:
+                print(f"Cannot remove blob {path}: {e}")
+                kept += 1
+                continue
+            for suffix in (VARIANTS_SUFFIX, METADATA_SUFFIX):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+        removed += 1
+        freed += st.st_size
+    _remove_stale_temp_files(cutoff, dry_run)
+    return {"kept": kept, "removed": removed, "bytes_freed": freed}
+
+
+def _remove_stale_temp_files(cutoff: float, dry_run: bool):
+    """Drop temp files left behind by writers that crashed before publishing."""
+    if dry_run:
+        return
+    for dirpath, _, filenames in os.walk(get_blobs_folder()):
+        for filename in filenames:
+            if not filename.endswith(".tmp"):
+                continue
+            path = os.path.join(dirpath, filename)
+            try:
+                if os.stat(path).st_mtime <= cutoff:
+                    os.remove(path)
+            except OSError:
+                continue
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Content-addressed image store maintenance")
+    sub = ap.add_subparsers(dest="command", required=True)
+    gc = sub.add_parser("gc", help="Delete blobs no weekly ad references")
+    gc.add_argument("--dry-run", action="store_true", help="Only report what would be removed")
+    gc.add_argument(
+        "--grace-hours", type=float, default=DEFAULT_GC_GRACE_SECONDS / 3600,
+        help="Keep unreferenced blobs younger than this",
+    )
+    args = ap.parse_args()
+
+    result = collect_garbage(args.grace_hours * 3600, dry_run=args.dry_run)
+    verb = "Would remove" if args.dry_run else "Removed"
+    print(
+        f"{verb} {result['removed']} blob(s), {result['bytes_freed'] / 2**20:.1f} MiB; "
+        f"kept {result['kept']}"
+    )
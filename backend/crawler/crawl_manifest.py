@@ -0,0 +1,98 @@
+"""Per store/week record of what a crawl already saved, to skip unchanged ads.
+
+Each store/week folder gets a crawl_manifest.json fingerprinting the stored
+ad: the ad id (the picked ad, or the page URL), the number of cards the ad
+showed, and a hash of the stored items' keys, plus the keys themselves.
+Manifest keys are crawler.item_keys.item_key of the store, week, name and
+price, without an image digest, since cards are compared before any image
+is downloaded.
+
+A crawl reads the card records with one cheap page.evaluate() and asks the
+manifest for a CrawlPlan before downloading anything:
+- the fingerprint matches: the week is unchanged and the crawl stops;
+- otherwise only the added items are downloaded, processed and saved, and
+  the items whose cards disappeared are dropped from the week's data.
+The manifest is rewritten after the save, from the keys actually stored, so
+items whose image download failed come up as added again on the next run.
+"""
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+from typing import NamedTuple, Optional
+
+from crawler.item_keys import item_key
+from crawler.storage import _write_atomic, current_week, get_store_week_folder
+
+MANIFEST_FILENAME = "crawl_manifest.json"
+
+
+def items_hash(keys) -> str:
+    return hashlib.sha256("\n".join(sorted(keys)).encode("utf-8")).hexdigest()
+
+
+class CrawlPlan(NamedTuple):
+    unchanged: bool
+    added: list  # items to download and save
+    removed: set  # keys of stored items no longer in the ad
+
+
+class CrawlManifest:
+    """
+    The crawl manifest of one store/week.
+
+    Args:
+        store (str): Store name.
+        week (str, optional): Week in YYYY-Www format; defaults to the current week.
+    """
+
+    def __init__(self, store: str, week: Optional[str] = None):
+        self.store = store
+        self.week = week or current_week()
+        self.path = os.path.join(get_store_week_folder(store, self.week), MANIFEST_FILENAME)
+        self.ad_id = None
+        self.keys = set()
+        self.items_hash = None
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        self.ad_id = data.get("ad_id")
+        self.keys = set(data.get("keys") or [])
+        self.items_hash = data.get("items_hash")
+
+    @property
+    def exists(self) -> bool:
+        return self.items_hash is not None
+
+    def key(self, item: dict) -> str:
+        """The manifest key of an item (or card) with "name" and "price"."""
+        return item_key(self.store, self.week, item.get("name"), item.get("price"))
+
+    def plan(self, ad_id: Optional[str], items: list) -> CrawlPlan:
+        """Compare the live ad's items with the stored ones."""
+        keys = {self.key(item) for item in items}
+        if self.exists and ad_id == self.ad_id and items_hash(keys) == self.items_hash:
+            return CrawlPlan(True, [], set())
+        return CrawlPlan(False, [item for item in items if self.key(item) not in self.keys], self.keys - keys)
+
+    def update(self, ad_id: Optional[str], card_count: int, saved_keys, removed_keys=()):
+        """
+        Record a finished crawl: the live ad showed `card_count` cards, and the
+        stored keys are the previous ones, minus removed, plus saved.
+        """
+        self.ad_id = ad_id
+        self.keys = (self.keys - set(removed_keys)) | set(saved_keys)
+        self.items_hash = items_hash(self.keys)
+        data = {
+            "store": self.store,
+            "week": self.week,
+            "ad_id": ad_id,
+            "card_count": card_count,
+            "item_count": len(self.keys),
+            "items_hash": self.items_hash,
+            "updated": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "keys": sorted(self.keys),
+        }
+        _write_atomic(self.path, json.dumps(data, indent=2).encode("utf-8"))
@@ -31,6 +31,8 @@ chromedriver_path = str(chromedriver_local) if chromedriver_local.exists() else
 
 FILE_SYSTEM_CONFIG = {
     "DATA_BASE_DIR": str(BASE_DIR / "grocery_data"),
+    # Tom Thumb cookie export loaded before every crawl (crawler.utility.load_cookie_export)
+    "TOMTHUMB_COOKIES_PATH": str(BASE_DIR / "tomthumb_state.json"),
     # Legacy paths - deprecated, kept for backward compatibility
     "IMAGES_BASE_DIR": str(BASE_DIR / "grocery_images"),
     "ITEMS_BASE_DIR": str(BASE_DIR / "grocery_items"),
@@ -39,3 +41,53 @@ FILE_SYSTEM_CONFIG = {
     "chrome_path": chrome_path,
     "chromedriver_path": chromedriver_path,
 }
+
+# Resized copies generated for every crawled image: name -> longest edge in pixels.
+# Served by /blob/{digest}?size=<name>; the original stays available without size.
+IMAGE_VARIANTS = {
+    "thumb": 200,
+    "medium": 600,
+}
+IMAGE_VARIANT_FORMAT = "WEBP"
+IMAGE_VARIANT_QUALITY = 75
+
+# Requests the Playwright crawlers drop (see request_blocking.RequestBlocker).
+# Resource types are Playwright's request.resource_type values; "image" is
+# only added when a crawler opts into block_images, since some extractors
+# read rendered images.
+BLOCKED_RESOURCE_TYPES = ["font", "media"]
+# Third-party analytics and ad hosts (a host matches itself and its subdomains).
+# Their scripts are answered with an empty body instead of failing, so page
+# code that calls them keeps running.
+BLOCKED_HOSTS = [
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "googlesyndication.com",
+    "googleadservices.com",
+    "facebook.net",
+    "connect.facebook.com",
+    "bat.bing.com",
+    "clarity.ms",
+    "hotjar.com",
+    "quantummetric.com",
+    "demdex.net",
+    "omtrdc.net",
+    "tiqcdn.com",
+    "criteo.com",
+    "criteo.net",
+    "ct.pinterest.com",
+    "analytics.tiktok.com",
+    "nr-data.net",
+    "scorecardresearch.com",
+]
+
+# crawler.orchestrator: browser contexts open at once, crawls per site at
+# once (sites not listed get 1), and the deadline for a whole run.
+CRAWL_CONTEXT_POOL_SIZE = 4
+CRAWL_SITE_CONCURRENCY = {
+    "kroger.com": 1,
+    "tomthumb.com": 1,
+    "heb.com": 1,
+}
+CRAWL_TIMEOUT_SECONDS = 15 * 60
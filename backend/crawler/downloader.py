@@ -0,0 +1,261 @@
+"""Concurrent image downloader shared by the crawlers.
+
+Jobs are (url, name, store, week) tuples. They run on a thread pool while the
+crawler keeps extracting, each worker thread reuses one keep-alive
+requests.Session, requests to a single host are capped, and transient
+failures are retried with exponential backoff. Images land in the
+content-addressed blob store, so an image seen in earlier weeks or at another
+store is stored once. Bodies are streamed to a temp file in chunks and only
+published when they look like an image within the size limit. With an HttpCacheIndex the requests are conditional and
+unchanged images are not downloaded again.
+
+Usage:
+    with ImageDownloader() as downloader:
+        future = downloader.submit(DownloadJob(url, name, "kroger"))
+        ...
+        result = future.result()  # DownloadResult(job, path, digest, error, attempts, cached)
+"""
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from crawler.blob_store import get_blob_path, put_stream, touch_blob
+from crawler.http_cache import HttpCacheIndex
+from crawler.image_utils import IMAGE_CHUNK_SIZE, MAX_IMAGE_BYTES, iter_validated_chunks
+from crawler.storage import current_week
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/",
+    "Accept": "image/avif,image/webp,image/*,*/*;q=0.8",
+}
+
+# Status codes worth another attempt; anything else 4xx is final.
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class DownloadJob(NamedTuple):
+    url: str
+    name: str
+    store: str
+    week: Optional[str] = None
+
+
+class DownloadResult(NamedTuple):
+    job: DownloadJob
+    path: Optional[str]
+    digest: Optional[str]
+    error: Optional[str]
+    attempts: int
+    cached: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class ImageDownloader:
+    """
+    Download images concurrently over pooled keep-alive connections.
+
+    Args:
+        max_workers (int): Threads downloading at once.
+        per_host_limit (int): Concurrent requests allowed against one host.
+        retries (int): Extra attempts after a timeout, connection error or retryable status.
+        backoff (float): Base delay in seconds; attempt n waits backoff * 2**n plus jitter.
+        timeout (float): Per-request timeout in seconds.
+        headers (dict, optional): Request headers; defaults to DEFAULT_HEADERS.
+        cache (HttpCacheIndex, optional): Validator index used for conditional requests.
+        chunk_size (int): Bytes read from the socket at a time while streaming a body.
+        max_bytes (int, optional): Larger responses are abandoned; None disables the cap.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 8,
+        per_host_limit: int = 4,
+        retries: int = 3,
+        backoff: float = 0.5,
+        timeout: float = 10,
+        headers: Optional[dict] = None,
+        cache: Optional[HttpCacheIndex] = None,
+        chunk_size: int = IMAGE_CHUNK_SIZE,
+        max_bytes: Optional[int] = MAX_IMAGE_BYTES,
+    ):
+        self.max_workers = max_workers
+        self.per_host_limit = per_host_limit
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.headers = dict(headers or DEFAULT_HEADERS)
+        self.cache = cache
+        self.chunk_size = chunk_size
+        self.max_bytes = max_bytes
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="image-download"
+        )
+        self._local = threading.local()
+        self._sessions = []
+        self._host_slots = {}
+        self._lock = threading.Lock()
+        self._stats = {"submitted": 0, "succeeded": 0, "failed": 0, "retries": 0, "bytes": 0, "not_modified": 0}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def submit(self, job: DownloadJob, callback=None):
+        """
+        Queue a job and return a Future resolving to its DownloadResult.
+        `callback(result)` runs on the worker thread once the job finishes.
+        """
+        if job.week is None:
+            job = job._replace(week=current_week())
+        with self._lock:
+            self._stats["submitted"] += 1
+        return self._executor.submit(self._run, job, callback)
+
+    def download_all(self, jobs, callback=None) -> list:
+        """Submit every job from an iterable and return the results in job order."""
+        futures = [self.submit(job, callback) for job in jobs]
+        return [future.result() for future in futures]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats)
+
+    def close(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+        with self._lock:
+            sessions, self._sessions = self._sessions, []
+        for session in sessions:
+            session.close()
+
+    def _session(self) -> requests.Session:
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=self.max_workers, pool_maxsize=self.per_host_limit
+            )
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.headers.update(self.headers)
+            self._local.session = session
+            with self._lock:
+                self._sessions.append(session)
+        return session
+
+    def _host_slot(self, url: str) -> threading.BoundedSemaphore:
+        host = urlsplit(url).netloc
+        with self._lock:
+            slot = self._host_slots.get(host)
+            if slot is None:
+                slot = threading.BoundedSemaphore(self.per_host_limit)
+                self._host_slots[host] = slot
+            return slot
+
+    def _fetch(self, url: str, headers: Optional[dict] = None) -> requests.Response:
+        """Start a streamed GET; the caller reads the body and closes the response."""
+        response = self._session().get(url, headers=headers, timeout=self.timeout, stream=True)
+        try:
+            response.raise_for_status()
+        except requests.HTTPError:
+            response.close()
+            raise
+        return response
+
+    def _save(self, job: DownloadJob, entry: Optional[dict]) -> tuple:
+        """
+        Fetch job.url into the blob store.
+
+        Returns:
+            tuple: (digest, blob path, cached) where cached means a 304 let
+            the stored blob be reused.
+        """
+        headers = HttpCacheIndex.conditional_headers(entry)
+        # The host slot is held until the body is read, not just the headers.
+        with self._host_slot(job.url), self._fetch(job.url, headers) as response:
+            if response.status_code == 304:
+                if entry is None:
+                    raise requests.HTTPError("304 Not Modified without a cached copy", response=response)
+                self.cache.record_hit(job.url)
+                touch_blob(entry["sha256"])
+                with self._lock:
+                    self._stats["not_modified"] += 1
+                return entry["sha256"], entry["path"], True
+
+            chunks = iter_validated_chunks(
+                response.iter_content(self.chunk_size),
+                response.headers.get("Content-Type"),
+                self.max_bytes,
+            )
+            digest, path = put_stream(chunks)
+            size = os.path.getsize(path)
+
+        with self._lock:
+            self._stats["bytes"] += size
+        if self.cache is not None:
+            self.cache.record_download(job.url, response.headers, path, size, digest)
+        return digest, path, False
+
+    def _cached_entry(self, url: str) -> Optional[dict]:
+        entry = self.cache.lookup(url) if self.cache is not None else None
+        # Only entries backed by a stored blob can be revalidated.
+        if entry is not None and get_blob_path(entry.get("sha256")) != entry["path"]:
+            return None
+        return entry
+
+    def _run(self, job: DownloadJob, callback) -> DownloadResult:
+        entry = self._cached_entry(job.url)
+        path = digest = None
+        error = None
+        cached = False
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                digest, path, cached = self._save(job, entry)
+                error = None
+                break
+            except (
+                requests.Timeout,
+                requests.ConnectionError,
+                requests.HTTPError,
+                requests.exceptions.ChunkedEncodingError,
+            ) as e:
+                error = f"{type(e).__name__}: {e}"
+                status = getattr(getattr(e, "response", None), "status_code", None)
+                retryable = status is None or status in RETRY_STATUSES
+                if not retryable or attempt > self.retries:
+                    break
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                break
+            with self._lock:
+                self._stats["retries"] += 1
+            time.sleep(self.backoff * 2 ** (attempt - 1) * (1 + random.random() / 2))
+
+        with self._lock:
+            self._stats["succeeded" if error is None else "failed"] += 1
+        if error is not None:
+            logging.error(f"Image download failed for {job.name}: {error}")
+            result = DownloadResult(job, None, None, error, attempt)
+        else:
+            result = DownloadResult(job, path, digest, None, attempt, cached)
+
+        if callback is not None:
+            try:
+                callback(result)
+            except Exception as e:
+                logging.error(f"Download callback failed for {job.name}: {e}")
+        return result
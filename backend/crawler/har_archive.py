@@ -0,0 +1,114 @@
+"""Record a crawl's network traffic once, then replay it without the network.
+
+The store sites block repeated automated visits, so crawls cannot be
+benchmarked or regression-tested against them. A HarArchive is a folder
+holding
+- crawl.har.zip: every request and response of one browser context (a HAR
+  with the bodies attached), and
+- storage_state.json: the context's cookies and localStorage at the end.
+
+In "record" mode the crawl runs live and Playwright writes the HAR when the
+context closes. In "replay" mode the context starts from the saved storage
+state and every request is answered from the HAR via context routing;
+requests missing from the archive are aborted, so a replay never touches the
+network and runs the same way on an offline box.
+
+Playwright matches replayed requests by method and URL (and POST body), so
+pages that add random or time-based query parameters to data requests only
+replay those requests if the values repeat.
+
+Usage:
+    archive = HarArchive(get_archive_folder("kroger"), "replay")
+    context = browser.new_context(**archive.context_options())
+    archive.attach(context)
+    ...
+    archive.finish(context)  # before context.close()
+
+Recording is done by the crawlers' --har record / --har replay flags
+(python -m crawler.kroger_flow, python -m crawler.tomthumb_playwright,
+python -m crawler.orchestrator).
+"""
+import os
+from typing import Optional
+
+from crawler.crawler_configs import FILE_SYSTEM_CONFIG
+from crawler.storage import current_week
+
+HAR_DIRNAME = "har"
+HAR_FILENAME = "crawl.har.zip"
+STATE_FILENAME = "storage_state.json"
+HAR_MODES = ("record", "replay")
+
+
+def get_archive_folder(store: str, label: Optional[str] = None, create_if_not_exists: bool = True) -> str:
+    """DATA_BASE_DIR/har/<store>/<label>; label defaults to the current week."""
+    folder = os.path.join(FILE_SYSTEM_CONFIG["DATA_BASE_DIR"], HAR_DIRNAME, store, label or current_week())
+    if create_if_not_exists:
+        os.makedirs(folder, exist_ok=True)
+    return folder
+
+
+class HarArchive:
+    """
+    One recorded crawl.
+
+    Args:
+        folder (str): Folder holding the HAR and storage state.
+        mode (str): "record" or "replay".
+
+    Raises:
+        ValueError: For an unknown mode.
+        FileNotFoundError: When replaying a folder without a recorded HAR.
+    """
+
+    def __init__(self, folder: str, mode: str):
+        if mode not in HAR_MODES:
+            raise ValueError(f"Unknown HAR mode {mode!r}; expected one of {HAR_MODES}")
+        self.folder = folder
+        self.mode = mode
+        if mode == "record":
+            os.makedirs(folder, exist_ok=True)
+        elif not os.path.exists(self.har_path):
+            raise FileNotFoundError(f"No recorded crawl at {self.har_path}")
+
+    @property
+    def har_path(self) -> str:
+        return os.path.join(self.folder, HAR_FILENAME)
+
+    @property
+    def state_path(self) -> str:
+        return os.path.join(self.folder, STATE_FILENAME)
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    def context_options(self) -> dict:
+        """Options for browser.new_context(): HAR recording, or the recorded storage state."""
+        if self.mode == "record":
+            return {
+                "record_har_path": self.har_path,
+                "record_har_mode": "full",
+                "record_har_content": "attach",
+            }
+        if os.path.exists(self.state_path):
+            return {"storage_state": self.state_path}
+        return {}
+
+    def attach(self, context):
+        """Serve the context from the archive when replaying. Call after other routes are set."""
+        if self.replaying:
+            context.route_from_har(self.har_path, not_found="abort")
+
+    async def attach_async(self, context):
+        if self.replaying:
+            await context.route_from_har(self.har_path, not_found="abort")
+
+    def finish(self, context):
+        """Save the storage state when recording; the HAR itself is written by context.close()."""
+        if self.mode == "record":
+            context.storage_state(path=self.state_path)
+
+    async def finish_async(self, context):
+        if self.mode == "record":
+            await context.storage_state(path=self.state_path)
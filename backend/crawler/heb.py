@@ -6,6 +6,7 @@ import time
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from crawler_configs import FILE_SYSTEM_CONFIG
 from urllib.parse import urljoin
 
 
@@ -76,8 +77,8 @@ def scrape_page(driver):
 
 def main_flow():
     chrome_options = Options()
-    chrome_options.binary_location = r"C:\Users\lucas\OneDrive\Documents\Lucas_Grocery_Project\GroceryApp\backend\Lib\chrome-win64\chrome.exe"
-    chrome_lib_path = r"C:\Users\lucas\OneDrive\Documents\Lucas_Grocery_Project\GroceryApp\backend\Lib\chromedriver-win64\chromedriver.exe"
+    chrome_options.binary_location = FILE_SYSTEM_CONFIG["chrome_path"]
+    chrome_lib_path = FILE_SYSTEM_CONFIG["chromedriver_path"]
     service = Service(chrome_lib_path)
 
     driver = webdriver.Chrome(service=service, options=chrome_options)
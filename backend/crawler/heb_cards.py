@@ -0,0 +1,51 @@
+"""Bulk extraction of H-E-B weekly ad deal cards.
+
+CARD_RECORDS_JS reads the raw fields of every product card in one
+page.evaluate() (crawler.snapshots builds the same records from saved HTML);
+parse_card_record() applies heb.extract_heb_product's rules to them.
+"""
+
+CARD_SELECTOR = '[data-component="product-card"]'
+
+# Runs in the page; returns the raw strings of every product card.
+CARD_RECORDS_JS = """
+(selector) => {
+  const text = (el) => (el ? (el.innerText || "").trim() : "");
+  // like XPath .//*[contains(text(), s)]: elements with a direct text node containing s
+  const ownText = (el) => Array.from(el.childNodes)
+    .filter((n) => n.nodeType === Node.TEXT_NODE).map((n) => n.textContent).join("");
+  return Array.from(document.querySelectorAll(selector), (card) => {
+    const img = card.querySelector("img");
+    const elements = Array.from(card.querySelectorAll("*"));
+    return {
+      image_url: img ? img.getAttribute("src") || "" : "",
+      alt: img ? img.getAttribute("alt") || "" : "",
+      titles: Array.from(card.querySelectorAll('[data-qe-id="productTitle"] span'), text),
+      prices: elements.filter((el) => ownText(el).includes("$")).map(text),
+      unit_prices: elements.filter((el) => ownText(el).includes(" / ")).map(text),
+      has_coupon: elements.some((el) => ownText(el).toLowerCase().includes("coupon")),
+      buttons: Array.from(card.querySelectorAll("button"), text),
+    };
+  });
+}
+"""
+
+
+def parse_card_record(record: dict) -> dict:
+    """Turn one raw card record into an item with name, image_url, price and in_stock."""
+    name = (record.get("alt") or "").strip()
+    for title in record.get("titles") or []:
+        if title.strip():
+            name = title.strip()
+            break
+    price = next((t for t in record.get("prices") or [] if "$" in t and "/" not in t), "")
+    unit_price = next((t for t in record.get("unit_prices") or [] if "$" in t and "/" in t), "")
+    full_price = f"{price} ({unit_price})" if unit_price else price
+    if record.get("has_coupon"):
+        full_price += " [Coupon]"
+    return {
+        "name": name,
+        "image_url": record.get("image_url") or "",
+        "price": full_price.strip(),
+        "in_stock": any("Add to" in b for b in record.get("buttons") or []),
+    }
@@ -0,0 +1,189 @@
+"""Persistent HTTP validator cache for crawler image downloads.
+
+For every normalized image URL the index remembers the ETag, Last-Modified,
+SHA-256 and local path of the last successful download. The next crawl sends
+If-None-Match / If-Modified-Since and, on a 304, reuses the stored blob instead
+of downloading the image again.
+
+The index lives in DATA_BASE_DIR/http_cache.json. save() merges with whatever
+another crawler process wrote in the meantime, under the same kind of lock the
+weekly ad segments use.
+
+Usage:
+    cache = HttpCacheIndex()
+    with ImageDownloader(cache=cache) as downloader:
+        ...
+    cache.save()
+    print(cache.report())
+"""
+import json
+import os
+import threading
+import time
+from typing import Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from crawler.crawler_configs import FILE_SYSTEM_CONFIG
+from crawler.storage import _exclusive_lock, _write_atomic
+
+HTTP_CACHE_FILENAME = "http_cache.json"
+HTTP_CACHE_LOCK_FILENAME = "http_cache.lock"
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_url(url: str) -> str:
+    """
+    Canonical cache key for a URL: lower-case scheme and host, no default
+    port, no fragment and query parameters in sorted order.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, parts.path or "/", query, ""))
+
+
+class HttpCacheIndex:
+    """
+    URL -> validator index with hit-rate counters.
+
+    Entries are dicts with etag, last_modified, sha256, path, size and
+    checked_at. Thread-safe, so one index can be shared by every
+    ImageDownloader worker.
+
+    Args:
+        path (str, optional): Index file; defaults to DATA_BASE_DIR/http_cache.json.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        if path is None:
+            base_dir = FILE_SYSTEM_CONFIG["DATA_BASE_DIR"]
+            os.makedirs(base_dir, exist_ok=True)
+            path = os.path.join(base_dir, HTTP_CACHE_FILENAME)
+        self.path = path
+        self._entries = self._read()
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.changed = 0
+        self.bytes_saved = 0
+        self.bytes_downloaded = 0
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def _read(self) -> dict:
+        try:
+            with open(self.path, "rb") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable HTTP cache index {self.path}: {e}")
+            return {}
+
+    def lookup(self, url: str) -> Optional[dict]:
+        """
+        Cached entry for url, or None when there is none or its local copy
+        has gone missing or changed size (then it cannot be revalidated).
+        """
+        with self._lock:
+            entry = self._entries.get(normalize_url(url))
+        if entry is None:
+            return None
+        try:
+            if os.path.getsize(entry["path"]) != entry["size"]:
+                return None
+        except OSError:
+            return None
+        return dict(entry)
+
+    @staticmethod
+    def conditional_headers(entry: Optional[dict]) -> dict:
+        """If-None-Match / If-Modified-Since headers for a cached entry."""
+        headers = {}
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def record_hit(self, url: str):
+        """A 304 let the local copy be reused."""
+        key = normalize_url(url)
+        with self._lock:
+            self.hits += 1
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            self.bytes_saved += entry["size"]
+            entry["checked_at"] = int(time.time())
+            self._dirty.add(key)
+
+    def digests(self) -> set:
+        """SHA-256 of every cached download, i.e. the blobs a 304 may hand back."""
+        with self._lock:
+            return {entry.get("sha256") for entry in self._entries.values()}
+
+    def record_download(self, url: str, headers, path: str, size: int, sha256: str):
+        """A full 200 response was written to `path`; store its validators."""
+        key = normalize_url(url)
+        with self._lock:
+            self.misses += 1
+            self.bytes_downloaded += size
+            previous = self._entries.get(key)
+            if previous is not None and previous.get("sha256") != sha256:
+                self.changed += 1
+            self._entries[key] = {
+                "etag": headers.get("ETag"),
+                "last_modified": headers.get("Last-Modified"),
+                "sha256": sha256,
+                "path": path,
+                "size": size,
+                "checked_at": int(time.time()),
+            }
+            self._dirty.add(key)
+
+    def save(self):
+        """Merge this run's entries into the index file on disk."""
+        with self._lock:
+            updates = {key: self._entries[key] for key in self._dirty}
+            self._dirty.clear()
+        if not updates:
+            return
+        with _exclusive_lock(os.path.join(os.path.dirname(self.path), HTTP_CACHE_LOCK_FILENAME)):
+            entries = self._read()
+            entries.update(updates)
+            _write_atomic(self.path, json.dumps(entries, separators=(",", ":")).encode("utf-8"))
+        with self._lock:
+            for key, entry in entries.items():
+                self._entries.setdefault(key, entry)
+
+    def stats(self) -> dict:
+        with self._lock:
+            requests_made = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "changed": self.changed,
+                "hit_rate": self.hits / requests_made if requests_made else 0.0,
+                "bytes_saved": self.bytes_saved,
+                "bytes_downloaded": self.bytes_downloaded,
+            }
+
+    def report(self) -> str:
+        """One-line hit-rate summary for the end of a crawl."""
+        s = self.stats()
+        return (
+            f"Image cache: {s['hits']}/{s['hits'] + s['misses']} not modified "
+            f"({s['hit_rate']:.0%} hit rate), {s['changed']} changed, "
+            f"{s['bytes_saved'] / 2**20:.1f} MiB saved, "
+            f"{s['bytes_downloaded'] / 2**20:.1f} MiB downloaded"
+        )
@@ -1,10 +1,94 @@
 import logging
+from typing import Iterable, Iterator, Optional
+
 import requests
 
+# Bytes read from the network per chunk while streaming an image.
+IMAGE_CHUNK_SIZE = 64 * 1024
+# Responses larger than this are abandoned; ad images are a few hundred KiB.
+MAX_IMAGE_BYTES = 10 * 1024 * 1024
+
+# Generic types some CDNs (e.g. S3 mirrors) send for images; the magic bytes decide.
+GENERIC_CONTENT_TYPES = {"application/octet-stream", "binary/octet-stream"}
+
+# Enough leading bytes to recognise every format in sniff_image_type.
+SNIFF_BYTES = 16
+
+
+class InvalidImageError(ValueError):
+    """A download is not an image we are willing to publish."""
+
+
+def sniff_image_type(head: bytes) -> Optional[str]:
+    """Guess an image Content-Type from its leading magic bytes, or None."""
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head[4:12] in (b"ftypavif", b"ftypavis"):
+        return "image/avif"
+    return None
+
 
-def fetch_image_bytes(image_url, timeout=10):
+def check_content_type(content_type: Optional[str]):
+    """Reject responses whose declared type cannot be an image (e.g. an HTML error page)."""
+    if not content_type:
+        return
+    media_type = content_type.split(";", 1)[0].strip().lower()
+    if not (media_type.startswith("image/") or media_type in GENERIC_CONTENT_TYPES):
+        raise InvalidImageError(f"Unexpected Content-Type {media_type!r}")
+
+
+def iter_validated_chunks(
+    chunks: Iterable[bytes],
+    content_type: Optional[str] = None,
+    max_bytes: Optional[int] = MAX_IMAGE_BYTES,
+    expected_length: Optional[int] = None,
+) -> Iterator[bytes]:
+    """
+    Pass image chunks through while checking them.
+
+    Raises InvalidImageError (from the generator) when the declared type is
+    not an image, the leading bytes are not a known image format, the body
+    grows beyond max_bytes, or it ends short of expected_length (readers such
+    as http.client return a short body instead of raising). Consumers that
+    write the chunks to a temp file can therefore discard it instead of
+    publishing a bad image.
+    """
+    check_content_type(content_type)
+    head = b""
+    total = 0
+    for chunk in chunks:
+        if not chunk:
+            continue
+        total += len(chunk)
+        if max_bytes is not None and total > max_bytes:
+            raise InvalidImageError(f"Image exceeds {max_bytes} bytes")
+        if head is not None:
+            head += chunk
+            if len(head) < SNIFF_BYTES:
+                continue
+            if sniff_image_type(head) is None:
+                raise InvalidImageError("Body is not a recognised image format")
+            chunk, head = head, None
+        yield chunk
+    if expected_length is not None and total != expected_length:
+        raise InvalidImageError(f"Body truncated: got {total} of {expected_length} bytes")
+    if head is not None:
+        if sniff_image_type(head) is None:
+            raise InvalidImageError("Body is not a recognised image format")
+        yield head
+
+
+def fetch_image_bytes(image_url, timeout=10, chunk_size=IMAGE_CHUNK_SIZE, max_bytes=MAX_IMAGE_BYTES):
     """
     Download image from the given URL and return its bytes.
+    The body is streamed in chunk_size pieces and checked as it arrives, so a
+    non-image or oversized response is abandoned early.
     Returns None if download fails.
     """
     headers = {
@@ -15,15 +99,21 @@ def fetch_image_bytes(image_url, timeout=10):
         # "Sec-Fetch-Site": "none",       # Not needed for requests, only browsers
     }
     try:
-        response = requests.get(image_url, timeout=timeout, headers=headers)
-        response.raise_for_status()
-        return response.content
+        with requests.get(image_url, timeout=timeout, headers=headers, stream=True) as response:
+            response.raise_for_status()
+            chunks = iter_validated_chunks(
+                response.iter_content(chunk_size), response.headers.get("Content-Type"), max_bytes
+            )
+            return b"".join(chunks)
     except (requests.Timeout, requests.ConnectionError) as e:
         logging.error(f"Image download failed (timeout/connection): {e}")
         return None
     except requests.HTTPError as e:
         logging.error(f"Image download failed (HTTP error): {e}")
         return None
+    except InvalidImageError as e:
+        logging.error(f"Image download failed (invalid image): {e}")
+        return None
     except Exception as e:
         logging.error(f"Image download failed (other error): {e}")
         return None
@@ -0,0 +1,175 @@
+"""Ingest-time processing of crawled images: resized variants and metadata.
+
+After an image lands in the blob store, process_image() decodes it once and
+- writes a copy per entry of IMAGE_VARIANTS (e.g. a 200px "thumb" and a
+  600px "medium") as WebP blobs, recorded in the original's variants sidecar;
+- computes its width, height, format, byte size, content hash and a
+  blurhash placeholder, recorded in the original's metadata sidecar.
+
+The crawlers merge the result into each item as item["image_variants"] and
+item["image_meta"], so /weeklyadfromfile/ clients can lay out the grid and
+paint placeholders before any image is fetched. The API serves a variant via
+/blob/{digest}?size=<name>.
+
+Decoding and resizing are CPU-bound, so ImageProcessor runs them in a
+process pool next to the (I/O-bound) download threads. Pillow is optional:
+without it nothing is produced and clients keep using the original image.
+
+Usage:
+    with ImageProcessor() as processor:
+        future = processor.submit(digest)
+        ...
+        item.update(future.result())  # {"image_variants": {...}, "image_meta": {...}}
+"""
+import io
+import logging
+import os
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Optional
+
+try:
+    from PIL import Image
+except ImportError:  # optional: variants and metadata are skipped without Pillow
+    Image = None
+
+from crawler import blurhash
+from crawler.blob_store import (
+    get_blob_path,
+    get_metadata,
+    get_variants,
+    put_bytes,
+    set_metadata,
+    set_variants,
+)
+from crawler.crawler_configs import (
+    FILE_SYSTEM_CONFIG,
+    IMAGE_VARIANT_FORMAT,
+    IMAGE_VARIANT_QUALITY,
+    IMAGE_VARIANTS,
+)
+
+# Edge of the downscaled copy the blurhash is computed from, and its components.
+BLURHASH_SAMPLE_EDGE = 32
+BLURHASH_COMPONENTS = (4, 3)
+
+
+def _rgb(image):
+    if image.mode in ("RGB", "RGBA"):
+        return image
+    return image.convert("RGBA" if "transparency" in image.info else "RGB")
+
+
+def _blurhash(image) -> str:
+    sample = image.convert("RGB")
+    sample.thumbnail((BLURHASH_SAMPLE_EDGE, BLURHASH_SAMPLE_EDGE), Image.BILINEAR)
+    return blurhash.encode(sample.tobytes(), sample.width, sample.height, *BLURHASH_COMPONENTS)
+
+
+def _metadata(image, digest: str, path: str) -> dict:
+    return {
+        "width": image.width,
+        "height": image.height,
+        "format": (image.format or "").lower(),
+        "bytes": os.path.getsize(path),
+        "sha256": digest,
+        "blurhash": _blurhash(image),
+    }
+
+
+def _resize(image, sizes: dict) -> dict:
+    variants = {}
+    # Largest first, so each smaller variant resamples fewer pixels.
+    for name, edge in sorted(sizes.items(), key=lambda kv: -kv[1]):
+        image = image.copy()
+        image.thumbnail((edge, edge), Image.LANCZOS)
+        buffer = io.BytesIO()
+        image.save(buffer, IMAGE_VARIANT_FORMAT, quality=IMAGE_VARIANT_QUALITY, method=4)
+        variants[name], _ = put_bytes(buffer.getvalue())
+    return variants
+
+
+def process_image(digest: str, sizes: Optional[dict] = None) -> dict:
+    """
+    Create whatever variants and metadata blob `digest` is still missing.
+
+    Images already smaller than a variant's edge are re-encoded, not
+    enlarged. Returns {"image_variants": name -> digest, "image_meta": {...}};
+    both are empty when Pillow is missing or the blob cannot be decoded.
+    """
+    sizes = IMAGE_VARIANTS if sizes is None else sizes
+    empty = {"image_variants": {}, "image_meta": {}}
+    if Image is None:
+        return empty
+    src_path = get_blob_path(digest)
+    if src_path is None:
+        return empty
+
+    variants = get_variants(digest)
+    metadata = get_metadata(digest)
+    missing = {
+        name: edge for name, edge in sizes.items()
+        if get_blob_path(variants.get(name)) is None
+    }
+    if missing or not metadata:
+        try:
+            with Image.open(src_path) as original:
+                original.load()
+                if not metadata:
+                    metadata = _metadata(original, digest, src_path)
+                    set_metadata(digest, metadata)
+                if missing:
+                    variants.update(_resize(_rgb(original), missing))
+                    set_variants(digest, variants)
+        except (OSError, ValueError, Image.DecompressionBombError) as e:
+            logging.error(f"Could not process image {digest}: {e}")
+            return empty
+
+    return {
+        "image_variants": {name: variants[name] for name in sizes},
+        "image_meta": metadata,
+    }
+
+
+def _init_worker(data_base_dir: str):
+    # Spawned workers re-import the config; point them at the parent's data dir.
+    FILE_SYSTEM_CONFIG["DATA_BASE_DIR"] = data_base_dir
+
+
+class ImageProcessor:
+    """
+    Run process_image in a pool of worker processes.
+
+    Args:
+        max_workers (int, optional): Worker processes; defaults to the CPU count.
+        sizes (dict, optional): Variant name -> longest edge; defaults to IMAGE_VARIANTS.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, sizes: Optional[dict] = None):
+        self.sizes = dict(IMAGE_VARIANTS if sizes is None else sizes)
+        self._executor = None
+        if Image is None:
+            logging.warning("Pillow is not installed; skipping image variants and metadata")
+        else:
+            self._executor = ProcessPoolExecutor(
+                max_workers=max_workers,
+                initializer=_init_worker,
+                initargs=(FILE_SYSTEM_CONFIG["DATA_BASE_DIR"],),
+            )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def submit(self, digest: Optional[str]) -> Future:
+        """Queue an image; the Future resolves to the item fields from process_image."""
+        if self._executor is None or digest is None:
+            future = Future()
+            future.set_result({"image_variants": {}, "image_meta": {}})
+            return future
+        return self._executor.submit(process_image, digest, self.sizes)
+
+    def close(self, wait: bool = True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
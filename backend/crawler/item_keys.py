@@ -0,0 +1,31 @@
+"""Identity of weekly ad items, shared by the file store, SQLite and the crawlers.
+
+Dependency-free so the API, db_engine and the crawler scripts can all
+import it without pulling in each other.
+"""
+import hashlib
+import re
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text) -> str:
+    """Collapse runs of whitespace (newlines from innerText, nbsp) to single spaces."""
+    return _WHITESPACE.sub(" ", str(text or "")).strip()
+
+
+def item_identity(name, price) -> tuple:
+    """Normalized, case-folded (name, price): two ad items with the same identity are the same deal."""
+    return normalize_text(name).casefold(), normalize_text(price).casefold()
+
+
+def item_key(storename, week, name, price, image_digest=None) -> str:
+    """
+    Stable key of a weekly ad item: hex SHA-256 of the store, week, item
+    identity and image digest. Without a digest it keys the deal itself,
+    e.g. a card seen before its image is downloaded.
+    """
+    parts = [normalize_text(storename).casefold(), normalize_text(week).casefold()]
+    parts.extend(item_identity(name, price))
+    parts.append(image_digest or "")
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
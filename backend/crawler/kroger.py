@@ -8,14 +8,7 @@ from utility import save_grocery_items as save_to_json
 from utility import download_image
 from utility import get_stealth_driver
 from crawler_configs import FILE_SYSTEM_CONFIG
-
-
-def process_image_url(url: str) -> str:
-    S3_BASE_URL = "https://s3.us-west-1.wasabisys.com/kroger/Kroger/Montages/"
-    KROGER_BASE_URL = "https://www.krogercdn.com/weeklyads/images/Kroger/Montages/"
-    url = url.replace(KROGER_BASE_URL, S3_BASE_URL)
-    clean_url = url.split("?", 1)[0]
-    return clean_url
+from kroger_cards import process_image_url
 
 
 def extract_omni_deal(card):
@@ -90,7 +83,7 @@ def main_flow():
                 name, image_url, price = extract_feature_deal(card)
         if not (name and image_url and price):
             continue
-        new_image_url = process_image_url(image)
+        new_image_url = process_image_url(image_url)
         local_img_path = download_image(new_image_url, name, "kroger")
         if not local_img_path:
             continue  # skip this item if image download failed
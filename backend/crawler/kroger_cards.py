@@ -0,0 +1,129 @@
+"""Bulk extraction of Kroger weekly ad cards.
+
+Walking `.kds-Card` locators costs a browser round-trip per count(),
+get_attribute() and inner_text() call, which adds up to thousands of hops on
+a 300-card ad. extract_card_records() instead reads the raw fields of every
+card in a single page.evaluate() and parses them in Python with the same
+Omni/Feature rules as the locator-based extractor it replaced (kept as the
+baseline in benchmarks/bench_card_extraction.py).
+"""
+
+from crawler.crawler_configs import FILE_SYSTEM_CONFIG
+
+CARD_SELECTOR = ".kds-Card"
+
+# Image attributes in the order the locator-based extractor tries them.
+IMG_SRC_ATTRS = ("src", "data-src", "data-lazy-src", "data-original", "data-srcset", "srcset")
+
+# Runs in the page; returns one plain object of raw strings per card.
+CARD_RECORDS_JS = """
+([selector, imgAttrs]) => {
+  const text = (el) => (el ? (el.innerText || "").trim() : "");
+  const texts = (card, sel) => Array.from(card.querySelectorAll(sel), text);
+  const priceOf = (el) => (el ? el.getAttribute("aria-label") || el.innerText || "" : "");
+  return Array.from(document.querySelectorAll(selector), (card) => {
+    const cls = card.getAttribute("class") || "";
+    const kind = cls.includes("SWA-Omni") ? "omni" : cls.includes("SWA-Feature") ? "feature" : null;
+    const img = card.querySelector("img");
+    const attrs = {};
+    if (img) {
+      for (const name of imgAttrs) {
+        const value = img.getAttribute(name);
+        if (value !== null) attrs[name] = value;
+      }
+    }
+    const record = { kind, img_attrs: attrs, alt: img ? img.getAttribute("alt") : null };
+    if (kind === "omni") {
+      record.descriptions = texts(card, ".SWA-OmniDescriptionBlock .kds-Text--m");
+      record.promo = text(card.querySelector(".SWA-OmniPricePrefix"));
+      record.price = priceOf(card.querySelector(".SWA-OmniPriceHeading"));
+    } else if (kind === "feature") {
+      record.descriptions = texts(card, ".SWA-FeatureDealDescription");
+      record.promo = "";
+      record.price = priceOf(card.querySelector(".SWA-FeaturePriceHeading"));
+    }
+    return record;
+  });
+}
+"""
+
+
+def pick_img_src(get_attr) -> str:
+    """
+    Return the best candidate image URL given get_attr(name) -> value or None,
+    trying IMG_SRC_ATTRS in order; for srcset values the first URL wins.
+    """
+    for attr in IMG_SRC_ATTRS:
+        val = get_attr(attr)
+        if not val:
+            continue
+        val = val.strip()
+        if not val:
+            continue
+        # srcset or data-srcset: pick first URL before whitespace or comma
+        if "srcset" in attr or ("," in val and " " in val):
+            first = val.split(",")[0].strip()
+            return first.split()[0]
+        return val
+    return ""
+
+
+def parse_card_record(record: dict):
+    """
+    Turn one raw card record into (name, image_url, price).
+
+    The description text overrides the image alt text, and Omni deals prefix
+    the price with their promo line, as in the locator-based extractors.
+    Returns None for cards that are neither Omni nor Feature deals.
+    """
+    kind = record.get("kind")
+    if kind not in ("omni", "feature"):
+        return None
+
+    name = (record.get("alt") or "").strip()
+    for text in record.get("descriptions") or []:
+        text = text.strip()
+        if text:
+            name = text
+            break
+
+    image_url = pick_img_src((record.get("img_attrs") or {}).get)
+    price = (record.get("price") or "").strip()
+    if kind == "omni":
+        price = f"{(record.get('promo') or '').strip()} {price}".strip()
+    return name, image_url, price
+
+
+def process_image_url(url: str) -> str:
+    """Normalize Kroger CDN image URLs to a stable location and strip querystring."""
+    if not url:
+        return url
+    out = url.replace(FILE_SYSTEM_CONFIG["KROGER_BASE_URL"], FILE_SYSTEM_CONFIG["S3_BASE_URL"])
+    return out.split("?", 1)[0]
+
+
+def extract_card_records(page, selector: str = CARD_SELECTOR) -> list:
+    """
+    Extract every ad card on the page with one page.evaluate() round-trip.
+
+    Returns:
+        list: {"kind", "name", "image_url", "price"} dicts, in page order,
+        for the Omni and Feature cards found.
+    """
+    return _parse_card_records(page.evaluate(CARD_RECORDS_JS, [selector, list(IMG_SRC_ATTRS)]))
+
+
+async def extract_card_records_async(page, selector: str = CARD_SELECTOR) -> list:
+    """extract_card_records() for an async Playwright page."""
+    return _parse_card_records(await page.evaluate(CARD_RECORDS_JS, [selector, list(IMG_SRC_ATTRS)]))
+
+
+def _parse_card_records(raw_records) -> list:
+    records = []
+    for raw in raw_records:
+        parsed = parse_card_record(raw)
+        if parsed is None:
+            continue
+        name, image_url, price = parsed
+        records.append({"kind": raw["kind"], "name": name, "image_url": image_url, "price": price})
+    return records
@@ -1,11 +1,10 @@
 """Playwright-based Kroger weekly ad scraper.
 
 Implements:
-- process_image_url(url)
-- extract_omni_deal(card)
-- extract_feature_deal(card)
 - main_flow(headless=False, slow_mo=0)
 
+Cards are read with kroger_cards.extract_card_records (one page.evaluate).
+
 Usage:
     pip install playwright
     python -m playwright install
@@ -14,9 +13,11 @@ Usage:
 from urllib.parse import urljoin
 import random
 import time
-from typing import Tuple, List
+from typing import List
 
 from utility import save_grocery_items as save_to_json, download_image
+from request_blocking import RequestBlocker
+from kroger_cards import CARD_SELECTOR, extract_card_records, process_image_url
 
 import sys
 import subprocess
@@ -44,9 +45,6 @@ except Exception as exc:  # pragma: no cover - helpful error
     raise RuntimeError(message) from exc
 
 
-KROGER_S3_BASE = "https://s3.us-west-1.wasabisys.com/kroger/Kroger/Montages/"
-KROGER_CDN_BASE = "https://www.krogercdn.com/weeklyads/images/Kroger/Montages/"
-
 def dismiss_modal(page):
     selectors = [
         'button[aria-label="Close"]',
@@ -77,70 +75,12 @@ def dismiss_modal(page):
     }""")
     return True
 
-def process_image_url(url: str) -> str:
-    """Normalize Kroger montage image URLs to use S3 base and remove query params."""
-    if not url:
-        return url
-    url = url.replace(KROGER_CDN_BASE, KROGER_S3_BASE)
-    clean_url = url.split("?", 1)[0]
-    return clean_url
-
-
-def extract_omni_deal(card) -> Tuple[str, str, str]:
-    """Extract name, img_url, and price for an Omni card (Playwright Locator)."""
-    img = card.locator("img").first
-    img_url = img.get_attribute("src") or ""
-    item_name = (img.get_attribute("alt") or "").strip()
-
-    # Description may exist in the specified selector
-    title_spans = card.locator(".SWA-OmniDescriptionBlock .kds-Text--m")
-    for i in range(title_spans.count()):
-        t = (title_spans.nth(i).inner_text() or "").strip()
-        if t:
-            item_name = t
-            break
-
-    # Promo prefix
-    promo_text = ""
-    promo_divs = card.locator(".SWA-OmniPricePrefix")
-    if promo_divs.count() > 0:
-        promo_text = (promo_divs.nth(0).inner_text() or "").strip()
-
-    price_text = ""
-    price_divs = card.locator(".SWA-OmniPriceHeading")
-    if price_divs.count() > 0:
-        price_text = price_divs.nth(0).get_attribute("aria-label") or ""
-        price_text = price_text.strip()
-
-    full_price = f"{promo_text} {price_text}".strip()
-
-    return item_name or "", img_url or "", full_price
-
-
-def extract_feature_deal(card) -> Tuple[str, str, str]:
-    """Extract name, img_url, and price for a Feature card (Playwright Locator)."""
-    img = card.locator("img").first
-    img_url = img.get_attribute("src") or ""
-    item_name = (img.get_attribute("alt") or "").strip()
-
-    name_spans = card.locator(".SWA-FeatureDealDescription")
-    for i in range(name_spans.count()):
-        t = (name_spans.nth(i).inner_text() or "").strip()
-        if t:
-            item_name = t
-            break
-
-    price_div = card.locator(".SWA-FeaturePriceHeading").first
-    item_price = price_div.get_attribute("aria-label") or ""
-
-    return item_name or "", img_url or "", item_price.strip()
-
-
-def main_flow(headless: bool = False, slow_mo: int = 0):
+def main_flow(headless: bool = False, slow_mo: int = 0, block_requests: bool = True):
     """Main scraping flow using Playwright for Kroger weekly ad.
 
     headless: run without opening a window when True
     slow_mo: ms to slow down Playwright actions (helpful for debugging)
+    block_requests: drop fonts, media and third-party trackers (see request_blocking)
     """
     base_url = "https://www.kroger.com/weeklyad"
     items_all: List[dict] = []
@@ -153,13 +93,15 @@ def main_flow(headless: bool = False, slow_mo: int = 0):
             viewport={"width": 1280, "height": 900},
         )
 
+        blocker = RequestBlocker().install(context) if block_requests else None
+
         page = context.new_page()
         page.goto(base_url)
         dismiss_modal(page)
         time.sleep(random.uniform(2, 4))
         
         try:
-            page.wait_for_selector(".kds-Card", timeout=20000)
+            page.wait_for_selector(CARD_SELECTOR, timeout=20000)
         except PlaywrightTimeoutError:
             print("No cards found on Kroger weekly ad page.")
             context.close()
@@ -168,22 +110,8 @@ def main_flow(headless: bool = False, slow_mo: int = 0):
 
         time.sleep(random.uniform(1.5, 3.0))
 
-        cards = page.locator(".kds-Card")
-        count = cards.count()
-
-        for i in range(count):
-            card = cards.nth(i)
-            try:
-                class_attr = card.get_attribute("class") or ""
-            except Exception:
-                class_attr = ""
-
-            name = image_url = price = None
-            if "SWA-Omni" in class_attr:
-                name, image_url, price = extract_omni_deal(card)
-            elif "SWA-Feature" in class_attr:
-                name, image_url, price = extract_feature_deal(card)
-
+        for record in extract_card_records(page):
+            name, image_url, price = record["name"], record["image_url"], record["price"]
             if not (name and image_url and price):
                 continue
 
@@ -205,6 +133,8 @@ def main_flow(headless: bool = False, slow_mo: int = 0):
             items_all.append(item)
             print("=" * 60)
 
+        if blocker is not None:
+            print(blocker.report())
         try:
             context.close()
             browser.close()
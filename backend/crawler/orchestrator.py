@@ -0,0 +1,220 @@
+"""Run any set of store crawls concurrently in one browser.
+
+Stores are plugins (crawler.stores) that only navigate to their weekly ad
+and extract raw items; the shared crawler.pipeline stages download,
+normalize, dedupe, process and persist them. The orchestrator launches a
+single Chromium and runs every store crawl as an asyncio task:
+- ContextPool hands out isolated browser contexts (at most
+  CRAWL_CONTEXT_POOL_SIZE open at once), each with its store's storage state
+  or cookies and a RequestBlocker;
+- crawls of the same site share a CRAWL_SITE_CONCURRENCY limit;
+- the run is cut off after CRAWL_TIMEOUT_SECONDS and the unfinished crawls
+  are reported as timed out;
+- with --har record each store's traffic is saved to a HarArchive, and
+  with --har replay the crawls run offline from those archives (image
+  downloads still go through crawler.downloader and its HTTP cache);
+- weeks whose ad is unchanged since the last crawl are skipped, and a
+  changed ad only saves its new items (crawler.crawl_manifest; --full
+  saves everything).
+The run ends with one summary line per store (items, seconds, status).
+
+Usage (from backend/):
+    python -m crawler.orchestrator
+    python -m crawler.orchestrator --stores heb tomthumb --timeout 300 --write-db
+    python -m crawler.orchestrator --list
+    python -m crawler.orchestrator --har replay --har-label 2025-W01
+"""
+import argparse
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import NamedTuple, Optional
+
+from playwright.async_api import async_playwright
+
+from crawler.crawler_configs import (
+    CRAWL_CONTEXT_POOL_SIZE,
+    CRAWL_SITE_CONCURRENCY,
+    CRAWL_TIMEOUT_SECONDS,
+)
+from crawler.har_archive import HAR_MODES, HarArchive, get_archive_folder
+from crawler.pipeline import ItemPipeline
+from crawler.request_blocking import RequestBlocker
+from crawler.stores import STORE_PLUGINS, StorePlugin, get_plugin
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+    " (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+)
+CONTEXT_OPTIONS = {
+    "user_agent": USER_AGENT,
+    "locale": "en-US",
+    "viewport": {"width": 1280, "height": 900},
+}
+
+
+class CrawlResult(NamedTuple):
+    store: str
+    status: str  # "ok", "failed" or "timeout"
+    items: int
+    seconds: float
+    error: str = ""
+
+
+class ContextPool:
+    """
+    Isolated browser contexts from one browser, at most `size` open at once.
+
+    Every context() call gets a fresh context (so stores never share
+    cookies or cache) and closes it afterwards. With `har_mode` each store's
+    context records to, or replays from, its archive for `har_label`.
+    """
+
+    def __init__(self, browser, size: int = CRAWL_CONTEXT_POOL_SIZE, block_requests: bool = True,
+                 har_mode: Optional[str] = None, har_label: Optional[str] = None):
+        self.browser = browser
+        self.block_requests = block_requests
+        self.har_mode = har_mode
+        self.har_label = har_label
+        self.blockers = []
+        self._slots = asyncio.Semaphore(size)
+
+    @asynccontextmanager
+    async def context(self, plugin: StorePlugin):
+        archive = None
+        if self.har_mode:
+            folder = get_archive_folder(plugin.name, self.har_label, create_if_not_exists=False)
+            archive = HarArchive(folder, self.har_mode)
+        async with self._slots:
+            options = {**CONTEXT_OPTIONS, **plugin.context_options()}
+            if archive is not None:
+                options.update(archive.context_options())
+            context = await self.browser.new_context(**options)
+            try:
+                if self.block_requests:
+                    blocker = RequestBlocker(block_images=plugin.block_images)
+                    self.blockers.append((plugin.name, blocker))
+                    await blocker.install_async(context)
+                if archive is not None:
+                    # registered last so the archive answers before the blocker
+                    await archive.attach_async(context)
+                yield context
+                if archive is not None:
+                    await archive.finish_async(context)
+            finally:
+                # closing the context writes a recorded HAR
+                await context.close()
+
+
+async def _run_one(plugin: StorePlugin, pool: ContextPool, pipeline, site_limits: dict) -> CrawlResult:
+    limit = site_limits.setdefault(
+        plugin.site, asyncio.Semaphore(CRAWL_SITE_CONCURRENCY.get(plugin.site, 1))
+    )
+    async with limit:
+        started = time.monotonic()
+        try:
+            async with pool.context(plugin) as context:
+                items = await plugin.crawl(context, pipeline)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            return CrawlResult(plugin.name, "failed", 0, time.monotonic() - started, f"{type(e).__name__}: {e}")
+        return CrawlResult(plugin.name, "ok", items, time.monotonic() - started)
+
+
+async def run_crawls(plugins, pool, pipeline, timeout: float = CRAWL_TIMEOUT_SECONDS) -> list:
+    """
+    Run the store plugins concurrently; returns a CrawlResult per plugin, in order.
+
+    Crawls still running after `timeout` seconds are cancelled and reported
+    as "timeout".
+    """
+    site_limits = {}
+    started = time.monotonic()
+    tasks = [asyncio.create_task(_run_one(plugin, pool, pipeline, site_limits)) for plugin in plugins]
+    done, pending = await asyncio.wait(tasks, timeout=timeout)
+    for task in pending:
+        task.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+
+    results = []
+    for plugin, task in zip(plugins, tasks):
+        if task in done:
+            results.append(task.result())
+        else:
+            results.append(CrawlResult(plugin.name, "timeout", 0, time.monotonic() - started,
+                                       f"cancelled after {timeout:.0f}s"))
+    return results
+
+
+def format_summary(results, wall_seconds: float) -> str:
+    """One line per store, then the totals."""
+    lines = [f"{'store':<12} {'status':<8} {'items':>6} {'seconds':>8}"]
+    for r in results:
+        line = f"{r.store:<12} {r.status:<8} {r.items:>6} {r.seconds:>8.1f}"
+        lines.append(f"{line}  {r.error}" if r.error else line)
+    lines.append(
+        f"{len(results)} store(s), {sum(r.items for r in results)} item(s) in {wall_seconds:.1f}s"
+    )
+    return "\n".join(lines)
+
+
+async def crawl_stores(stores=None, headless: bool = True, timeout: float = CRAWL_TIMEOUT_SECONDS,
+                       pool_size: int = CRAWL_CONTEXT_POOL_SIZE, block_requests: bool = True,
+                       write_db: bool = False, snapshots: bool = False,
+                       har_mode: Optional[str] = None, har_label: Optional[str] = None,
+                       incremental: bool = True) -> list:
+    """Crawl `stores` (default: every registered plugin) in one browser and print the summary."""
+    plugins = [get_plugin(name) for name in (stores or STORE_PLUGINS)]
+    for plugin in plugins:
+        plugin.save_snapshots = snapshots
+    started = time.monotonic()
+    pipeline = ItemPipeline(write_db=write_db, incremental=incremental)
+    try:
+        async with async_playwright() as p:
+            browser = await p.chromium.launch(headless=headless)
+            try:
+                pool = ContextPool(browser, size=pool_size, block_requests=block_requests,
+                                   har_mode=har_mode, har_label=har_label)
+                results = await run_crawls(plugins, pool, pipeline, timeout=timeout)
+            finally:
+                await browser.close()
+    finally:
+        pipeline.close()
+    for store, blocker in pool.blockers:
+        print(f"[{store}] {blocker.report()}")
+    for store, stats in pipeline.stats.items():
+        print(f"[{store}] " + ", ".join(f"{k}: {v}" for k, v in stats.items()))
+    print(format_summary(results, time.monotonic() - started))
+    return results
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Crawl weekly ads concurrently in one browser")
+    ap.add_argument("--stores", nargs="+", choices=sorted(STORE_PLUGINS), help="Stores to crawl (default: all)")
+    ap.add_argument("--list", action="store_true", help="List the registered stores and exit")
+    ap.add_argument("--headful", action="store_true", help="Show the browser window")
+    ap.add_argument("--timeout", type=float, default=CRAWL_TIMEOUT_SECONDS, help="Deadline for the whole run, in seconds")
+    ap.add_argument("--contexts", type=int, default=CRAWL_CONTEXT_POOL_SIZE, help="Browser contexts open at once")
+    ap.add_argument("--no-block", action="store_true", help="Load fonts, media and third-party trackers too")
+    ap.add_argument("--write-db", action="store_true", help="Also insert the items into the SQLite store")
+    ap.add_argument("--snapshots", action="store_true", help="Save the rendered ad HTML for crawler.snapshots")
+    ap.add_argument("--full", action="store_true", help="Save every item even when the week's ad is unchanged")
+    ap.add_argument("--har", choices=HAR_MODES, default=None, help="Record each crawl to a HAR archive, or replay it offline")
+    ap.add_argument("--har-label", default=None, help="HAR archive label (default: the current week)")
+    args = ap.parse_args()
+    if args.list:
+        for name, plugin_cls in sorted(STORE_PLUGINS.items()):
+            print(f"{name:<12} {plugin_cls.url}")
+        return
+
+    results = asyncio.run(crawl_stores(
+        args.stores, headless=not args.headful, timeout=args.timeout, pool_size=args.contexts,
+        block_requests=not args.no_block, write_db=args.write_db, snapshots=args.snapshots,
+        har_mode=args.har, har_label=args.har_label, incremental=not args.full,
+    ))
+    raise SystemExit(0 if all(r.status == "ok" for r in results) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""Stages every store crawl shares: normalize, dedupe, download, process, persist.
+
+Store plugins (crawler.stores) only navigate and extract raw items, dicts
+with at least "name", "image_url" and "price". ItemPipeline.run() then
+- normalizes them (whitespace, the plugin's image URL rewrite) and drops
+  items without a name or image;
+- drops repeats of the same name and price within the crawl;
+- downloads every image through one shared ImageDownloader;
+- processes each image (variants, metadata) in the ImageProcessor as soon
+  as its own download finishes, instead of after the whole batch;
+- persists finished items in batches of `batch_size`, each batch one
+  weekly-ad segment (and optionally SQLite rows), and compacts the week's
+  segments into weekly_ad.json once the crawl is saved.
+Extra fields from the plugin (e.g. HEB's "in_stock") are kept.
+
+Given the crawled ad's id, run() is incremental: it checks the store/week
+crawl manifest (crawler.crawl_manifest) after deduping and skips an
+unchanged week, or saves only the added items and drops the removed ones.
+"""
+import asyncio
+from typing import Callable, Optional
+
+from crawler.blob_store import get_blob_path
+from crawler.crawl_manifest import CrawlManifest
+from crawler.downloader import DownloadJob, ImageDownloader
+from crawler.http_cache import HttpCacheIndex
+from crawler.image_variants import ImageProcessor
+from crawler.item_keys import item_identity, normalize_text
+from crawler.storage import compact_store_week, current_week, remove_grocery_items, save_grocery_items
+from db_engine.sqlite_engine import (
+    delete_crawler_results,
+    insert_crawler_results_many,
+    week_start_date,
+    week_start_date_of,
+)
+
+# Items per weekly-ad segment / SQLite transaction.
+PERSIST_BATCH_SIZE = 100
+
+
+def normalize_item(raw: dict, normalize_image_url: Optional[Callable] = None) -> Optional[dict]:
+    """Return a cleaned copy of a raw item, or None when it has no name or image URL."""
+    item = dict(raw)
+    item["name"] = normalize_text(raw.get("name"))
+    item["price"] = normalize_text(raw.get("price"))
+    image_url = (raw.get("image_url") or "").strip()
+    if image_url and normalize_image_url is not None:
+        image_url = normalize_image_url(image_url)
+    item["image_url"] = image_url
+    if not (item["name"] and item["image_url"]):
+        return None
+    return item
+
+
+def dedupe_key(item: dict) -> tuple:
+    return item_identity(item["name"], item["price"])
+
+
+def dedupe(items) -> list:
+    """Keep the first item per (name, price), ignoring case."""
+    seen = set()
+    unique = []
+    for item in items:
+        key = dedupe_key(item)
+        if key in seen:
+            continue
+        seen.add(key)
+        unique.append(item)
+    return unique
+
+
+class ItemPipeline:
+    """
+    Run the shared stages for any number of concurrent store crawls.
+
+    Args:
+        write_db (bool): Also insert persisted items into SQLite.
+        batch_size (int): Items per persisted batch.
+        incremental (bool): Consult the crawl manifest when run() gets an ad id.
+    """
+
+    def __init__(self, write_db: bool = False, batch_size: int = PERSIST_BATCH_SIZE, incremental: bool = True):
+        self.write_db = write_db
+        self.batch_size = batch_size
+        self.incremental = incremental
+        self.downloader = ImageDownloader(cache=HttpCacheIndex())
+        self.processor = ImageProcessor()
+        self.stats = {}  # store -> counters
+
+    async def run(self, store: str, raw_items, normalize_image_url: Optional[Callable] = None,
+                  week: Optional[str] = None, ad_id: Optional[str] = None) -> int:
+        """
+        Take a store's raw items through every stage; returns the number persisted.
+
+        `week` (YYYY-Www) files the items under an earlier week, e.g. when
+        backfilling from snapshots; it defaults to the current week. `ad_id`
+        identifies the crawled ad and makes the run incremental.
+        """
+        stats = self.stats.setdefault(
+            store, {"extracted": 0, "invalid": 0, "duplicates": 0, "unchanged": 0, "removed": 0,
+                    "failed": 0, "saved": 0}
+        )
+        normalized = []
+        cards = 0
+        for raw in raw_items:
+            cards += 1
+            stats["extracted"] += 1
+            item = normalize_item(raw, normalize_image_url)
+            if item is None:
+                stats["invalid"] += 1
+            else:
+                normalized.append(item)
+        items = dedupe(normalized)
+        stats["duplicates"] += len(normalized) - len(items)
+
+        manifest = plan = None
+        if ad_id is not None and self.incremental:
+            manifest = await asyncio.to_thread(CrawlManifest, store, week)
+            plan = manifest.plan(ad_id, items)
+            if plan.unchanged:
+                stats["unchanged"] += len(items)
+                return 0
+            stats["unchanged"] += len(items) - len(plan.added)
+            items = plan.added
+            if plan.removed:
+                stats["removed"] += await asyncio.to_thread(self._remove, manifest, plan.removed, week)
+
+        pending = {
+            asyncio.wrap_future(
+                self.downloader.submit(DownloadJob(item["image_url"], item["name"], store, week))
+            ): ("download", item)
+            for item in items
+        }
+        batch = []
+        saved = []
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                stage, item = pending.pop(future)
+                if stage == "download":
+                    result = future.result()
+                    if not result.ok:
+                        stats["failed"] += 1
+                        continue
+                    item["image_digest"] = result.digest
+                    pending[asyncio.wrap_future(self.processor.submit(result.digest))] = ("process", item)
+                else:
+                    item.update(future.result())
+                    batch.append(item)
+            # several items can finish together; persist exact batch_size chunks
+            while len(batch) >= self.batch_size:
+                chunk, batch = batch[:self.batch_size], batch[self.batch_size:]
+                await self._persist(store, chunk, week)
+                saved.extend(chunk)
+        if batch:
+            await self._persist(store, batch, week)
+            saved.extend(batch)
+        if saved:
+            await asyncio.to_thread(compact_store_week, store, week or current_week())
+        if manifest is not None:
+            await asyncio.to_thread(manifest.update, ad_id, cards, map(manifest.key, saved), plan.removed)
+        return len(saved)
+
+    async def _persist(self, store: str, items: list, week: Optional[str]):
+        await asyncio.to_thread(save_grocery_items, items, store, week)
+        if self.write_db:
+            await asyncio.to_thread(_write_db, items, store, week)
+        self.stats[store]["saved"] += len(items)
+
+    def _remove(self, manifest: CrawlManifest, keys: set, week: Optional[str]) -> int:
+        """Drop stored items whose manifest key is in `keys`, from the week's file and SQLite."""
+        removed = []
+
+        def should_remove(item):
+            if manifest.key(item) in keys:
+                removed.append(item)
+                return True
+            return False
+
+        count = remove_grocery_items(manifest.store, manifest.week, should_remove)
+        if self.write_db and removed:
+            delete_crawler_results(manifest.store, _db_week(week), [item["name"] for item in removed])
+        return count
+
+    def close(self):
+        self.downloader.close()
+        self.processor.close()
+        self.downloader.cache.save()
+        print(self.downloader.cache.report())
+
+
+def _db_week(week: Optional[str]) -> str:
+    """SQLite weekly_ad_starting_date of a YYYY-Www week; None is the current week."""
+    return week_start_date_of(week) if week else week_start_date()
+
+
+def _write_db(items, store, week: Optional[str] = None):
+    week_start = _db_week(week)
+
+    def rows():
+        for item in items:
+            with open(get_blob_path(item["image_digest"]), "rb") as f:
+                yield (store, week_start, item["name"], item["image_url"], f.read(), item["price"])
+
+    insert_crawler_results_many(rows(), upsert=True)
@@ -0,0 +1,188 @@
+"""Request routing shared by the Playwright crawlers.
+
+The weekly ad pages pull in fonts, videos, analytics and ad scripts that the
+extractors never look at, and `networkidle` waits for all of them.
+RequestBlocker routes every request of a browser context and
+- answers third-party tracker scripts and beacons (BLOCKED_HOSTS) with an
+  empty 200 response, so page code that calls them does not break;
+- aborts fonts and media (BLOCKED_RESOURCE_TYPES), plus page images when
+  block_images is set;
+- lets everything else through, including the ad data and the DOM the
+  extractors read. allowed_hosts always pass.
+
+At the end of a crawl report() prints how many requests were dropped and
+roughly how many bytes that saved. Blocked bodies are never downloaded, so
+the byte figure is estimated from the average size of allowed responses of
+the same resource type (or ESTIMATED_BYTES when none were seen).
+
+Usage:
+    context = browser.new_context()
+    blocker = RequestBlocker().install(context)
+    ...
+    print(blocker.report())
+"""
+import threading
+from collections import Counter
+from typing import Iterable, Optional
+from urllib.parse import urlsplit
+
+from crawler.crawler_configs import BLOCKED_HOSTS, BLOCKED_RESOURCE_TYPES
+
+# Typical transfer sizes used when no response of that type was allowed.
+ESTIMATED_BYTES = {
+    "font": 40 * 1024,
+    "media": 500 * 1024,
+    "image": 60 * 1024,
+    "script": 50 * 1024,
+}
+DEFAULT_ESTIMATED_BYTES = 5 * 1024
+
+# Empty bodies for stubbed tracker requests, by resource type.
+STUB_CONTENT_TYPES = {
+    "script": "application/javascript",
+    "stylesheet": "text/css",
+    "xhr": "application/json",
+    "fetch": "application/json",
+}
+
+
+def _host_matches(host: str, domains: Iterable[str]) -> bool:
+    return any(host == d or host.endswith("." + d) for d in domains)
+
+
+def _stub_response(request) -> dict:
+    return {
+        "status": 200,
+        "body": "",
+        "content_type": STUB_CONTENT_TYPES.get(request.resource_type, "text/plain"),
+    }
+
+
+class RequestBlocker:
+    """
+    Drop the requests a crawler does not need.
+
+    Args:
+        block_images (bool): Also abort page images.
+        resource_types (iterable, optional): Resource types to abort; defaults to BLOCKED_RESOURCE_TYPES.
+        blocked_hosts (iterable, optional): Tracker hosts to stub; defaults to BLOCKED_HOSTS.
+        allowed_hosts (iterable, optional): Hosts that are never blocked.
+    """
+
+    def __init__(
+        self,
+        block_images: bool = False,
+        resource_types: Optional[Iterable[str]] = None,
+        blocked_hosts: Optional[Iterable[str]] = None,
+        allowed_hosts: Iterable[str] = (),
+    ):
+        self.resource_types = set(BLOCKED_RESOURCE_TYPES if resource_types is None else resource_types)
+        if block_images:
+            self.resource_types.add("image")
+        self.blocked_hosts = tuple(BLOCKED_HOSTS if blocked_hosts is None else blocked_hosts)
+        self.allowed_hosts = tuple(allowed_hosts)
+        self._lock = threading.Lock()
+        self.allowed = 0
+        self.blocked = Counter()  # reason -> requests
+        self._blocked_types = Counter()  # resource type -> blocked requests
+        self._seen_bytes = Counter()  # resource type -> bytes of allowed responses
+        self._seen_counts = Counter()  # resource type -> allowed responses with a known size
+
+    def install(self, target):
+        """Route every request of a BrowserContext (or a single Page) through this blocker."""
+        target.route("**/*", self.handle_route)
+        target.on("response", self.handle_response)
+        return self
+
+    async def install_async(self, target):
+        """install() for the async Playwright API."""
+        await target.route("**/*", self.handle_route_async)
+        target.on("response", self.handle_response)
+        return self
+
+    def classify(self, url: str, resource_type: str) -> Optional[str]:
+        """Return why a request should be blocked ("tracker" or its resource type), or None."""
+        host = (urlsplit(url).hostname or "").lower()
+        if not host or _host_matches(host, self.allowed_hosts):
+            return None
+        if _host_matches(host, self.blocked_hosts):
+            return "tracker"
+        if resource_type in self.resource_types:
+            return resource_type
+        return None
+
+    def _count(self, request) -> Optional[str]:
+        reason = self.classify(request.url, request.resource_type)
+        with self._lock:
+            if reason is None:
+                self.allowed += 1
+            else:
+                self.blocked[reason] += 1
+                self._blocked_types[request.resource_type] += 1
+        return reason
+
+    def handle_route(self, route):
+        request = route.request
+        reason = self._count(request)
+        if reason is None:
+            route.continue_()
+        elif reason == "tracker":
+            route.fulfill(**_stub_response(request))
+        else:
+            route.abort("blockedbyclient")
+
+    async def handle_route_async(self, route):
+        request = route.request
+        reason = self._count(request)
+        if reason is None:
+            await route.continue_()
+        elif reason == "tracker":
+            await route.fulfill(**_stub_response(request))
+        else:
+            await route.abort("blockedbyclient")
+
+    def handle_response(self, response):
+        # headers are already on the Python side; no extra browser round-trip
+        length = (response.headers or {}).get("content-length")
+        if not length or not length.isdigit():
+            return
+        resource_type = response.request.resource_type
+        if self.classify(response.url, resource_type) is not None:
+            return  # our own stub
+        with self._lock:
+            self._seen_bytes[resource_type] += int(length)
+            self._seen_counts[resource_type] += 1
+
+    def estimated_bytes_saved(self) -> int:
+        with self._lock:
+            total = 0
+            for resource_type, count in self._blocked_types.items():
+                seen = self._seen_counts[resource_type]
+                if seen:
+                    size = self._seen_bytes[resource_type] / seen
+                else:
+                    size = ESTIMATED_BYTES.get(resource_type, DEFAULT_ESTIMATED_BYTES)
+                total += count * size
+            return int(total)
+
+    def stats(self) -> dict:
+        bytes_saved = self.estimated_bytes_saved()
+        with self._lock:
+            blocked = sum(self.blocked.values())
+            return {
+                "requests": self.allowed + blocked,
+                "allowed": self.allowed,
+                "blocked": blocked,
+                "blocked_by_reason": dict(self.blocked),
+                "bytes_saved": bytes_saved,
+            }
+
+    def report(self) -> str:
+        """One-line summary for the end of a crawl."""
+        s = self.stats()
+        reasons = ", ".join(f"{reason}: {n}" for reason, n in sorted(s["blocked_by_reason"].items()))
+        return (
+            f"Request blocking: {s['blocked']}/{s['requests']} requests blocked"
+            f"{f' ({reasons})' if reasons else ''}, "
+            f"~{s['bytes_saved'] / 2**20:.1f} MiB saved"
+        )
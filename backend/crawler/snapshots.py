@@ -0,0 +1,237 @@
+"""Offline extraction from saved weekly ad HTML.
+
+A crawl can save the rendered HTML of each ad page (save_snapshot, or
+`python -m crawler.orchestrator --snapshots`). The parsers here read those
+snapshots with lxml and apply the same selectors and rules as the browser
+extractors, producing the same raw items:
+- kroger:   .kds-Card Omni/Feature cards (kroger_cards.parse_card_record);
+- heb:      [data-component="product-card"] cards (heb_cards.parse_card_record);
+- tomthumb: button[data-product-id] hotspots, name and price from their
+            aria-label as in tomthumb.extract_tomthumb_deal.
+Re-parsing after a selector fix, or backfilling old weeks, then takes
+milliseconds per page and no browser. parse_snapshots() spreads many
+snapshots over a process pool.
+
+lxml is optional; without it the parsers raise RuntimeError.
+
+Usage (from backend/):
+    python -m crawler.snapshots grocery_data/kroger/2025-W01/snapshots/*.html
+    python -m crawler.snapshots --save grocery_data/heb/2025-W01/snapshots/*.html
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+try:
+    from lxml import html as lxml_html
+except ImportError:  # optional: only needed to parse snapshots
+    lxml_html = None
+
+from crawler.heb_cards import parse_card_record as parse_heb_record
+from crawler.kroger_cards import IMG_SRC_ATTRS
+from crawler.kroger_cards import parse_card_record as parse_kroger_record
+from crawler.storage import _write_atomic, current_week, get_store_week_folder
+
+SNAPSHOTS_DIRNAME = "snapshots"
+
+
+def get_snapshots_folder(store: str, week: Optional[str] = None, create_if_not_exists: bool = True) -> str:
+    """DATA_BASE_DIR/<store>/<week>/snapshots"""
+    week_folder = get_store_week_folder(store, week or current_week(), create_if_not_exists)
+    folder = os.path.join(week_folder, SNAPSHOTS_DIRNAME)
+    if create_if_not_exists:
+        os.makedirs(folder, exist_ok=True)
+    return folder
+
+
+def save_snapshot(store: str, html: str, week: Optional[str] = None, label: str = "page") -> str:
+    """Write one rendered page to the store/week snapshots folder; returns its path."""
+    name = f"{time.time_ns():020d}-{label}.html"
+    path = os.path.join(get_snapshots_folder(store, week), name)
+    _write_atomic(path, html.encode("utf-8"))
+    return path
+
+
+def snapshot_location(path: str):
+    """Return (store, week) for a path inside a snapshots folder, else (None, None)."""
+    folder = os.path.dirname(os.path.abspath(path))
+    if os.path.basename(folder) != SNAPSHOTS_DIRNAME:
+        return None, None
+    week_folder = os.path.dirname(folder)
+    return os.path.basename(os.path.dirname(week_folder)), os.path.basename(week_folder)
+
+
+def _has_class(name: str) -> str:
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+def _text(el) -> str:
+    return " ".join(el.text_content().split()) if el is not None else ""
+
+
+def _own_text(el) -> str:
+    """The element's direct text nodes, like XPath text() or the JS ownText helper."""
+    parts = [el.text or ""]
+    parts.extend(child.tail or "" for child in el)
+    return "".join(parts)
+
+
+def _first(elements):
+    return elements[0] if elements else None
+
+
+def _document(html: str):
+    if lxml_html is None:
+        raise RuntimeError("lxml is required to parse snapshots (pip install lxml)")
+    return lxml_html.fromstring(html)
+
+
+def parse_kroger(html: str) -> list:
+    """Omni/Feature deal cards, as kroger_cards.extract_card_records returns them."""
+    items = []
+    for card in _document(html).xpath(f"//*[{_has_class('kds-Card')}]"):
+        cls = card.get("class") or ""
+        kind = "omni" if "SWA-Omni" in cls else "feature" if "SWA-Feature" in cls else None
+        img = _first(card.xpath(".//img"))
+        record = {
+            "kind": kind,
+            "img_attrs": {a: img.get(a) for a in IMG_SRC_ATTRS if img is not None and img.get(a) is not None},
+            "alt": img.get("alt") if img is not None else None,
+        }
+        if kind == "omni":
+            record["descriptions"] = [
+                _text(el) for el in
+                card.xpath(f".//*[{_has_class('SWA-OmniDescriptionBlock')}]//*[{_has_class('kds-Text--m')}]")
+            ]
+            record["promo"] = _text(_first(card.xpath(f".//*[{_has_class('SWA-OmniPricePrefix')}]")))
+            price = _first(card.xpath(f".//*[{_has_class('SWA-OmniPriceHeading')}]"))
+        else:
+            record["descriptions"] = [
+                _text(el) for el in card.xpath(f".//*[{_has_class('SWA-FeatureDealDescription')}]")
+            ]
+            record["promo"] = ""
+            price = _first(card.xpath(f".//*[{_has_class('SWA-FeaturePriceHeading')}]"))
+        record["price"] = (price.get("aria-label") or _text(price)) if price is not None else ""
+
+        parsed = parse_kroger_record(record)
+        if parsed is None:
+            continue
+        name, image_url, price_text = parsed
+        items.append({"kind": kind, "name": name, "image_url": image_url, "price": price_text})
+    return items
+
+
+def parse_heb(html: str) -> list:
+    """Deals page product cards, as the H-E-B plugin extracts them."""
+    items = []
+    for card in _document(html).xpath('//*[@data-component="product-card"]'):
+        img = _first(card.xpath(".//img"))
+        elements = card.xpath(".//*")
+        record = {
+            "image_url": (img.get("src") or "") if img is not None else "",
+            "alt": (img.get("alt") or "") if img is not None else "",
+            "titles": [_text(el) for el in card.xpath('.//*[@data-qe-id="productTitle"]//span')],
+            "prices": [_text(el) for el in elements if "$" in _own_text(el)],
+            "unit_prices": [_text(el) for el in elements if " / " in _own_text(el)],
+            "has_coupon": any("coupon" in _own_text(el).lower() for el in elements),
+            "buttons": [_text(el) for el in card.xpath(".//button")],
+        }
+        items.append(parse_heb_record(record))
+    return items
+
+
+def parse_tomthumb(html: str) -> list:
+    """
+    Flyer hotspots; name and price come from the aria-label, as in
+    tomthumb.extract_tomthumb_deal. The hotspots carry no image, so
+    image_url is empty unless a button wraps one.
+    """
+    items = []
+    for button in _document(html).xpath("//button[@data-product-id]"):
+        # Expected format: "Product Name, , $1.99 lb member price . Select for details."
+        label = (button.get("aria-label") or "").strip()
+        parts = label.split("$")
+        if len(parts) < 2:
+            continue
+        img = _first(button.xpath(".//img"))
+        items.append({
+            "id": button.get("data-product-id"),
+            "name": parts[0].split(",")[0].strip(),
+            "price": "$" + parts[1].split(" ")[0].strip(),
+            "image_url": (img.get("src") or "") if img is not None else "",
+        })
+    return items
+
+
+SNAPSHOT_PARSERS = {
+    "kroger": parse_kroger,
+    "heb": parse_heb,
+    "tomthumb": parse_tomthumb,
+}
+
+
+def parse_snapshot(path: str, store: Optional[str] = None) -> list:
+    """
+    Parse one snapshot file; the store defaults to the one in its path.
+
+    Raises:
+        ValueError: If the store is unknown or cannot be inferred.
+    """
+    store = store or snapshot_location(path)[0]
+    if store not in SNAPSHOT_PARSERS:
+        raise ValueError(f"No snapshot parser for store {store!r} ({path})")
+    with open(path, "r", encoding="utf-8") as f:
+        return SNAPSHOT_PARSERS[store](f.read())
+
+
+def parse_snapshots(paths, store: Optional[str] = None, max_workers: Optional[int] = None) -> dict:
+    """Parse many snapshots in worker processes; returns path -> items, in input order."""
+    paths = list(paths)
+    if len(paths) <= 1:
+        return {path: parse_snapshot(path, store) for path in paths}
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        results = pool.map(parse_snapshot, paths, [store] * len(paths))
+        return dict(zip(paths, results))
+
+
+async def _save_all(parsed: dict, store: Optional[str]) -> int:
+    from crawler.pipeline import ItemPipeline
+
+    pipeline = ItemPipeline()
+    saved = 0
+    try:
+        for path, items in parsed.items():
+            path_store, week = snapshot_location(path)
+            saved += await pipeline.run(store or path_store, items, week=week)
+    finally:
+        pipeline.close()
+    return saved
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Extract weekly ad items from saved HTML snapshots")
+    ap.add_argument("paths", nargs="+", help="Snapshot files")
+    ap.add_argument("--store", choices=sorted(SNAPSHOT_PARSERS), help="Store (default: from each path)")
+    ap.add_argument("--workers", type=int, default=None, help="Parser processes (default: CPU count)")
+    ap.add_argument("--save", action="store_true",
+                    help="Download, process and save the items for the snapshot's week")
+    args = ap.parse_args()
+
+    started = time.perf_counter()
+    parsed = parse_snapshots(args.paths, args.store, args.workers)
+    elapsed = time.perf_counter() - started
+    for path, items in parsed.items():
+        print(f"{path}: {len(items)} item(s)")
+    print(f"Parsed {len(parsed)} snapshot(s), {sum(map(len, parsed.values()))} item(s) in {elapsed * 1000:.0f} ms")
+    if args.save:
+        print(f"Saved {asyncio.run(_save_all(parsed, args.store))} item(s)")
+    else:
+        print(json.dumps(parsed, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,587 @@
+"""File-system storage for crawled weekly ads.
+
+Kept free of browser tooling so the API process can import it cheaply;
+crawler.utility re-exports these functions for the crawler scripts.
+"""
+import errno
+import os
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import date
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from crawler.crawler_configs import FILE_SYSTEM_CONFIG
+from crawler.item_keys import item_key
+
+
+def current_week():
+    """Return the current week in the YYYY-Www format used for store/week folders."""
+    return date.today().strftime("%Y-W%U")
+
+
+def get_store_week_folder(storename: str, week: str, create_if_not_exists: bool = True):
+    """
+    Generate standardized folder path for a store's weekly data.
+    Structure: BASE_DIR/storename/weekstartdate/
+
+    This folder will contain:
+    - JSON file with grocery items
+    - Image files for that week's items
+
+    Args:
+        storename (str): Name of the store (e.g., "kroger", "heb").
+        week (str): Week in YYYY-Www format (e.g., "2024-W52").
+        create_if_not_exists (bool): If True, creates the folder if it doesn't exist.
+
+    Returns:
+        str: Absolute path to the store/week folder.
+    """
+    base_dir = FILE_SYSTEM_CONFIG.get(
+        "DATA_BASE_DIR", os.path.join(os.path.dirname(__file__), "grocery_data")
+    )
+    store_week_folder = os.path.join(base_dir, storename, week)
+
+    if create_if_not_exists and not os.path.exists(store_week_folder):
+        os.makedirs(store_week_folder, exist_ok=True)
+
+    return store_week_folder
+
+
+def get_json_file_path(storename: str, week: str, create_if_not_exists: bool = True):
+    """
+    Get the JSON file path for storing grocery items.
+
+    Args:
+        storename (str): Name of the store.
+        week (str): Week in YYYY-Www format.
+        create_if_not_exists (bool): If True, creates the store/week folder if it doesn't exist.
+
+    Returns:
+        str: Absolute path to the JSON file.
+    """
+    folder = get_store_week_folder(storename, week, create_if_not_exists)
+    return os.path.join(folder, "weekly_ad.json")
+
+
+class WeeklyAdCache:
+    """
+    Bounded LRU cache of parsed weekly ads keyed by (store, week).
+
+    Entries hold weekly_ad.json with its pending segments merged in (see
+    _load_store_week). Each entry remembers the file's mtime and size and the
+    segments folder's mtime when it was loaded, so a rewritten file or an
+    added or compacted segment is detected on the next lookup with two
+    stat() calls. Besides the parsed list the
+    entry keeps the compact JSON encoding, letting the API answer a hot week
+    without re-parsing or re-encoding it.
+
+    Args:
+        max_entries (int): Maximum number of store/week entries kept.
+        max_bytes (int): Cap on the summed size of the cached JSON payloads.
+    """
+
+    def __init__(self, max_entries: int = 64, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, storename: str, week: str):
+        """
+        Return the cached (data, payload) for the store/week, loading it on a miss.
+
+        Raises:
+            FileNotFoundError: If no weekly ad file exists for the store and week.
+        """
+        file_path = get_json_file_path(storename, week, create_if_not_exists=False)
+        signature = (_stat_signature(file_path), _stat_signature(_segments_path(storename, week), size=False))
+        key = (storename, week)
+        if signature == (None, None):
+            self.invalidate(storename, week)
+            raise _missing_week(storename, week)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == signature:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1], entry[2]
+            self.misses += 1
+
+        try:
+            data = _load_store_week(storename, week)
+        except FileNotFoundError:
+            self.invalidate(storename, week)
+            raise
+        payload = json.dumps(data, separators=(",", ":")).encode("utf-8")
+
+        with self._lock:
+            self._discard(key)
+            if len(payload) <= self.max_bytes:
+                self._entries[key] = (signature, data, payload)
+                self._bytes += len(payload)
+                while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                    oldest = next(iter(self._entries))
+                    self._discard(oldest)
+                    self.evictions += 1
+        return data, payload
+
+    def invalidate(self, storename: str, week: str):
+        """Drop the entry for a store/week, e.g. after its file was rewritten."""
+        with self._lock:
+            self._discard((storename, week))
+
+    def clear(self):
+        """Drop every entry and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> dict:
+        """Return hit/miss/eviction counters and current memory use."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry[2])
+
+
+WEEKLY_AD_CACHE = WeeklyAdCache(
+    max_entries=FILE_SYSTEM_CONFIG.get("WEEKLY_AD_CACHE_MAX_ENTRIES", 64),
+    max_bytes=FILE_SYSTEM_CONFIG.get("WEEKLY_AD_CACHE_MAX_BYTES", 64 * 1024 * 1024),
+)
+
+
+SEGMENTS_DIRNAME = "segments"
+LOCK_FILENAME = "weekly_ad.lock"
+# Every stored item carries its key, so merges never re-derive it.
+ITEM_KEY_FIELD = "item_key"
+
+
+def weekly_item_key(storename: str, week: str, item: dict) -> str:
+    """The item's key in the store/week (see crawler.item_keys)."""
+    return item_key(storename, week, item.get("name"), item.get("price"), item.get("image_digest"))
+
+
+def _upsert_items(storename: str, week: str, items) -> list:
+    """Keep one item per key, in first-seen order; a later repeat replaces the earlier item."""
+    merged = []
+    positions = {}
+    for item in items:
+        key = item.get(ITEM_KEY_FIELD) or weekly_item_key(storename, week, item)
+        item = {**item, ITEM_KEY_FIELD: key}
+        if key in positions:
+            merged[positions[key]] = item
+        else:
+            positions[key] = len(merged)
+            merged.append(item)
+    return merged
+
+
+# Windows: msvcrt.LK_LOCK gives up after ~10 s of contention; retry it this
+# many times before giving up on the lock.
+MSVCRT_LOCK_ATTEMPTS = 30
+_LOCK_CONTENTION_ERRNOS = (errno.EACCES, errno.EDEADLK)
+
+
+def _segments_path(storename: str, week: str) -> str:
+    return os.path.join(get_store_week_folder(storename, week, create_if_not_exists=False), SEGMENTS_DIRNAME)
+
+
+def get_segments_folder(storename: str, week: str, create_if_not_exists: bool = True):
+    """
+    Folder holding the not-yet-compacted JSON Lines segments of a store/week.
+
+    Returns:
+        str: Absolute path to BASE_DIR/storename/week/segments/.
+    """
+    folder = _segments_path(storename, week)
+    if create_if_not_exists:
+        os.makedirs(folder, exist_ok=True)
+    return folder
+
+
+@contextmanager
+def _exclusive_lock(lock_path: str):
+    """Hold an exclusive OS-level lock on lock_path (works across processes)."""
+    with open(lock_path, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            attempts = 0
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError as e:
+                    attempts += 1
+                    if e.errno not in _LOCK_CONTENTION_ERRNOS:
+                        raise
+                    if attempts >= MSVCRT_LOCK_ATTEMPTS:
+                        raise TimeoutError(f"Timed out waiting for the lock on {lock_path}") from e
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _write_atomic(path: str, data: bytes):
+    """Write data to a temp file next to path, fsync it, then rename over path."""
+    tmp_path = f"{path}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _pending_segments(segments_folder: str) -> list:
+    """Sorted names of complete segments (temp files are still being written)."""
+    try:
+        names = [n for n in os.listdir(segments_folder) if n.endswith(".jsonl")]
+    except FileNotFoundError:
+        return []
+    return sorted(names)
+
+
+def _stat_signature(path: str, size: bool = True):
+    """(mtime_ns, size) of path, or just mtime_ns with size=False; None when it does not exist."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size) if size else st.st_mtime_ns
+
+
+def _missing_week(storename: str, week: str) -> FileNotFoundError:
+    file_path = get_json_file_path(storename, week, create_if_not_exists=False)
+    return FileNotFoundError(
+        f"No weekly ad file found for store '{storename}' and week '{week}' at {file_path}"
+    )
+
+
+def _read_weekly_file(file_path: str) -> list:
+    """Items in a weekly_ad.json; [] when it is unreadable or not a list."""
+    with open(file_path, "r", encoding="utf-8") as f:
+        try:
+            items = json.load(f)
+        except json.JSONDecodeError:
+            return []
+    return items if isinstance(items, list) else []
+
+
+def _read_segments(segments_folder: str, names) -> list:
+    """Items of the named segments, in order; segments that are gone are skipped."""
+    items = []
+    for name in names:
+        try:
+            with open(os.path.join(segments_folder, name), "r", encoding="utf-8") as f:
+                items.extend(json.loads(line) for line in f if line.strip())
+        except FileNotFoundError:
+            continue
+    return items
+
+
+def _load_store_week(storename: str, week: str) -> list:
+    """
+    Items of a store/week: weekly_ad.json with its pending segments upserted
+    in memory, exactly as compaction would, but without writing or locking.
+
+    Segments are read before the file. Compaction writes the file before it
+    deletes the segments, so a segment that vanishes meanwhile is already in
+    the file, and one read from both places is upserted once.
+
+    Raises:
+        FileNotFoundError: If the store/week has neither a file nor segments.
+    """
+    segments_folder = _segments_path(storename, week)
+    new_items = _read_segments(segments_folder, _pending_segments(segments_folder))
+    try:
+        with open(get_json_file_path(storename, week, create_if_not_exists=False), "r", encoding="utf-8") as f:
+            items = json.load(f)
+    except FileNotFoundError:
+        if not new_items:
+            raise _missing_week(storename, week)
+        items = []
+    if not new_items:
+        return items
+    return _upsert_items(storename, week, items + new_items)
+
+
+def save_grocery_items(data, storename, week=None):
+    """
+    Save a list of grocery items for a store/week.
+
+    Each call writes one new JSON Lines segment (temp file + atomic rename),
+    so a save costs O(batch), a crash never leaves a half-written segment
+    visible, and concurrent crawlers never overwrite each other. Readers merge
+    pending segments in memory; the crawler (or the compact CLI) folds them
+    into weekly_ad.json with compact_store_week.
+    Items are saved with their item key (store, week, name, price, image
+    digest); saving an item again replaces it instead of adding a copy.
+
+    Args:
+        data (list): List of dictionaries containing grocery item data.
+        storename (str): Name of the store (e.g., "kroger", "heb").
+        week (str, optional): Week in YYYY-Www format. If None, uses current week.
+
+    Returns:
+        str: Path of the segment that was written, or None if data was empty.
+
+    Raises:
+        ValueError: If data is not a list of dictionaries.
+    """
+    # Validate input data
+    if not isinstance(data, list) or not all(isinstance(d, dict) for d in data):
+        raise ValueError("Data must be a list of dictionaries.")
+
+    # Get current week if not provided
+    if week is None:
+        week = current_week()
+
+    if not data:
+        return None
+
+    lines = "".join(
+        json.dumps({**item, ITEM_KEY_FIELD: weekly_item_key(storename, week, item)}, separators=(",", ":")) + "\n"
+        for item in data
+    )
+    # Time-ordered names keep batches in save order; pid + random suffix avoid clashes.
+    name = f"{time.time_ns():020d}-{os.getpid()}-{uuid.uuid4().hex[:8]}.jsonl"
+    segment_path = os.path.join(get_segments_folder(storename, week), name)
+    _write_atomic(segment_path, lines.encode("utf-8"))
+    WEEKLY_AD_CACHE.invalidate(storename, week)
+
+    print(f"Data saved to {segment_path}")
+    return segment_path
+
+
+def _merge_store_week(storename: str, week: str, rewrite: bool = False) -> tuple:
+    """
+    Upsert pending segments into weekly_ad.json by item key.
+
+    Runs under an exclusive file lock so concurrent merges serialize. The new
+    file is written to a temp file and atomically renamed, and only then are
+    the merged segments deleted. A crash between those two steps leaves the
+    segments in place; merging them again is harmless because it upserts.
+    With `rewrite` the file is re-keyed and deduped even without segments.
+
+    Returns:
+        tuple: (items merged from segments, repeated items dropped).
+    """
+    folder = get_store_week_folder(storename, week, create_if_not_exists=False)
+    segments_folder = os.path.join(folder, SEGMENTS_DIRNAME)
+    if not os.path.isdir(folder) or not (rewrite or _pending_segments(segments_folder)):
+        return 0, 0
+
+    with _exclusive_lock(os.path.join(folder, LOCK_FILENAME)):
+        # Another process may have compacted while we waited for the lock.
+        names = _pending_segments(segments_folder)
+        if not (rewrite or names):
+            return 0, 0
+
+        file_path = get_json_file_path(storename, week, create_if_not_exists=False)
+        items = _read_weekly_file(file_path) if os.path.exists(file_path) else []
+        new_items = _read_segments(segments_folder, names)
+
+        merged = _upsert_items(storename, week, items + new_items)
+        if names or merged != items:
+            _write_atomic(file_path, json.dumps(merged, separators=(",", ":")).encode("utf-8"))
+        for name in names:
+            os.remove(os.path.join(segments_folder, name))
+
+    WEEKLY_AD_CACHE.invalidate(storename, week)
+    return len(new_items), len(items) + len(new_items) - len(merged)
+
+
+def compact_store_week(storename: str, week: str) -> int:
+    """
+    Merge pending segments into the read-optimized weekly_ad.json.
+
+    Items are upserted by their item key, so a retried or repeated save
+    replaces the stored item instead of duplicating it.
+
+    Returns:
+        int: Number of items merged from segments.
+    """
+    return _merge_store_week(storename, week)[0]
+
+
+def dedupe_store_week(storename: str, week: str) -> int:
+    """
+    Merge pending segments and drop repeated items from weekly_ad.json,
+    including those saved before items were keyed.
+
+    Returns:
+        int: Number of repeated items dropped.
+    """
+    return _merge_store_week(storename, week, rewrite=True)[1]
+
+
+def remove_grocery_items(storename: str, week: str, should_remove) -> int:
+    """
+    Drop the saved items of a store/week for which should_remove(item) is true.
+
+    Pending segments are compacted first, then weekly_ad.json is rewritten
+    under the same lock compaction uses.
+
+    Returns:
+        int: Number of items removed.
+    """
+    compact_store_week(storename, week)
+    folder = get_store_week_folder(storename, week, create_if_not_exists=False)
+    file_path = get_json_file_path(storename, week, create_if_not_exists=False)
+    if not os.path.exists(file_path):
+        return 0
+
+    with _exclusive_lock(os.path.join(folder, LOCK_FILENAME)):
+        with open(file_path, "r", encoding="utf-8") as f:
+            items = json.load(f)
+        kept = [item for item in items if not should_remove(item)]
+        removed = len(items) - len(kept)
+        if removed:
+            _write_atomic(file_path, json.dumps(kept, separators=(",", ":")).encode("utf-8"))
+
+    if removed:
+        WEEKLY_AD_CACHE.invalidate(storename, week)
+    return removed
+
+
+def _iter_store_weeks():
+    """Yield (storename, week folder path) for every store/week under DATA_BASE_DIR."""
+    base_dir = FILE_SYSTEM_CONFIG.get(
+        "DATA_BASE_DIR", os.path.join(os.path.dirname(__file__), "grocery_data")
+    )
+    if not os.path.isdir(base_dir):
+        return
+    for storename in sorted(os.listdir(base_dir)):
+        store_dir = os.path.join(base_dir, storename)
+        if not os.path.isdir(store_dir):
+            continue
+        for week in sorted(os.listdir(store_dir)):
+            if os.path.isdir(os.path.join(store_dir, week)):
+                yield storename, week
+
+
+def compact_all() -> int:
+    """
+    Compact every store/week under DATA_BASE_DIR that has pending segments.
+
+    Returns:
+        int: Number of store/week folders compacted.
+    """
+    compacted = 0
+    for storename, week in _iter_store_weeks():
+        if compact_store_week(storename, week):
+            compacted += 1
+    return compacted
+
+
+def dedupe_all() -> int:
+    """
+    Dedupe every store/week with a weekly ad under DATA_BASE_DIR.
+
+    Returns:
+        int: Number of repeated items dropped.
+    """
+    dropped = 0
+    for storename, week in _iter_store_weeks():
+        if os.path.exists(get_json_file_path(storename, week, create_if_not_exists=False)) or \
+                _pending_segments(get_segments_folder(storename, week, create_if_not_exists=False)):
+            dropped += dedupe_store_week(storename, week)
+    return dropped
+
+
+def get_store_ads(storename: str, week: str) -> list:
+    """
+    Retrieve weekly ad for a store for a particular week from a JSON file.
+    Pending segments are merged in memory; reads never compact or lock.
+    Parsed files are served from WEEKLY_AD_CACHE until the file changes on disk,
+    so the returned list is shared and must be treated as read-only.
+
+    Args:
+        storename (str): Name of the store (e.g., "kroger", "heb").
+        week (str): Week in YYYY-Www format (e.g., "2024-W52").
+
+    Returns:
+        list: List of item dictionaries as saved by save_grocery_items.
+              Format: [{"name": str, "price": str, "image": str, ...}, ...]
+
+    Raises:
+        FileNotFoundError: If no weekly ad file is found for the store and week.
+    """
+    data, _ = WEEKLY_AD_CACHE.get(storename, week)
+    return data
+
+
+def get_store_ads_json(storename: str, week: str) -> bytes:
+    """
+    Same as get_store_ads but returns the cached, already-encoded JSON bytes.
+
+    Raises:
+        FileNotFoundError: If no weekly ad file is found for the store and week.
+    """
+    _, payload = WEEKLY_AD_CACHE.get(storename, week)
+    return payload
+
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Weekly ad file store maintenance")
+    ap.add_argument("command", choices=["compact", "dedupe"])
+    ap.add_argument("--store", default=None, help="Only this store (requires --week)")
+    ap.add_argument("--week", default=None, help="Week in YYYY-Www format")
+    ap.add_argument("--db", action="store_true",
+                    help="dedupe: also migrate the SQLite store, which drops its duplicate rows and orphaned images")
+    args = ap.parse_args()
+
+    if args.command == "dedupe":
+        if args.store and args.week:
+            print(f"Dropped {dedupe_store_week(args.store, args.week)} repeated item(s)")
+        else:
+            print(f"Dropped {dedupe_all()} repeated item(s)")
+        if args.db:
+            from db_engine.sqlite_engine import delete_orphaned_images, init_db
+
+            init_db()
+            print("SQLite store is keyed by item")
+            print(f"Deleted {delete_orphaned_images()} orphaned image(s)")
+    elif args.store and args.week:
+        print(f"Merged {compact_store_week(args.store, args.week)} item(s)")
+    else:
+        print(f"Compacted {compact_all()} store/week folder(s)")
@@ -0,0 +1,32 @@
+"""Store plugin registry.
+
+Each module in this package defines a StorePlugin subclass for one store
+and registers it with @register. crawler.orchestrator runs any set of the
+registered stores:
+
+    python -m crawler.orchestrator --stores kroger heb
+
+Adding a store means adding a module here with its navigate/extract logic
+and importing it at the bottom of this file.
+"""
+from crawler.stores.base import StorePlugin
+
+STORE_PLUGINS = {}
+
+
+def register(plugin_cls):
+    """Class decorator adding a StorePlugin subclass to STORE_PLUGINS under its name."""
+    if not plugin_cls.name:
+        raise ValueError(f"{plugin_cls.__name__} has no store name")
+    if plugin_cls.name in STORE_PLUGINS:
+        raise ValueError(f"Store plugin {plugin_cls.name!r} is already registered")
+    STORE_PLUGINS[plugin_cls.name] = plugin_cls
+    return plugin_cls
+
+
+def get_plugin(name: str) -> StorePlugin:
+    """Return a fresh plugin instance for `name`; raises KeyError for unknown stores."""
+    return STORE_PLUGINS[name]()
+
+
+from crawler.stores import heb, kroger, tomthumb  # noqa: E402,F401 - register the plugins
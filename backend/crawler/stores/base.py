@@ -0,0 +1,77 @@
+"""Base class for store plugins."""
+import asyncio
+import os
+from typing import Optional
+from urllib.parse import urlsplit
+
+from crawler.snapshots import save_snapshot
+from crawler.utility import load_cookie_export
+
+
+class StorePlugin:
+    """
+    One store's weekly ad crawl.
+
+    Subclasses set `name` and `url` and implement extract(); navigate(),
+    prepare() and normalize_image_url() have working defaults. A fresh
+    instance is made per crawl, so plugins may keep per-crawl state on self.
+    Everything after extraction is done by crawler.pipeline.ItemPipeline.
+    """
+
+    name: str = ""
+    url: str = ""
+    storage_state: Optional[str] = None  # Playwright storage state JSON
+    cookies: Optional[str] = None  # browser-extension cookie export
+    block_images: bool = False
+    # Save the rendered HTML of each ad page for offline re-parsing (crawler.snapshots).
+    save_snapshots: bool = False
+
+    @property
+    def site(self) -> str:
+        host = urlsplit(self.url).hostname or ""
+        return host[4:] if host.startswith("www.") else host
+
+    def context_options(self) -> dict:
+        """Extra browser-context options (the storage state, when it exists)."""
+        if self.storage_state and os.path.exists(self.storage_state):
+            return {"storage_state": self.storage_state}
+        return {}
+
+    async def prepare(self, context):
+        """Set up a fresh browser context, e.g. load cookies, before the first page opens."""
+        if self.cookies and os.path.exists(self.cookies):
+            await context.add_cookies(load_cookie_export(self.cookies))
+
+    async def navigate(self, page):
+        """Bring the page to the weekly ad."""
+        await page.goto(self.url, wait_until="load")
+
+    async def extract(self, page) -> list:
+        """Return raw items: dicts with "name", "image_url" and "price" (plus any extras)."""
+        raise NotImplementedError
+
+    async def ad_id(self, page) -> Optional[str]:
+        """Identify the crawled ad for the crawl manifest; override when the site names its ads."""
+        return self.url
+
+    async def page_html(self, page) -> str:
+        """The rendered ad markup to snapshot; override when the ad lives in an iframe."""
+        return await page.content()
+
+    async def maybe_snapshot(self, page):
+        """Save a snapshot of `page` when save_snapshots is set; plugins call this once the ad has rendered."""
+        if self.save_snapshots:
+            html = await self.page_html(page)
+            await asyncio.to_thread(save_snapshot, self.name, html)
+
+    def normalize_image_url(self, url: str) -> str:
+        """Rewrite an image URL before download (e.g. to a stable CDN host)."""
+        return url
+
+    async def crawl(self, context, pipeline) -> int:
+        """Run the crawl in `context` and feed the items to `pipeline`; returns items saved."""
+        await self.prepare(context)
+        page = await context.new_page()
+        await self.navigate(page)
+        raw_items = await self.extract(page)
+        return await pipeline.run(self.name, raw_items, self.normalize_image_url, ad_id=await self.ad_id(page))
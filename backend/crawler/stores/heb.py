@@ -0,0 +1,45 @@
+"""H-E-B weekly ad deals plugin.
+
+Reads each deals page with one page.evaluate() (heb_cards) and follows the
+pagination links.
+"""
+from urllib.parse import urljoin
+
+from crawler.heb_cards import CARD_RECORDS_JS, CARD_SELECTOR, parse_card_record
+from crawler.stores import register
+from crawler.stores.base import StorePlugin
+
+NEXT_SELECTOR = '[data-qe-id="paginationNext"]'
+# Store whose prices the deals page shows.
+HEB_STORE_ID = "796"
+# Safety stop for the pagination loop.
+MAX_PAGES = 50
+
+
+@register
+class HebPlugin(StorePlugin):
+    name = "heb"
+    url = "https://www.heb.com/weekly-ad/deals"
+
+    async def prepare(self, context):
+        await super().prepare(context)
+        await context.add_cookies([{
+            "name": "SHOPPING_STORE_ID",
+            "value": HEB_STORE_ID,
+            "domain": "www.heb.com",
+            "path": "/",
+            "secure": True,
+        }])
+
+    async def extract(self, page) -> list:
+        items = []
+        for _ in range(MAX_PAGES):
+            await page.wait_for_selector(CARD_SELECTOR, timeout=20000)
+            await self.maybe_snapshot(page)
+            items.extend(parse_card_record(r) for r in await page.evaluate(CARD_RECORDS_JS, CARD_SELECTOR))
+            next_link = page.locator(NEXT_SELECTOR)
+            next_href = await next_link.first.get_attribute("href") if await next_link.count() else None
+            if not next_href:
+                break
+            await page.goto(urljoin(page.url, next_href), wait_until="load")
+        return items
@@ -0,0 +1,92 @@
+"""Kroger weekly ad plugin."""
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+from crawler.crawler_configs import BASE_DIR
+from crawler.kroger_cards import CARD_SELECTOR, extract_card_records_async, process_image_url
+from crawler.stores import register
+from crawler.stores.base import StorePlugin
+
+
+HOME_URL = "https://www.kroger.com/"
+WEEKLY_AD_SELECTORS = [
+    'a[href^="/weeklyad"]',
+    'a:has-text("Weekly Ad")',
+    'button:has-text("Weekly Ad")',
+]
+VIEW_AD_SELECTORS = ['button[aria-label^="View Ad"]', 'button:has-text("View Ad")']
+
+
+async def try_click(page, selectors, timeout=5000) -> bool:
+    """Click the first match of the first selector that matches anything; False when none could be clicked."""
+    for sel in selectors:
+        try:
+            locator = page.locator(sel)
+            if await locator.count() == 0:
+                continue
+            await locator.first.click(timeout=timeout)
+            return True
+        except Exception:
+            continue
+    return False
+
+
+@register
+class KrogerPlugin(StorePlugin):
+    name = "kroger"
+    url = "https://www.kroger.com/weeklyad"
+    storage_state = str(BASE_DIR / "state.json")
+
+    def __init__(self):
+        self.picked_ad = None
+
+    async def navigate(self, page):
+        # Arrive through the home page, like a visitor, and fall back to the
+        # ad URL when the Weekly Ad link is not found.
+        await page.goto(HOME_URL, wait_until="load")
+        if await try_click(page, WEEKLY_AD_SELECTORS, timeout=5000):
+            try:
+                await page.wait_for_url("**/weeklyad**", timeout=10000)
+            except PlaywrightTimeoutError:
+                print("[kroger] Timed out waiting for /weeklyad; continuing anyway")
+        else:
+            print("[kroger] No Weekly Ad link found; opening /weeklyad directly")
+            await page.goto(self.url, wait_until="load")
+        try:
+            await page.wait_for_load_state("networkidle", timeout=15000)
+        except PlaywrightTimeoutError:
+            pass
+
+        # Open the current ad from the ad picker when it is offered.
+        try:
+            view_other = page.locator('[data-testid="ViewOtherAdsButton"]').first
+            await view_other.wait_for(state="visible", timeout=8000)
+            await view_other.click()
+        except Exception:
+            print("[kroger] View Other Ads not found by data-testid; trying its text")
+            await try_click(page, ['button:has-text("View Other Ads")', "text=View Other Ads"], timeout=5000)
+        try:
+            ad_button = page.locator('[data-testid^="ViewAd-"]').first
+            await ad_button.wait_for(state="visible", timeout=10000)
+            self.picked_ad = await ad_button.get_attribute("data-testid")
+            await ad_button.click()
+        except Exception:
+            print("[kroger] No ViewAd-* button; trying the View Ad labels")
+            if not await try_click(page, VIEW_AD_SELECTORS, timeout=7000):
+                print("[kroger] Ad picker not found; using the default weekly ad")
+        try:
+            await page.wait_for_load_state("networkidle", timeout=15000)
+        except PlaywrightTimeoutError:
+            pass
+        await page.wait_for_selector(CARD_SELECTOR, timeout=20000)
+        await self.maybe_snapshot(page)
+
+    async def extract(self, page) -> list:
+        # Cards without a price are banners, not deals.
+        return [r for r in await extract_card_records_async(page) if r["price"]]
+
+    async def ad_id(self, page):
+        # "ViewAd-<id>" of the picked ad; the default ad has no id of its own
+        return self.picked_ad or self.url
+
+    def normalize_image_url(self, url: str) -> str:
+        return process_image_url(url)
@@ -0,0 +1,40 @@
+"""Tom Thumb weekly ad plugin (Flipp flyer, read from its JSON responses)."""
+from crawler.crawler_configs import FILE_SYSTEM_CONFIG
+from crawler.stores import register
+from crawler.stores.base import StorePlugin
+from crawler.tomthumb_network import FlyerResponseCollector
+
+
+@register
+class TomThumbPlugin(StorePlugin):
+    """
+    Only the network mode of tomthumb_playwright runs here; when no flyer
+    data shows up the crawl fails instead of clicking through for minutes.
+    """
+
+    name = "tomthumb"
+    url = "https://www.tomthumb.com/weeklyad"
+    cookies = FILE_SYSTEM_CONFIG["TOMTHUMB_COOKIES_PATH"]
+    # nothing is read from the rendered flyer
+    block_images = True
+
+    def __init__(self):
+        self.collector = FlyerResponseCollector()
+
+    async def navigate(self, page):
+        # listen before navigating so the flyer's first data requests are seen
+        self.collector.attach_async(page)
+        await page.goto(self.url, wait_until="load")
+        await page.wait_for_selector("iframe.mainframe", timeout=20000)
+
+    async def page_html(self, page) -> str:
+        # the flyer and its product buttons live in the main iframe
+        frame = await (await page.wait_for_selector("iframe.mainframe")).content_frame()
+        return await frame.content()
+
+    async def extract(self, page) -> list:
+        products = await self.collector.wait_for_products_async(page)
+        await self.maybe_snapshot(page)
+        if not products:
+            raise RuntimeError("no flyer data captured; run python -m crawler.tomthumb_playwright for the click-through mode")
+        return list(products.values())
@@ -0,0 +1,66 @@
+"""Flyer -> product button mapping for the Tom Thumb weekly ad frame.
+
+The flyer is made of `sfml-flyer-image` elements, each overlaid with
+`button[data-product-id]` hotspots. read_flyer_buttons() collects every
+flyer and button (with its product id and aria-label) in one evaluate()
+call, instead of asking the browser about each (flyer, button) pair, and
+group_buttons_by_flyer() does the grouping in Python.
+"""
+
+FLYER_SELECTOR = "sfml-flyer-image"
+BUTTON_SELECTOR = "button[data-product-id]"
+
+# Runs in the frame. Button indices follow document order, matching
+# frame.locator(BUTTON_SELECTOR).nth(index).
+FLYER_BUTTONS_JS = """
+([flyerSelector, buttonSelector]) => {
+  const flyers = Array.from(document.querySelectorAll(flyerSelector));
+  const flyerIndex = new Map(flyers.map((el, i) => [el, i]));
+  return {
+    flyers: flyers.map((el, i) => ({
+      index: i,
+      id: el.getAttribute("sfml-anchor-id") || el.getAttribute("id") || null,
+    })),
+    buttons: Array.from(document.querySelectorAll(buttonSelector), (el, i) => {
+      const flyer = el.closest(flyerSelector);
+      return {
+        index: i,
+        flyer_index: flyer && flyerIndex.has(flyer) ? flyerIndex.get(flyer) : null,
+        product_id: el.getAttribute("data-product-id"),
+        global_id: el.getAttribute("data-global-id"),
+        label: el.getAttribute("aria-label") || el.getAttribute("label") || "",
+      };
+    }),
+  };
+}
+"""
+
+
+def read_flyer_buttons(frame) -> dict:
+    """
+    Read all flyers and product buttons of the frame in one round-trip.
+
+    Returns:
+        dict: {"flyers": [{index, id}], "buttons": [{index, flyer_index,
+        product_id, global_id, label}]}
+    """
+    return frame.evaluate(FLYER_BUTTONS_JS, [FLYER_SELECTOR, BUTTON_SELECTOR])
+
+
+def group_buttons_by_flyer(snapshot: dict) -> dict:
+    """
+    Map flyer id -> indices of the buttons inside that flyer, in document order.
+
+    Flyers without an sfml-anchor-id or id are named "flyer-<index>"; flyers
+    without buttons and buttons outside any flyer are left out.
+    """
+    flyer_ids = {
+        flyer["index"]: flyer["id"] or f"flyer-{flyer['index']}" for flyer in snapshot["flyers"]
+    }
+    groups = {}
+    for button in snapshot["buttons"]:
+        flyer_index = button["flyer_index"]
+        if flyer_index is None:
+            continue
+        groups.setdefault(flyer_ids[flyer_index], []).append(button["index"])
+    return groups
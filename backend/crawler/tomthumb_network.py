@@ -0,0 +1,174 @@
+"""Build Tom Thumb weekly ad products from the flyer's own network traffic.
+
+The weekly ad iframe is a Flipp flyer: while it renders, the page downloads
+the flyer's item list as JSON (id, name, price text, image URL, ...) from
+Flipp's API. FlyerResponseCollector listens to page responses and keeps
+those payloads, so the products can be read in seconds instead of clicking
+every `button[data-product-id]` hotspot and scraping the aside panel.
+
+Product ids are Flipp item ids, the same values the flyer buttons carry in
+data-product-id, so both extraction modes key their results the same way.
+
+Usage:
+    collector = FlyerResponseCollector()
+    collector.attach(page)          # before page.goto(...)
+    page.goto(...)
+    products = collector.wait_for_products(page)
+
+The *_async methods do the same with the async Playwright API.
+"""
+import re
+import time
+from urllib.parse import urlsplit
+
+# Hosts that serve the flyer data (flyerkit API, item pages and the CDN).
+FLYER_DATA_HOSTS = ("flippenterprise.net", "flipp.com")
+# Path fragments of the JSON endpoints that list flyer items.
+FLYER_DATA_PATHS = ("/products", "/flyer_items", "/items")
+# Keys under which the endpoints nest their item lists.
+ITEM_LIST_KEYS = ("items", "products", "flyer_items", "data")
+# Image fields in order of preference.
+IMAGE_KEYS = ("cutout_image_url", "x_large_image_url", "large_image_url", "image_url")
+
+_NUMERIC_PRICE = re.compile(r"^\d[\d,]*(?:\.\d{1,2})?$")
+
+
+def is_flyer_data_url(url: str) -> bool:
+    """True for Flipp API URLs that may carry flyer item JSON."""
+    parts = urlsplit(url)
+    host = parts.hostname or ""
+    if not any(host == h or host.endswith("." + h) for h in FLYER_DATA_HOSTS):
+        return False
+    return any(fragment in parts.path for fragment in FLYER_DATA_PATHS)
+
+
+def iter_item_records(payload):
+    """Yield the raw item dicts of a flyer JSON payload (a list or an envelope dict)."""
+    if isinstance(payload, list):
+        for record in payload:
+            if isinstance(record, dict):
+                yield record
+    elif isinstance(payload, dict):
+        for key in ITEM_LIST_KEYS:
+            if isinstance(payload.get(key), list):
+                yield from iter_item_records(payload[key])
+                return
+
+
+def format_price(record: dict) -> str:
+    """Join Flipp's pre/price/post texts (e.g. "2 for", "5", "lb"), falling back to the sale story."""
+    price_text = str(record.get("price_text") or "").strip()
+    if _NUMERIC_PRICE.match(price_text):
+        price_text = f"${price_text}"
+    parts = [
+        str(record.get("pre_price_text") or "").strip(),
+        price_text,
+        str(record.get("post_price_text") or "").strip(),
+    ]
+    price = " ".join(p for p in parts if p)
+    return price or str(record.get("sale_story") or "").strip()
+
+
+def parse_flyer_item(record: dict):
+    """
+    Turn one raw flyer item into {"id", "name", "price", "image_url"}.
+
+    Returns None for records without an id or name (page banners, coupons
+    without a product, ...).
+    """
+    item_id = record.get("id") or record.get("flyer_item_id")
+    name = str(record.get("name") or record.get("display_name") or "").strip()
+    if not item_id or not name:
+        return None
+    image_url = ""
+    for key in IMAGE_KEYS:
+        if record.get(key):
+            image_url = str(record[key]).strip()
+            break
+    return {"id": str(item_id), "name": name, "price": format_price(record), "image_url": image_url}
+
+
+class FlyerResponseCollector:
+    """
+    Collect flyer items from the JSON responses a page receives.
+
+    page.on("response") fires for the page and all of its frames, so
+    attaching to the top-level page also sees the flyer iframe's requests.
+    """
+
+    def __init__(self):
+        self.products = {}
+        self.responses = 0
+        self._last_change = None
+
+    def attach(self, page):
+        page.on("response", self.handle_response)
+        return self
+
+    def attach_async(self, page):
+        page.on("response", self.handle_response_async)
+        return self
+
+    @staticmethod
+    def wants(response) -> bool:
+        """True for JSON responses from the flyer data endpoints."""
+        if not is_flyer_data_url(response.url):
+            return False
+        return "json" in (response.headers or {}).get("content-type", "")
+
+    def handle_response(self, response):
+        if not self.wants(response):
+            return
+        try:
+            payload = response.json()
+        except Exception:
+            # redirects and aborted requests have no body
+            return
+        self._add_response(payload)
+
+    async def handle_response_async(self, response):
+        if not self.wants(response):
+            return
+        try:
+            payload = await response.json()
+        except Exception:
+            return
+        self._add_response(payload)
+
+    def _add_response(self, payload):
+        self.responses += 1
+        if self.add_payload(payload):
+            self._last_change = time.monotonic()
+
+    def add_payload(self, payload) -> int:
+        """Merge a payload's items (first occurrence of an id wins); returns how many were new."""
+        added = 0
+        for record in iter_item_records(payload):
+            item = parse_flyer_item(record)
+            if item is None or item["id"] in self.products:
+                continue
+            self.products[item["id"]] = item
+            added += 1
+        return added
+
+    def wait_for_products(self, page, timeout: int = 15000, settle: int = 1500) -> dict:
+        """
+        Wait until items have arrived and no new ones showed up for `settle` ms.
+
+        Returns the collected items by id, empty if none arrived within
+        `timeout` ms (the caller then falls back to clicking).
+        """
+        deadline = time.monotonic() + timeout / 1000
+        while time.monotonic() < deadline and not self._settled(settle):
+            # wait_for_timeout lets Playwright dispatch the response events
+            page.wait_for_timeout(250)
+        return self.products
+
+    async def wait_for_products_async(self, page, timeout: int = 15000, settle: int = 1500) -> dict:
+        deadline = time.monotonic() + timeout / 1000
+        while time.monotonic() < deadline and not self._settled(settle):
+            await page.wait_for_timeout(250)
+        return self.products
+
+    def _settled(self, settle: int) -> bool:
+        return bool(self.products) and time.monotonic() - self._last_change >= settle / 1000
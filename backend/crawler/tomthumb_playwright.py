@@ -5,7 +5,18 @@ import re
 import os
 import time
 import random
-from utility import download_image, get_store_week_folder, save_grocery_items
+import argparse
+from crawler.blob_store import get_blob_path, put_bytes
+from crawler.crawler_configs import FILE_SYSTEM_CONFIG
+from crawler.downloader import DownloadJob, ImageDownloader
+from crawler.har_archive import HarArchive, get_archive_folder
+from crawler.http_cache import HttpCacheIndex
+from crawler.image_variants import ImageProcessor
+from crawler.request_blocking import RequestBlocker
+from crawler.tomthumb_buttons import BUTTON_SELECTOR, group_buttons_by_flyer, read_flyer_buttons
+from crawler.tomthumb_network import FlyerResponseCollector
+from crawler.utility import compact_store_week, current_week, load_cookie_export, save_grocery_items
+from db_engine.sqlite_engine import insert_crawler_results_many, week_start_date
 
 def _parse_price_from_text(text: str) -> str:
     """Return first price found like $1.23 or empty string."""
@@ -17,29 +28,10 @@ def _parse_price_from_text(text: str) -> str:
     return ""
 
 
-def _load_cookies_from_file(context, file_path: str = "tomthumb_state.json"):
+def _load_cookies_from_file(context, file_path: str = FILE_SYSTEM_CONFIG["TOMTHUMB_COOKIES_PATH"]):
     """Load cookies from a JSON file into the Playwright context."""
     try:
-        with open(file_path, "r") as f:
-            cookies = json.load(f)
-        
-        # Playwright expects cookies in a specific format
-        formatted_cookies = []
-        for cookie in cookies:
-            formatted_cookie = {
-                "name": cookie.get("name"),
-                "value": cookie.get("value"),
-                "domain": cookie.get("domain"),
-                "path": cookie.get("path", "/"),
-                "secure": cookie.get("secure", False),
-                "httpOnly": cookie.get("httpOnly", False),
-                "sameSite": "Strict" if cookie.get("sameSite") == "strict" else ("Lax" if cookie.get("sameSite") == "lax" else "None"),
-            }
-            if cookie.get("expirationDate"):
-                formatted_cookie["expires"] = cookie.get("expirationDate")
-            
-            formatted_cookies.append(formatted_cookie)
-        
+        formatted_cookies = load_cookie_export(file_path)
         context.add_cookies(formatted_cookies)
         print(f"[info] Loaded {len(formatted_cookies)} cookies from {file_path}")
     except FileNotFoundError:
@@ -47,60 +39,71 @@ def _load_cookies_from_file(context, file_path: str = "tomthumb_state.json"):
     except Exception as e:
         print(f"[warning] Error loading cookies: {e}")
 
+def _finish_images(results: dict, downloads: dict, downloader: ImageDownloader):
+    """Record the blob digests of finished downloads, then add image variants and metadata."""
+    # record the blob digests once the background downloads finish
+    for item_id, future in downloads.items():
+        result = future.result()
+        if result.ok and item_id in results:
+            results[item_id]["image_digest"] = result.digest
+    downloader.close()
+    # then resize and describe every stored image in worker processes
+    with ImageProcessor() as processor:
+        processing = {item_id: processor.submit(v.get("image_digest")) for item_id, v in results.items()}
+        for item_id, future in processing.items():
+            results[item_id].update(future.result())
+    downloader.cache.save()
+    print(downloader.cache.report())
+
+
+def _capture_products_from_network(page, collector: FlyerResponseCollector, timeout: int = 15000) -> dict:
+    """Build the item_id -> item map from the flyer JSON the page downloaded,
+    without clicking anything. Returns an empty dict when no flyer data was seen.
+    """
+    products = collector.wait_for_products(page, timeout=timeout)
+    print(f"[info] Captured {len(products)} products from {collector.responses} flyer response(s)")
+    results = {}
+    if not products:
+        return results
+    downloader = ImageDownloader(cache=HttpCacheIndex())
+    downloads = {}
+    try:
+        for item_id, product in products.items():
+            src = product["image_url"]
+            results[item_id] = {"image": src, "image_digest": None, "alt": product["name"],
+                                "name": product["name"], "price": product["price"]}
+            if src:
+                downloads[item_id] = downloader.submit(DownloadJob(src, product["name"] or item_id, "tomthumb"))
+    finally:
+        _finish_images(results, downloads, downloader)
+    return results
+
+
 def _click_buttons_and_capture_sidepanel_images(page, frame, timeout: int = 3000) -> dict:
     """Click each overlay button inside the main frame, open the aside panel,
     find `.single-media-container img`, download the image, and return a map
     of item_id -> {image: local_path_or_url, alt: alt_text, name: label}.
     """
     results = {}
+    downloader = ImageDownloader(cache=HttpCacheIndex())
+    downloads = {}
     try:
-        btns = frame.locator("button[data-product-id]")
-        total = 0
-        try:
-            total = btns.count()
-        except Exception:
-            total = 0
-        flyer_groups = {}
+        btns = frame.locator(BUTTON_SELECTOR)
+        # One evaluate() maps every button to its flyer and reads its id/label.
         try:
-            flyers = frame.locator("sfml-flyer-image")
-            num_flyers = flyers.count()
-            print(f"[info] Found {num_flyers} flyers")
-            
-            for flyer_idx in range(num_flyers):
-                flyer = flyers.nth(flyer_idx)
-                try:
-                    flyer_id = flyer.evaluate("el => el.getAttribute('sfml-anchor-id') || el.getAttribute('id') || `flyer-${Math.random().toString(36).substr(2, 9)}`")
-                except Exception:
-                    flyer_id = f"flyer-{flyer_idx}"
-                
-                # Find all buttons within this specific flyer
-                btns_in_flyer = flyer.locator("button[data-product-id]")
-                try:
-                    count = btns_in_flyer.count()
-                except Exception:
-                    count = 0
-                
-                # Map button indices in the main frame to this flyer
-                indices_in_flyer = []
-                for btn_idx in range(total):
-                    btn = btns.nth(btn_idx)
-                    try:
-                        # Check if this button's closest sfml-flyer-image matches current flyer
-                        belongs_to_flyer = btn.evaluate(f"""el => {{
-                            const flyer = el.closest('sfml-flyer-image');
-                            const currentFlyer = document.querySelectorAll('sfml-flyer-image')[{flyer_idx}];
-                            return flyer === currentFlyer;
-                        }}""")
-                        if belongs_to_flyer:
-                            indices_in_flyer.append(btn_idx)
-                    except Exception:
-                        pass
-                
-                if indices_in_flyer:
-                    flyer_groups[flyer_id] = indices_in_flyer
-                    print(f"Flyer '{flyer_id}': {len(indices_in_flyer)} buttons at indices {indices_in_flyer}")
+            snapshot = read_flyer_buttons(frame)
+            buttons = snapshot["buttons"]
+            flyer_groups = group_buttons_by_flyer(snapshot)
+            print(f"[info] Found {len(snapshot['flyers'])} flyers")
+            for flyer_id, indices_in_flyer in flyer_groups.items():
+                print(f"Flyer '{flyer_id}': {len(indices_in_flyer)} buttons at indices {indices_in_flyer}")
         except Exception as e:
             print(f"[debug] Error grouping by sfml-flyer-image: {e}")
+            try:
+                total = btns.count()
+            except Exception:
+                total = 0
+            buttons = [None] * total
             flyer_groups = {'ungrouped': list(range(total))}
         
         # Randomize each flyer's button order and iterate
@@ -115,16 +118,13 @@ def _click_buttons_and_capture_sidepanel_images(page, frame, timeout: int = 3000
             
             for i in indices:
                 node = btns.nth(i)
-                try:
-                    item_id = node.get_attribute("data-product-id") or node.get_attribute("data-global-id") or f"btn-{i}"
-                    name = node.get_attribute("aria-label") or node.get_attribute("label") or ""
-                    price = _parse_price_from_text(name)
-                except Exception:
-                    item_id = f"btn-{i}"
-                    name = ""
-                    price = ""
+                button = buttons[i] or {}
+                item_id = button.get("product_id") or button.get("global_id") or f"btn-{i}"
+                name = button.get("label") or ""
+                price = _parse_price_from_text(name)
 
                 img_local = ""
+                img_digest = None
                 alt = ""
                 clicked = False
                 try:
@@ -153,23 +153,14 @@ def _click_buttons_and_capture_sidepanel_images(page, frame, timeout: int = 3000
                                 print(alt + " " + src)
                                 # try to download remote image
                                 try:
-                                    local = None
                                     if src and src.startswith("data:"):
-                                        # inline data URL - write directly
+                                        # inline data URL - store the decoded bytes directly
                                         header, b64 = src.split(",", 1)
-                                        folder = get_store_week_folder("tomthumb")
-                                        fname = f"{item_id}.jpg"
-                                        path = os.path.join(folder, fname)
-                                        with open(path, "wb") as f:
-                                            f.write(base64.b64decode(b64))
-                                        local_img_full_path, local_imag_file_name  = path, fname
+                                        img_digest, _ = put_bytes(base64.b64decode(b64))
                                     elif src:
-                                        local_img_full_path, local_imag_file_name = download_image(src, name or item_id, "tomthumb")
-
-                                    if local_img_full_path:
-                                        img_local = local_imag_file_name
-                                    else:
-                                        img_local = src or ""
+                                        # download in the background while the next button is clicked
+                                        downloads[item_id] = downloader.submit(DownloadJob(src, name or item_id, "tomthumb"))
+                                        img_local = src
                                 except Exception as e:
                                     print(f"[debug] failed to download side panel image for {item_id}: {e}")
                         
@@ -178,31 +169,69 @@ def _click_buttons_and_capture_sidepanel_images(page, frame, timeout: int = 3000
                         img_local = ""
                         alt = ""
 
-                results[item_id] = {"image": img_local or "", "alt": alt, "name": name, "price": price}
+                results[item_id] = {"image": img_local or "", "image_digest": img_digest, "alt": alt, "name": name, "price": price}
                 # random sleep to avoid being too fast (random < 3s)
                 time.sleep(random.uniform(1, 3))
     except Exception as e:
         print(f"[debug] _click_buttons_and_capture_sidepanel_images error: {e}")
+    finally:
+        _finish_images(results, downloads, downloader)
     return results
 
 
-def extract_tom_thumb_products():
+def _iter_db_rows(data_to_save, store_name: str = "tomthumb"):
+    """Yield SQLite rows for extracted items, reading each downloaded image once."""
+    week_start = week_start_date()
+    for item in data_to_save:
+        image_bytes = None
+        path = get_blob_path(item.get("image_digest"))
+        if path:
+            with open(path, "rb") as f:
+                image_bytes = f.read()
+        yield (store_name, week_start, item.get("name") or "", item.get("image_url"), image_bytes, item.get("price") or "")
+
+
+def extract_tom_thumb_products(write_db: bool = False, mode: str = "network", block_requests: bool = True,
+                               har_mode: str = None, har_dir: str = None, headless: bool = False):
+    """Crawl the Tom Thumb weekly ad.
 
-    import os
+    mode="network" reads the products from the flyer JSON the page downloads
+    and only falls back to clicking when none is captured; mode="click"
+    always clicks every product button. block_requests drops fonts, media and
+    third-party trackers; page images are blocked too in network mode, where
+    nothing is read from the rendered flyer.
+
+    har_mode="record" saves the crawl's traffic and storage state to a
+    HarArchive in `har_dir` (default: this week's tomthumb archive);
+    har_mode="replay" serves every request from that archive instead of the
+    network.
+    """
+    if mode not in ("network", "click"):
+        raise ValueError(f"Unknown extraction mode {mode!r}")
+    archive = HarArchive(har_dir or get_archive_folder("tomthumb"), har_mode) if har_mode else None
 
     with sync_playwright() as p:
-        browser = p.chromium.launch(headless=False)
+        browser = p.chromium.launch(headless=headless)
         context = browser.new_context(
             user_agent=("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
                         " (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"),
             locale="en-US",
             viewport={"width": 1280, "height": 800},
             java_script_enabled=True,
+            **(archive.context_options() if archive is not None else {}),
         )
+        blocker = None
+        if block_requests:
+            blocker = RequestBlocker(block_images=(mode == "network")).install(context)
+        if archive is not None:
+            # registered last so the archive answers before the blocker
+            archive.attach(context)
         # Load cookies before navigating
-        _load_cookies_from_file(context, "crawler/tomthumb_state.json")
+        _load_cookies_from_file(context)
         
         page = context.new_page()
+        # listen before navigating so the flyer's first data requests are seen
+        collector = FlyerResponseCollector().attach(page)
         
         # Navigate to Tom Thumb weekly ad
         page.goto("https://www.tomthumb.com/weeklyad", wait_until="load")
@@ -216,24 +245,58 @@ def extract_tom_thumb_products():
         # frame reference for the main iframe where the content is rendered
         frame = iframe_el.content_frame()
         
-        # Click buttons to open side panel images and download them
-        results = _click_buttons_and_capture_sidepanel_images(page, frame, timeout=3000)
+        results = {}
+        if mode == "network":
+            results = _capture_products_from_network(page, collector)
+        if not results:
+            if mode == "network":
+                print("[info] No flyer data captured, falling back to clicking buttons")
+            # Click buttons to open side panel images and download them
+            results = _click_buttons_and_capture_sidepanel_images(page, frame, timeout=3000)
 
         
         print(f"Found {len(results)} products")
         print(json.dumps(results, indent=2))
         
         # Save results to JSON using utility function
-        data_to_save = [{"name": v.get("name"), "price": v.get("price"), "image": v.get("image")} for v in results.values()]
+        data_to_save = [
+            {
+                "name": v.get("name"),
+                "price": v.get("price"),
+                "image_digest": v.get("image_digest"),
+                "image_variants": v.get("image_variants") or {},
+                "image_meta": v.get("image_meta") or {},
+                "image_url": v.get("image") or None,
+            }
+            for v in results.values()
+        ]
         save_grocery_items(data_to_save, "tomthumb")
+        compact_store_week("tomthumb", current_week())
+        if blocker is not None:
+            print(blocker.report())
+        if write_db:
+            written = insert_crawler_results_many(_iter_db_rows(data_to_save), upsert=True)
+            print(f"[info] Wrote {written} item(s) to SQLite")
         
         try:
+            if archive is not None:
+                archive.finish(context)
+            # closing the context writes a recorded HAR
             context.close()
             browser.close()
         except Exception:
             pass
         return results
 
-# Run the script
+# Run the script (from backend/): python -m crawler.tomthumb_playwright
 if __name__ == "__main__":
-    extract_tom_thumb_products()
\ No newline at end of file
+    ap = argparse.ArgumentParser(description="Tom Thumb weekly ad crawler")
+    ap.add_argument("--mode", choices=["network", "click"], default="network", help="Read the flyer JSON, or click every product")
+    ap.add_argument("--write-db", action="store_true", help="Also insert the items into the SQLite store")
+    ap.add_argument("--no-block", action="store_true", help="Load fonts, media and third-party trackers too")
+    ap.add_argument("--headless", action="store_true", help="Hide the browser window")
+    ap.add_argument("--har", choices=["record", "replay"], default=None, help="Record the crawl to a HAR archive, or replay it offline")
+    ap.add_argument("--har-dir", default=None, help="HAR archive folder (default: this week's tomthumb archive)")
+    args = ap.parse_args()
+    extract_tom_thumb_products(write_db=args.write_db, mode=args.mode, block_requests=not args.no_block,
+                               har_mode=args.har, har_dir=args.har_dir, headless=args.headless)
\ No newline at end of file
@@ -1,150 +1,90 @@
-import os
-import re
 import json
+import os
 import random
+import urllib.error
 import urllib.request
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from selenium import webdriver
-from datetime import date
 
+from crawler.blob_store import get_blob_path, put_stream
 from crawler.crawler_configs import FILE_SYSTEM_CONFIG
-
-
-def get_store_week_folder(storename: str, week: str, create_if_not_exists: bool = True):
-    """
-    Generate standardized folder path for a store's weekly data.
-    Structure: BASE_DIR/storename/weekstartdate/
-
-    This folder will contain:
-    - JSON file with grocery items
-    - Image files for that week's items
-
-    Args:
-        storename (str): Name of the store (e.g., "kroger", "heb").
-        week (str): Week in YYYY-Www format (e.g., "2024-W52").
-        create_if_not_exists (bool): If True, creates the folder if it doesn't exist.
-
-    Returns:
-        str: Absolute path to the store/week folder.
-    """
-    base_dir = FILE_SYSTEM_CONFIG.get(
-        "DATA_BASE_DIR", os.path.join(os.path.dirname(__file__), "grocery_data")
-    )
-    store_week_folder = os.path.join(base_dir, storename, week)
-
-    if create_if_not_exists and not os.path.exists(store_week_folder):
-        os.makedirs(store_week_folder, exist_ok=True)
-
-    return store_week_folder
-
-
-def get_json_file_path(storename: str, week: str):
-    """
-    Get the JSON file path for storing grocery items.
-
-    Args:
-        storename (str): Name of the store.
-        week (str): Week in YYYY-Www format.
-
-    Returns:
-        str: Absolute path to the JSON file.
-    """
-    folder = get_store_week_folder(storename, week)
-    return os.path.join(folder, "weekly_ad.json")
-
-
-def download_image(url, name, store, week=None):
+from crawler.http_cache import HttpCacheIndex
+from crawler.image_utils import IMAGE_CHUNK_SIZE, MAX_IMAGE_BYTES, iter_validated_chunks
+from crawler.storage import (  # noqa: F401 - re-exported for the crawler scripts
+    WEEKLY_AD_CACHE,
+    WeeklyAdCache,
+    compact_store_week,
+    current_week,
+    get_json_file_path,
+    get_store_ads,
+    get_store_ads_json,
+    get_store_week_folder,
+    remove_grocery_items,
+    save_grocery_items,
+)
+
+
+def download_image(
+    url, name, store, week=None, cache=None, chunk_size=IMAGE_CHUNK_SIZE, max_bytes=MAX_IMAGE_BYTES
+):
     """
-    Download an image and save it to the store/week folder.
+    Download an image into the content-addressed blob store.
 
     Args:
         url (str): URL of the image to download.
         name (str): Name/description of the item.
-        store (str): Store name (e.g., "kroger", "heb").
-        week (str, optional): Week in YYYY-Www format. If None, uses current week.
+        store (str): Store name (e.g., "kroger", "heb"). Unused since blobs are shared.
+        week (str, optional): Week in YYYY-Www format. Unused since blobs are shared.
+        cache (HttpCacheIndex, optional): Send a conditional request and reuse the
+            stored blob when the server answers 304 Not Modified.
+        chunk_size (int): Bytes read at a time; the body is never held in memory whole.
+        max_bytes (int, optional): Abandon responses larger than this.
 
     Returns:
-        str: Local path where the image was saved, or None if download failed.
+        str: Local path of the blob (its file name is the image digest), or None
+        if download failed.
     """
-    # Get current week if not provided
-    if week is None:
-        week = date.today().strftime("%Y-W%U")
-
-    # Get the folder for this store/week
-    folder_path = get_store_week_folder(store, week)
-
-    # Sanitize filename
-    filename = re.sub(r"[^\w\-_\.]", "_", name.replace(" ", ""))[:50]
-
-    # Get file extension (before any query parameters)
-    ext = os.path.splitext(url)[-1].split("?")[0]
-    if not ext or len(ext) > 5:
-        ext = ".jpg"  # Fallback extension if unknown
-
-    local_path = os.path.join(folder_path, f"{filename}{ext}")
+    entry = cache.lookup(url) if cache is not None else None
+    if entry is not None and get_blob_path(entry.get("sha256")) != entry["path"]:
+        entry = None
+    request = urllib.request.Request(url, headers=HttpCacheIndex.conditional_headers(entry))
 
     # Download image using urlopen
     try:
-        with (
-            urllib.request.urlopen(url) as response,
-            open(local_path, "wb") as out_file,
-        ):
-            out_file.write(response.read())
+        try:
+            with urllib.request.urlopen(request) as response:
+                content_length = response.headers.get("Content-Length")
+                chunks = iter_validated_chunks(
+                    iter(lambda: response.read(chunk_size), b""),
+                    response.headers.get("Content-Type"),
+                    max_bytes,
+                    int(content_length) if content_length and content_length.isdigit() else None,
+                )
+                # Written to a temp file and only published once fully read and validated.
+                digest, local_path = put_stream(chunks)
+                headers = response.headers
+        except urllib.error.HTTPError as e:
+            if e.code != 304 or entry is None:
+                raise
+            cache.record_hit(url)
+            return entry["path"]
+
+        if cache is not None:
+            cache.record_download(url, headers, local_path, os.path.getsize(local_path), digest)
         return local_path
     except Exception as e:
         print(f"Failed to download image for {name}: {e}")
         return None
 
 
-def save_grocery_items(data, storename, week=None):
-    """
-    Save a list of grocery items to a JSON file in the store/week folder.
-
-    Args:
-        data (list): List of dictionaries containing grocery item data.
-        storename (str): Name of the store (e.g., "kroger", "heb").
-        week (str, optional): Week in YYYY-Www format. If None, uses current week.
-
-    Raises:
-        ValueError: If data is not a list of dictionaries.
-    """
-    # Validate input data
-    if not isinstance(data, list) or not all(isinstance(d, dict) for d in data):
-        raise ValueError("Data must be a list of dictionaries.")
-
-    # Get current week if not provided
-    if week is None:
-        week = date.today().strftime("%Y-W%U")
-
-    # Get the JSON file path
-    file_path = get_json_file_path(storename, week)
-
-    # Load existing content if the file exists
-    if os.path.exists(file_path):
-        with open(file_path, "r", encoding="utf-8") as f:
-            try:
-                existing_data = json.load(f)
-                if not isinstance(existing_data, list):
-                    existing_data = []
-            except json.JSONDecodeError:
-                existing_data = []
-    else:
-        existing_data = []
-
-    # Append new data and write back to file
-    existing_data.extend(data)
-
-    with open(file_path, "w", encoding="utf-8") as f:
-        json.dump(existing_data, f, indent=4)
-
-    print(f"Data saved to {file_path}")
-
-
 def get_stealth_driver(
     chrome_path=FILE_SYSTEM_CONFIG["chrome_path"],
     driver_path=FILE_SYSTEM_CONFIG["chromedriver_path"],
 ):
+    # Selenium is only needed when a crawler actually drives Chrome, so keep it
+    # out of the import path of everything else (notably the API workers).
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.chrome.service import Service
+
     chrome_options = Options()
     chrome_options.binary_location = chrome_path
 
@@ -190,56 +130,28 @@ def get_stealth_driver(
     return driver
 
 
-def get_store_ads(storename: str, week: str) -> list:
+def load_cookie_export(file_path):
     """
-    Retrieve weekly ad for a store for a particular week from a JSON file.
-    Loads images as binary byte arrays from the stored image files.
-
-    Args:
-        storename (str): Name of the store (e.g., "kroger", "heb").
-        week (str): Week in YYYY-Www format (e.g., "2024-W52").
-
-    Returns:
-        list: List of dictionaries with product name, price, and image (as binary bytes).
-              Format: [{"name": str, "price": str, "image": bytes}, ...]
+    Read a browser-extension cookie export (a JSON list) as Playwright cookies.
 
-    Raises:
-        FileNotFoundError: If no weekly ad file is found for the store and week.
+    Raises FileNotFoundError when the file is missing.
     """
-    import base64
-
-    file_path = get_json_file_path(storename, week)
-
-    if not os.path.isfile(file_path):
-        raise FileNotFoundError(
-            f"No weekly ad file found for store '{storename}' and week '{week}' at {file_path}"
-        )
-
-    with open(file_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
-
-    # # Load images as binary byte arrays
-    # result = []
-    # for item in data:
-    #     image_path = item.get("image")
-    #     image_base64 = None
-
-    #     if image_path and os.path.isfile(image_path):
-    #         try:
-    #             with open(image_path, "rb") as img_file:
-    #                 image_bytes = img_file.read()
-    #                 image_base64 = (
-    #                     base64.b64encode(image_bytes).decode() if image_bytes else None
-    #                 )
-    #         except Exception as e:
-    #             print(f"Warning: Failed to load image {image_path}: {e}")
-
-    #     result.append(
-    #         {
-    #             "name": item.get("name"),
-    #             "price": item.get("price"),
-    #             "image": image_base64,
-    #         }
-    #     )
-
-    return data
+    with open(file_path, "r") as f:
+        cookies = json.load(f)
+
+    same_site = {"strict": "Strict", "lax": "Lax"}
+    formatted_cookies = []
+    for cookie in cookies:
+        formatted_cookie = {
+            "name": cookie.get("name"),
+            "value": cookie.get("value"),
+            "domain": cookie.get("domain"),
+            "path": cookie.get("path", "/"),
+            "secure": cookie.get("secure", False),
+            "httpOnly": cookie.get("httpOnly", False),
+            "sameSite": same_site.get(cookie.get("sameSite"), "None"),
+        }
+        if cookie.get("expirationDate"):
+            formatted_cookie["expires"] = cookie.get("expirationDate")
+        formatted_cookies.append(formatted_cookie)
+    return formatted_cookies
@@ -1,7 +1,15 @@
 import os
+import hashlib
 import sqlite3
+import threading
+import time
+from contextlib import closing
+from datetime import date, datetime
+from itertools import islice
 from pathlib import Path
 
+from crawler.item_keys import item_key
+
 # Determine DB path from environment variable or default location
 DB_PATH = os.environ.get("DB_PATH")
 if not DB_PATH:
@@ -13,32 +21,442 @@ else:
     DB_PATH = Path(DB_PATH)
 
 
+POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "8"))
+POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "30"))
+
+# Applied to every pooled connection. WAL lets API readers run while the
+# crawler writes; synchronous=NORMAL is durable enough under WAL and avoids an
+# fsync per commit.
+CONNECTION_PRAGMAS = (
+    ("journal_mode", "WAL"),
+    ("synchronous", "NORMAL"),
+    ("cache_size", -16000),  # negative means KiB, so ~16 MiB of page cache
+    ("mmap_size", 256 * 1024 * 1024),
+    ("busy_timeout", 5000),
+    ("temp_store", "MEMORY"),
+)
+
+
+class PooledConnection(sqlite3.Connection):
+    """
+    sqlite3 connection handed out by ConnectionPool.
+
+    close() and leaving a `with` block return the connection to its pool
+    instead of closing it, so existing `with get_connection() as conn:` code
+    keeps working unchanged.
+    """
+
+    pool = None
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            return super().__exit__(exc_type, exc_value, traceback)
+        finally:
+            self.close()
+
+    def close(self):
+        if self.pool is None:
+            super().close()
+        else:
+            self.pool.release(self)
+
+    def close_for_real(self):
+        self.pool = None
+        super().close()
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of persistent SQLite connections to one database file.
+
+    Connections are created lazily up to max_size. When all of them are in
+    use, acquire() waits up to timeout seconds; waits are recorded in stats()
+    so contention with a concurrently writing crawler is visible.
+    """
+
+    def __init__(self, db_path, max_size: int = POOL_SIZE, timeout: float = POOL_TIMEOUT):
+        self.db_path = str(db_path)
+        self.max_size = max_size
+        self.timeout = timeout
+        self._idle = []
+        self._in_use = set()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._created = 0
+        self._acquired = 0
+        self._waits = 0
+        self._timeouts = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            self.db_path, factory=PooledConnection, check_same_thread=False
+        )
+        for name, value in CONNECTION_PRAGMAS:
+            conn.execute(f"PRAGMA {name}={value}")
+        conn.pool = self
+        self._created += 1
+        return conn
+
+    def acquire(self):
+        start = time.perf_counter()
+        deadline = start + self.timeout
+        waited = False
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise sqlite3.ProgrammingError("Connection pool is closed.")
+                if self._idle:
+                    conn = self._idle.pop()
+                    break
+                if len(self._in_use) < self.max_size:
+                    conn = self._connect()
+                    break
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise sqlite3.OperationalError(
+                        "Timed out waiting for a database connection."
+                    )
+                waited = True
+                self._cond.wait(remaining)
+
+            self._in_use.add(conn)
+            self._acquired += 1
+            if waited:
+                wait = time.perf_counter() - start
+                self._waits += 1
+                self._wait_total += wait
+                self._wait_max = max(self._wait_max, wait)
+        return conn
+
+    def release(self, conn):
+        with self._cond:
+            if conn not in self._in_use:
+                return
+        # Never hand the next caller a half-finished transaction.
+        if conn.in_transaction:
+            conn.rollback()
+        with self._cond:
+            self._in_use.discard(conn)
+            if self._closed:
+                conn.close_for_real()
+            else:
+                self._idle.append(conn)
+            self._cond.notify()
+
+    def close(self):
+        """Close idle connections now and in-use ones as they are released."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+        for conn in idle:
+            conn.close_for_real()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "db_path": self.db_path,
+                "max_size": self.max_size,
+                "created": self._created,
+                "idle": len(self._idle),
+                "in_use": len(self._in_use),
+                "acquired": self._acquired,
+                "waits": self._waits,
+                "timeouts": self._timeouts,
+                "wait_total_seconds": self._wait_total,
+                "wait_max_seconds": self._wait_max,
+                "wait_avg_seconds": self._wait_total / self._waits if self._waits else 0.0,
+            }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
 def db_exists():
     return Path(str(DB_PATH)).is_file()
 
 
+def get_pool():
+    """
+    Return the pool for the current DB_PATH, creating it (and the schema) on first use.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool.db_path != str(DB_PATH):
+            if _pool is not None:
+                _pool.close()
+            init_db()
+            _pool = ConnectionPool(DB_PATH)
+        return _pool
+
+
+def close_pool():
+    """Close every pooled connection, e.g. on API shutdown or between tests."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
+def get_pool_stats():
+    """Return the current pool's stats, or None if no connection was requested yet."""
+    pool = _pool
+    return pool.stats() if pool is not None else None
+
+
 def get_connection():
-    if not db_exists():
-        init_db()
-    return sqlite3.connect(str(DB_PATH))
+    """
+    Borrow a connection from the pool.
+    Use it as `with get_connection() as conn:`; leaving the block commits (or
+    rolls back on error) and returns the connection to the pool.
+    """
+    return get_pool().acquire()
+
+
+# Bump SCHEMA_VERSION and add a MIGRATIONS entry whenever the schema changes.
+# The version is stored in the database with PRAGMA user_version.
+SCHEMA_VERSION = 5
+
+SCHEMA_STATEMENTS = (
+    # Image bytes are stored once per distinct content, keyed by SHA-256.
+    """
+    CREATE TABLE IF NOT EXISTS images (
+        hash TEXT PRIMARY KEY,
+        data BLOB NOT NULL,
+        size INTEGER NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS crawler_results (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        storename TEXT NOT NULL,
+        weekly_ad_starting_date TEXT NOT NULL,
+        product TEXT NOT NULL,
+        image_url TEXT,
+        image_hash TEXT REFERENCES images(hash),
+        price TEXT NOT NULL,
+        item_key TEXT
+    )
+    """,
+    # Covers the store/week listing without touching the table. id comes right
+    # after the week so `id > ? ORDER BY id` pages walk the index in order.
+    """
+    CREATE INDEX IF NOT EXISTS idx_crawler_results_store_week
+        ON crawler_results (storename, weekly_ad_starting_date, id, product, price, image_hash)
+    """,
+    # One row per item_key, so rewriting an item is an upsert.
+    """
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_crawler_results_item_key
+        ON crawler_results (item_key)
+    """,
+    # Answers "is this image still used?" when rows are replaced or deleted.
+    """
+    CREATE INDEX IF NOT EXISTS idx_crawler_results_image_hash
+        ON crawler_results (image_hash)
+    """,
+)
+
+
+# Full sweep of the images no row points at any more (maintenance only; it
+# reads every row). Writes use DELETE_UNREFERENCED_IMAGE_SQL on the hashes of
+# the rows they removed instead.
+DELETE_ORPHANED_IMAGES_SQL = """DELETE FROM images
+               WHERE hash NOT IN (SELECT image_hash FROM crawler_results WHERE image_hash IS NOT NULL)"""
+
+DELETE_UNREFERENCED_IMAGE_SQL = """DELETE FROM images
+               WHERE hash = ? AND NOT EXISTS (SELECT 1 FROM crawler_results WHERE image_hash = ?)"""
+
+
+def image_hash(image_bytes):
+    """Content address of an image: hex SHA-256 of its bytes, or None for no image."""
+    if image_bytes is None:
+        return None
+    return hashlib.sha256(image_bytes).hexdigest()
+
+
+def _table_exists(conn, name):
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (name,)
+    ).fetchone()
+    return row is not None
+
+
+def _schema_version(conn):
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version == 0 and _table_exists(conn, "crawler_results"):
+        # Databases created before versioning hold the original single-table layout.
+        return 1
+    return version
+
+
+def _migrate_v1_to_v2(conn):
+    """Move image BLOBs into the content-addressed images table and add the index."""
+    conn.create_function("sha256_hex", 1, image_hash, deterministic=True)
+    conn.execute(SCHEMA_STATEMENTS[0])
+    conn.execute(
+        """INSERT OR IGNORE INTO images (hash, data, size)
+           SELECT sha256_hex(image), image, length(image)
+           FROM crawler_results WHERE image IS NOT NULL"""
+    )
+    conn.execute("ALTER TABLE crawler_results RENAME TO crawler_results_v1")
+    conn.execute(SCHEMA_STATEMENTS[1])
+    conn.execute(
+        """INSERT INTO crawler_results
+               (id, storename, weekly_ad_starting_date, product, image_url, image_hash, price)
+           SELECT id, storename, weekly_ad_starting_date, product, image_url,
+                  sha256_hex(image), price
+           FROM crawler_results_v1"""
+    )
+    conn.execute("DROP TABLE crawler_results_v1")
+    conn.execute(SCHEMA_STATEMENTS[2])
+
+
+def _migrate_v2_to_v3(conn):
+    """Rebuild the store/week index with id in it for keyset pagination."""
+    conn.execute("DROP INDEX IF EXISTS idx_crawler_results_store_week")
+    conn.execute(SCHEMA_STATEMENTS[2])
+
+
+def _migrate_v3_to_v4(conn):
+    """
+    Key every row by item_key, keep the newest row per key and make the key
+    unique. Images no row references any more (left behind by earlier
+    upserts and deletes) are dropped too.
+    """
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(crawler_results)")]
+    if "item_key" not in columns:  # tables rebuilt by _migrate_v1_to_v2 already have it
+        conn.execute("ALTER TABLE crawler_results ADD COLUMN item_key TEXT")
+    conn.create_function("item_key_of", 5, item_key, deterministic=True)
+    conn.execute(
+        """UPDATE crawler_results
+           SET item_key = item_key_of(storename, weekly_ad_starting_date, product, price, image_hash)"""
+    )
+    conn.execute(
+        """DELETE FROM crawler_results
+           WHERE id NOT IN (SELECT MAX(id) FROM crawler_results GROUP BY item_key)"""
+    )
+    conn.execute(DELETE_ORPHANED_IMAGES_SQL)
+    conn.execute(SCHEMA_STATEMENTS[3])
+
+
+def _migrate_v4_to_v5(conn):
+    """Index image_hash so replaced rows' images can be checked for other users."""
+    conn.execute(SCHEMA_STATEMENTS[4])
+
+
+# from_version -> function upgrading the schema to from_version + 1
+MIGRATIONS = {
+    1: _migrate_v1_to_v2,
+    2: _migrate_v2_to_v3,
+    3: _migrate_v3_to_v4,
+    4: _migrate_v4_to_v5,
+}
 
 
 def init_db():
-    # Open a direct connection to avoid recursion
-    with sqlite3.connect(str(DB_PATH)) as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS crawler_results (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                storename TEXT NOT NULL,
-                weekly_ad_starting_date TEXT NOT NULL,
-                product TEXT NOT NULL,
-                image_url TEXT,
-                image BLOB,
-                price TEXT NOT NULL
-            )
-        """)
-        conn.commit()
+    """
+    Create the schema, or migrate an existing database in place to SCHEMA_VERSION.
+    """
+    # Open a direct connection (not from the pool) and close it when done
+    with closing(sqlite3.connect(str(DB_PATH), isolation_level=None)) as conn:
+        # journal_mode is persistent, so readers opened later also use WAL
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            version = _schema_version(conn)
+            if version > SCHEMA_VERSION:
+                raise RuntimeError(
+                    f"Database schema version {version} is newer than supported ({SCHEMA_VERSION})."
+                )
+            if version == 0:
+                for statement in SCHEMA_STATEMENTS:
+                    conn.execute(statement)
+            else:
+                for from_version in range(version, SCHEMA_VERSION):
+                    MIGRATIONS[from_version](conn)
+            # Moving BLOBs out (v1 -> v2) and dropping duplicates (v3 -> v4) leave pages free.
+            reclaim_space = 0 < version < 4
+            conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        if reclaim_space:
+            conn.execute("VACUUM")
+
+
+RESULT_FIELDS = (
+    "storename",
+    "weekly_ad_starting_date",
+    "product",
+    "image_url",
+    "image_bytes",
+    "price",
+)
+
+INSERT_IMAGE_SQL = """INSERT OR IGNORE INTO images (hash, data, size) VALUES (?, ?, ?)"""
+
+# Writing an item that is already stored (same item_key) only refreshes its image URL.
+INSERT_RESULT_SQL = """INSERT INTO crawler_results (storename, weekly_ad_starting_date, product, image_url, image_hash, price, item_key)
+               VALUES (?, ?, ?, ?, ?, ?, ?)
+               ON CONFLICT (item_key) DO UPDATE SET image_url = excluded.image_url"""
+
+# Upsert replaces any earlier row for the same store, week and product.
+DELETE_RESULT_SQL = """DELETE FROM crawler_results
+               WHERE storename = ? AND weekly_ad_starting_date = ? AND product = ?"""
+
+RESULT_IMAGES_SQL = """SELECT image_hash FROM crawler_results
+               WHERE storename = ? AND weekly_ad_starting_date = ? AND product = ? AND image_hash IS NOT NULL"""
+
+
+def _delete_results(cursor, keys):
+    """
+    Delete rows by (storename, week, product).
+
+    Returns:
+        tuple: (rows deleted, image hashes those rows used)
+    """
+    keys = list(keys)
+    hashes = set()
+    for key in keys:
+        hashes.update(row[0] for row in cursor.execute(RESULT_IMAGES_SQL, key))
+    cursor.executemany(DELETE_RESULT_SQL, keys)
+    return cursor.rowcount, hashes
+
+
+def _delete_unreferenced_images(cursor, hashes):
+    """Delete those of `hashes` no row uses any more; one index probe per hash."""
+    cursor.executemany(DELETE_UNREFERENCED_IMAGE_SQL, [(digest, digest) for digest in hashes])
+
+
+def _write_chunk(cursor, rows, upsert):
+    """Write (storename, week, product, image_url, image_bytes, price) rows."""
+    images = {}
+    result_rows = []
+    for storename, week, product, image_url, image_bytes, price in rows:
+        digest = image_hash(image_bytes)
+        if digest is not None:
+            images[digest] = image_bytes
+        result_rows.append(
+            (storename, week, product, image_url, digest, price, item_key(storename, week, product, price, digest))
+        )
+
+    if images:
+        cursor.executemany(
+            INSERT_IMAGE_SQL,
+            [(digest, data, len(data)) for digest, data in images.items()],
+        )
+    old_images = set()
+    if upsert:
+        _, old_images = _delete_results(cursor, [row[:3] for row in result_rows])
+    cursor.executemany(INSERT_RESULT_SQL, result_rows)
+    # a replaced row may have been the last one using its old image
+    _delete_unreferenced_images(cursor, old_images)
 
 
 def insert_crawler_result(
@@ -46,27 +464,168 @@ def insert_crawler_result(
 ):
     """
     Insert a new crawler result into the database.
-    image_bytes should be raw image data (not base64-encoded).
+    image_bytes should be raw image data (not base64-encoded); identical images
+    are stored once in the images table. Writing the same item again (same
+    item_key) updates the stored row instead of adding a duplicate.
     """
     with get_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute(
-            """INSERT INTO crawler_results (storename, weekly_ad_starting_date, product, image_url, image, price)
-               VALUES (?, ?, ?, ?, ?, ?)""",
-            (
-                storename,
-                weekly_ad_starting_date,
-                product,
-                image_url,
-                image_bytes,
-                price,
-            ),
+        _write_chunk(
+            cursor,
+            [(storename, weekly_ad_starting_date, product, image_url, image_bytes, price)],
+            upsert=False,
         )
         conn.commit()
 
 
+def delete_crawler_results(storename, weekly_ad_starting_date, products):
+    """
+    Delete a store/week's rows for the given product names, and the images
+    only they referenced, in one transaction.
+
+    Returns:
+        int: Number of rows deleted.
+    """
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        deleted, old_images = _delete_results(
+            cursor, [(storename, weekly_ad_starting_date, product) for product in products]
+        )
+        _delete_unreferenced_images(cursor, old_images)
+        conn.commit()
+        return deleted
+
+
+def delete_orphaned_images():
+    """
+    Delete every image no row references, e.g. ones left by versions that did
+    not clean up after themselves. Scans the whole table, so it is a
+    maintenance call; writes already drop the images of the rows they remove.
+
+    Returns:
+        int: Number of images deleted.
+    """
+    with get_connection() as conn:
+        cursor = conn.execute(DELETE_ORPHANED_IMAGES_SQL)
+        conn.commit()
+        return cursor.rowcount
+
+
+def get_image_blob(digest):
+    """Return the stored bytes for an image hash, or None if unknown."""
+    with get_connection() as conn:
+        row = conn.execute("SELECT data FROM images WHERE hash = ?", (digest,)).fetchone()
+    return row[0] if row else None
+
+
+# Week folder names, as made by crawler.storage.current_week: %U weeks run
+# Sunday to Saturday.
+WEEK_FOLDER_FORMAT = "%Y-W%U"
+
+
+def week_start_date(day=None):
+    """
+    Return the weekly_ad_starting_date (YYYY-MM-DD) for `day` (default today):
+    the Monday of the week folder containing it, so a Sunday maps to the next
+    day. Live crawls and backfills of the same folder thus share one date.
+    """
+    day = day or date.today()
+    return week_start_date_of(day.strftime(WEEK_FOLDER_FORMAT))
+
+
+def week_start_date_of(week):
+    """
+    Return the Monday of a YYYY-Www week folder name as YYYY-MM-DD, e.g. for
+    items backfilled into an earlier week.
+    """
+    return datetime.strptime(f"{week}-1", f"{WEEK_FOLDER_FORMAT}-%w").date().isoformat()
+
+
+def _result_row(item):
+    """Accept a dict keyed by RESULT_FIELDS or a tuple in the same order."""
+    if isinstance(item, dict):
+        return tuple(item.get(field) for field in RESULT_FIELDS)
+    row = tuple(item)
+    if len(row) != len(RESULT_FIELDS):
+        raise ValueError(f"Expected {len(RESULT_FIELDS)} values per row, got {len(row)}.")
+    return row
+
+
+def insert_crawler_results_many(items, chunk_size=500, upsert=False):
+    """
+    Insert many crawler results with executemany, one transaction per chunk.
+
+    Args:
+        items (iterable): dicts keyed by RESULT_FIELDS, or tuples in that order
+            (storename, weekly_ad_starting_date, product, image_url, image_bytes, price).
+            May be a generator; it is consumed chunk by chunk.
+        chunk_size (int): Rows per transaction. Use a large value for a single transaction.
+        upsert (bool): If True, rows replace existing rows with the same
+            storename, weekly_ad_starting_date and product. Rows with the
+            same item_key never duplicate either way.
+
+    Returns:
+        int: Number of rows written.
+    """
+    rows = map(_result_row, items)
+    written = 0
+    conn = get_connection()
+    try:
+        cursor = conn.cursor()
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            _write_chunk(cursor, chunk, upsert)
+            conn.commit()
+            written += len(chunk)
+    finally:
+        # Returning the connection rolls back a chunk that failed midway.
+        conn.close()
+    return written
+
+
+class CrawlerResultWriter:
+    """
+    Streaming writer for crawlers: buffer results as they are extracted and
+    write them in chunked transactions through insert_crawler_results_many.
+
+    Usage:
+        with CrawlerResultWriter(upsert=True) as writer:
+            writer.add("kroger", week_start_date(), "Bananas", url, image_bytes, "$0.59")
+    """
+
+    def __init__(self, chunk_size=500, upsert=False):
+        self.chunk_size = chunk_size
+        self.upsert = upsert
+        self.written = 0
+        self._buffer = []
+
+    def add(self, storename, weekly_ad_starting_date, product, image_url, image_bytes, price):
+        self._buffer.append(
+            (storename, weekly_ad_starting_date, product, image_url, image_bytes, price)
+        )
+        if len(self._buffer) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if not self._buffer:
+            return
+        rows, self._buffer = self._buffer, []
+        self.written += insert_crawler_results_many(
+            rows, chunk_size=self.chunk_size, upsert=self.upsert
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # Rows extracted before a crawler error are still valid, so keep them.
+        self.flush()
+
+
 # Remove the main method and ensure this module is only used as an importable utility.
-# The get_connection() function will handle DB creation if needed.
+# The first get_connection() call creates the pool and runs init_db() once.
 
 # Example usage:
 # from db_engine.sqlite_engine import insert_crawler_result
@@ -0,0 +1,42 @@
+"""Incremental JSON array encoding for StreamingResponse bodies.
+
+orjson is used when installed (it is several times faster than the standard
+library and returns bytes directly); otherwise json.dumps is the fallback.
+"""
+import json
+
+try:
+    import orjson
+except ImportError:  # optional speed-up
+    orjson = None
+
+# Flush to the client once this many encoded bytes are buffered.
+DEFAULT_CHUNK_BYTES = 64 * 1024
+
+
+def dumps(obj) -> bytes:
+    """Encode one JSON value to compact UTF-8 bytes."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def iter_json_array(items, chunk_bytes: int = DEFAULT_CHUNK_BYTES):
+    """
+    Yield a JSON array of `items` as byte chunks of roughly `chunk_bytes`.
+
+    Items are encoded one at a time, so only the current chunk is held in
+    memory no matter how many items the iterable produces.
+    """
+    buffer = bytearray(b"[")
+    first = True
+    for item in items:
+        if not first:
+            buffer += b","
+        buffer += dumps(item)
+        first = False
+        if len(buffer) >= chunk_bytes:
+            yield bytes(buffer)
+            buffer.clear()
+    buffer += b"]"
+    yield bytes(buffer)
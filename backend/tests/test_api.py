@@ -1,7 +1,13 @@
+import os
+import subprocess
+import sys
+import tempfile
 import unittest
+from pathlib import Path
 from unittest.mock import patch
 from fastapi.testclient import TestClient
 from api import app
+from db_engine import sqlite_engine
 
 client = TestClient(app)
 
@@ -72,5 +78,123 @@ class TestWeeklyAdAPI(unittest.TestCase):
             )
 
 
+class TestWeeklyAdPagination(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.original_db_path = sqlite_engine.DB_PATH
+        sqlite_engine.DB_PATH = Path(self.tmpdir.name) / "api_test.db"
+        sqlite_engine.insert_crawler_results_many(
+            ("Kroger", "2025-09-01", f"Item{i}", None, b"img%d" % (i % 2), f"{i}.00")
+            for i in range(5)
+        )
+        sqlite_engine.insert_crawler_result("Kroger", "2025-09-08", "Other", None, None, "1.00")
+
+    def tearDown(self):
+        sqlite_engine.close_pool()
+        sqlite_engine.DB_PATH = self.original_db_path
+        self.tmpdir.cleanup()
+
+    def test_pages_follow_cursor_header(self):
+        url = "/weeklyad/?storename=Kroger&week=2025-09-01&limit=2"
+        products = []
+        after_id = 0
+        pages = 0
+        while True:
+            response = client.get(f"{url}&after_id={after_id}")
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            self.assertLessEqual(len(data), 2)
+            products.extend(item["product"] for item in data)
+            pages += 1
+            cursor = response.headers.get("X-Next-After-Id")
+            if cursor is None:
+                break
+            after_id = int(cursor)
+            self.assertEqual(after_id, data[-1]["id"])
+        self.assertEqual(products, [f"Item{i}" for i in range(5)])
+        self.assertEqual(pages, 3)
+
+    def test_listing_without_images_returns_hashes(self):
+        response = client.get(
+            "/weeklyad/?storename=Kroger&week=2025-09-01&include_images=false"
+        )
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(len(data), 5)
+        self.assertNotIn("image_base64", data[0])
+        self.assertEqual(data[0]["image_hash"], sqlite_engine.image_hash(b"img0"))
+        self.assertIsNone(response.headers.get("X-Next-After-Id"))
+
+        image = client.get(f"/dbimage/{data[1]['image_hash']}")
+        self.assertEqual(image.status_code, 200)
+        self.assertEqual(image.content, b"img1")
+        self.assertIn("immutable", image.headers["cache-control"])
+
+        cached = client.get(
+            f"/dbimage/{data[1]['image_hash']}",
+            headers={"If-None-Match": image.headers["etag"]},
+        )
+        self.assertEqual(cached.status_code, 304)
+
+    def test_paged_request_with_images(self):
+        response = client.get("/weeklyad/?storename=Kroger&week=2025-09-01&limit=1")
+        data = response.json()
+        self.assertEqual(len(data), 1)
+        self.assertIsNotNone(data[0]["image_base64"])
+        self.assertIn("X-Next-After-Id", response.headers)
+
+    def test_after_last_page_returns_empty_list(self):
+        response = client.get(
+            "/weeklyad/?storename=Kroger&week=2025-09-01&after_id=1000"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), [])
+
+    def test_limit_is_capped(self):
+        response = client.get("/weeklyad/?storename=Kroger&week=2025-09-01&limit=100000")
+        self.assertEqual(response.status_code, 422)
+
+    def test_unknown_week_not_found(self):
+        response = client.get("/weeklyad/?storename=Kroger&week=1999-01-04&limit=10")
+        self.assertEqual(response.status_code, 404)
+
+    def test_stream_whole_week(self):
+        response = client.get(
+            "/weeklyad/?storename=Kroger&week=2025-09-01&stream=true&include_images=false"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["content-type"], "application/json")
+        data = response.json()
+        self.assertEqual([item["product"] for item in data], [f"Item{i}" for i in range(5)])
+        self.assertEqual(data[0]["image_hash"], sqlite_engine.image_hash(b"img0"))
+        self.assertEqual(sqlite_engine.get_pool_stats()["in_use"], 0)
+
+    def test_stream_with_images(self):
+        response = client.get("/weeklyad/?storename=Kroger&week=2025-09-01&stream=true")
+        data = response.json()
+        self.assertEqual(len(data), 5)
+        self.assertIsNotNone(data[0]["image_base64"])
+
+    def test_stream_unknown_week_not_found(self):
+        response = client.get("/weeklyad/?storename=Kroger&week=1999-01-04&stream=true")
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(sqlite_engine.get_pool_stats()["in_use"], 0)
+
+    def test_unknown_db_image_not_found(self):
+        response = client.get("/dbimage/" + "0" * 64)
+        self.assertEqual(response.status_code, 404)
+
+
+class TestAPIImports(unittest.TestCase):
+    def test_api_import_does_not_load_selenium(self):
+        backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        out = subprocess.check_output(
+            [sys.executable, "-c", "import sys, api; print('selenium' in sys.modules)"],
+            cwd=backend_dir,
+            text=True,
+        )
+        self.assertEqual(out.strip().splitlines()[-1], "False")
+
+
 if __name__ == "__main__":
     unittest.main()
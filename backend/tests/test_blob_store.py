@@ -0,0 +1,165 @@
+import hashlib
+import json
+import os
+import stat
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from api import app
+from crawler import blob_store, storage
+from crawler.http_cache import HttpCacheIndex
+
+client = TestClient(app)
+
+
+class TestBlobStore(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.config_patcher = patch.dict(
+            storage.FILE_SYSTEM_CONFIG, {"DATA_BASE_DIR": self.tmpdir.name}
+        )
+        self.config_patcher.start()
+
+    def tearDown(self):
+        self.config_patcher.stop()
+        self.tmpdir.cleanup()
+
+    def _age(self, path, seconds):
+        past = time.time() - seconds
+        os.utime(path, (past, past))
+
+    def test_put_bytes_is_sharded_deduplicated_and_read_only(self):
+        digest, path = blob_store.put_bytes(b"image-a")
+        self.assertEqual(digest, hashlib.sha256(b"image-a").hexdigest())
+        self.assertEqual(
+            path, os.path.join(self.tmpdir.name, "blobs", digest[:2], digest[2:4], digest)
+        )
+        self.assertFalse(os.stat(path).st_mode & stat.S_IWUSR)
+
+        # A dedupe hit keeps the blob but refreshes its mtime for the GC grace window.
+        self._age(path, 7200)
+        self.assertEqual(blob_store.put_bytes(b"image-a"), (digest, path))
+        self.assertGreater(os.stat(path).st_mtime, time.time() - 3600)
+        self.assertEqual(len(list(blob_store.iter_blobs())), 1)
+
+    def test_put_file_matches_put_bytes(self):
+        src = os.path.join(self.tmpdir.name, "a.png")
+        with open(src, "wb") as f:
+            f.write(b"image-a")
+        self.assertEqual(blob_store.put_file(src), blob_store.put_bytes(b"image-a"))
+
+    def test_put_stream_publishes_nothing_when_the_stream_fails(self):
+        def chunks():
+            yield b"partial"
+            raise ConnectionError("dropped")
+
+        with self.assertRaises(ConnectionError):
+            blob_store.put_stream(chunks())
+        blobs = os.path.join(self.tmpdir.name, "blobs")
+        self.assertEqual([f for _, _, files in os.walk(blobs) for f in files], [])
+
+        digest, path = blob_store.put_stream(iter([b"image", b"-a"]))
+        self.assertEqual((digest, path), blob_store.put_bytes(b"image-a"))
+
+    def test_get_blob_path_rejects_non_digests(self):
+        self.assertIsNone(blob_store.get_blob_path("../../etc/passwd"))
+        self.assertIsNone(blob_store.get_blob_path("0" * 64))
+        with self.assertRaises(ValueError):
+            blob_store.blob_path("abc")
+
+    def test_collect_garbage_keeps_referenced_and_recent_blobs(self):
+        kept, kept_path = blob_store.put_bytes(b"referenced")
+        _, orphan_path = blob_store.put_bytes(b"orphan")
+        _, young_path = blob_store.put_bytes(b"young")
+        self._age(kept_path, 7200)
+        self._age(orphan_path, 7200)
+        # References in a pending segment count once compacted.
+        storage.save_grocery_items([{"name": "A", "image_digest": kept}], "kroger", "2025-W01")
+
+        dry = blob_store.collect_garbage(grace_seconds=3600, dry_run=True)
+        self.assertEqual(dry["removed"], 1)
+        self.assertTrue(os.path.exists(orphan_path))
+
+        result = blob_store.collect_garbage(grace_seconds=3600)
+        self.assertEqual(result, {"kept": 2, "removed": 1, "bytes_freed": len(b"orphan")})
+        self.assertFalse(os.path.exists(orphan_path))
+        self.assertTrue(os.path.exists(kept_path))
+        self.assertTrue(os.path.exists(young_path))
+        with open(storage.get_json_file_path("kroger", "2025-W01"), "rb") as f:
+            self.assertEqual(json.load(f)[0]["image_digest"], kept)
+
+    def test_publishing_over_a_read_only_blob_keeps_it(self):
+        digest, path = blob_store.put_bytes(b"image-a")
+        tmp_path = path + ".race.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(b"image-a")
+        # Windows refuses to replace the read-only blob a racing writer published
+        with patch.object(blob_store.os, "replace", side_effect=PermissionError("read-only")):
+            blob_store._place(tmp_path, path)
+        self.assertFalse(os.path.exists(tmp_path))
+        self.assertEqual(blob_store.get_blob_path(digest), path)
+
+    def test_collect_garbage_survives_undeletable_blobs(self):
+        _, stuck_path = blob_store.put_bytes(b"stuck")
+        _, orphan_path = blob_store.put_bytes(b"orphan")
+        self._age(stuck_path, 7200)
+        self._age(orphan_path, 7200)
+        remove = os.remove
+
+        def flaky_remove(path):
+            if path == stuck_path:
+                raise PermissionError("in use")
+            remove(path)
+
+        with patch.object(blob_store.os, "remove", side_effect=flaky_remove):
+            result = blob_store.collect_garbage(grace_seconds=3600)
+        self.assertEqual(result, {"kept": 1, "removed": 1, "bytes_freed": len(b"orphan")})
+        self.assertFalse(os.path.exists(orphan_path))
+
+    def test_collect_garbage_keeps_blobs_in_the_http_cache(self):
+        cached, cached_path = blob_store.put_bytes(b"cached")
+        _, orphan_path = blob_store.put_bytes(b"orphan")
+        self._age(cached_path, 7200)
+        self._age(orphan_path, 7200)
+        cache = HttpCacheIndex()
+        cache.record_download("https://example.com/a.png", {"ETag": '"a"'}, cached_path, 6, cached)
+        cache.save()
+
+        result = blob_store.collect_garbage(grace_seconds=3600)
+        self.assertEqual(result, {"kept": 1, "removed": 1, "bytes_freed": len(b"orphan")})
+        self.assertTrue(os.path.exists(cached_path))
+        self.assertFalse(os.path.exists(orphan_path))
+
+    def test_blob_endpoint_is_cacheable_forever(self):
+        png = b"\x89PNG\r\n\x1a\n" + b"\x00" * 16
+        digest, _ = blob_store.put_bytes(png)
+
+        response = client.get(f"/blob/{digest}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, png)
+        self.assertEqual(response.headers["content-type"], "image/png")
+        self.assertEqual(response.headers["etag"], f'"{digest}"')
+        self.assertIn("immutable", response.headers["cache-control"])
+
+        response = client.get(f"/blob/{digest}", headers={"If-None-Match": f'"{digest}"'})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(client.get(f"/blob/{'0' * 64}").status_code, 404)
+
+        avif, _ = blob_store.put_bytes(b"\x00\x00\x00\x1cftypavif" + b"\x00" * 16)
+        self.assertEqual(client.get(f"/blob/{avif}").headers["content-type"], "image/avif")
+
+    def test_getimagebytes_by_digest(self):
+        digest, _ = blob_store.put_bytes(b"image-a")
+        response = client.get(f"/getimagebytes/?image_digest={digest}")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("immutable", response.headers["cache-control"])
+        self.assertEqual(client.get("/getimagebytes/?image_digest=bad").status_code, 404)
+        self.assertEqual(client.get("/getimagebytes/").status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,27 @@
+import unittest
+
+from crawler import blurhash
+
+
+class TestBlurhash(unittest.TestCase):
+    def test_matches_reference_encoder(self):
+        # Expected values produced by the reference implementation.
+        width, height = 32, 24
+        pixels = bytes(
+            v for y in range(height) for x in range(width) for v in (x * 8, y * 10, 128)
+        )
+        self.assertEqual(blurhash.encode(pixels, width, height), "LxH27k2swxX8mHWWjtf7gJfjfQfj")
+
+    def test_solid_colour_has_flat_components(self):
+        pixels = bytes((255, 0, 0)) * 16
+        self.assertEqual(blurhash.encode(pixels, 4, 4, 1, 1), "00TI:j")
+
+    def test_rejects_bad_arguments(self):
+        with self.assertRaises(ValueError):
+            blurhash.encode(b"\x00" * 12, 2, 2, 10, 3)
+        with self.assertRaises(ValueError):
+            blurhash.encode(b"\x00" * 11, 2, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
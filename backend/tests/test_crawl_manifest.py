@@ -0,0 +1,58 @@
+import json
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from crawler import storage
+from crawler.crawl_manifest import CrawlManifest
+from crawler.item_keys import item_key
+
+ITEMS = [
+    {"name": "Kroger Milk", "price": "2/$5"},
+    {"name": "Fresh Strawberries, 1 lb", "price": "With Card $2.99 each"},
+]
+
+
+class TestCrawlManifest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.config_patcher = patch.dict(storage.FILE_SYSTEM_CONFIG, {"DATA_BASE_DIR": self.tmpdir.name})
+        self.config_patcher.start()
+
+    def tearDown(self):
+        self.config_patcher.stop()
+        self.tmpdir.cleanup()
+
+    def test_key_is_the_item_key_without_an_image(self):
+        manifest = CrawlManifest("kroger", "2025-W01")
+        self.assertEqual(manifest.key({"name": " kroger\nmilk ", "price": "2/$5", "image_digest": "abc"}),
+                         item_key("kroger", "2025-W01", "Kroger Milk", "2/$5"))
+        self.assertNotEqual(manifest.key({"name": "Kroger Milk", "price": "$3"}), manifest.key(ITEMS[0]))
+        self.assertNotEqual(CrawlManifest("kroger", "2025-W02").key(ITEMS[0]), manifest.key(ITEMS[0]))
+
+    def test_first_crawl_adds_everything(self):
+        plan = CrawlManifest("kroger", "2025-W01").plan("ViewAd-1", ITEMS)
+        self.assertEqual(plan, (False, ITEMS, set()))
+
+    def test_unchanged_and_changed_ads(self):
+        manifest = CrawlManifest("kroger", "2025-W01")
+        manifest.update("ViewAd-1", 2, map(manifest.key, ITEMS))
+
+        manifest = CrawlManifest("kroger", "2025-W01")
+        self.assertTrue(manifest.plan("ViewAd-1", list(reversed(ITEMS))).unchanged)
+        self.assertFalse(manifest.plan("ViewAd-2", ITEMS).unchanged)
+
+        eggs = {"name": "Eggs", "price": "$1.99"}
+        plan = manifest.plan("ViewAd-1", [ITEMS[0], eggs, eggs])
+        self.assertEqual(plan, (False, [eggs, eggs], {manifest.key(ITEMS[1])}))
+
+        manifest.update("ViewAd-1", 3, [manifest.key(eggs)], plan.removed)
+        with open(manifest.path, encoding="utf-8") as f:
+            data = json.load(f)
+        self.assertEqual((data["card_count"], data["item_count"]), (3, 2))
+        self.assertEqual(set(data["keys"]), {manifest.key(ITEMS[0]), manifest.key(eggs)})
+        self.assertTrue(CrawlManifest("kroger", "2025-W01").plan("ViewAd-1", [eggs, ITEMS[0]]).unchanged)
+
+
+if __name__ == "__main__":
+    unittest.main()
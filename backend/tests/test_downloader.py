@@ -0,0 +1,233 @@
+import hashlib
+import os
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+from crawler import storage
+from crawler.downloader import DownloadJob, ImageDownloader
+from crawler.http_cache import HttpCacheIndex
+from crawler.utility import download_image
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 64
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Local stand-in for an image CDN."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            server.ports.add(self.client_address[1])
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+        try:
+            if self.path.startswith("/slow/"):
+                time.sleep(0.05)
+            if self.path.startswith("/flaky/"):
+                with server.lock:
+                    server.flaky_hits += 1
+                    fail = server.flaky_hits <= 2
+                if fail:
+                    self.send_error(503)
+                    return
+            if self.path.startswith("/missing/"):
+                self.send_error(404)
+                return
+            if self.path.startswith("/html/"):
+                body = b"<html>blocked</html>"
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                return
+            if self.path.startswith("/truncated/"):
+                # Promise more bytes than are sent, then drop the connection.
+                self.send_response(200)
+                self.send_header("Content-Type", "image/png")
+                self.send_header("Content-Length", str(len(PNG) * 4))
+                self.end_headers()
+                self.wfile.write(PNG)
+                self.close_connection = True
+                return
+            etag = f'"{server.etag}"'
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "image/png")
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", str(len(PNG)))
+            self.end_headers()
+            self.wfile.write(PNG)
+        finally:
+            with server.lock:
+                server.active -= 1
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestImageDownloader(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.config_patcher = patch.dict(
+            storage.FILE_SYSTEM_CONFIG, {"DATA_BASE_DIR": self.tmpdir.name}
+        )
+        self.config_patcher.start()
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+        self.server.lock = threading.Lock()
+        self.server.requests = 0
+        self.server.ports = set()
+        self.server.active = 0
+        self.server.max_active = 0
+        self.server.flaky_hits = 0
+        self.server.etag = "v1"
+        self.server.daemon_threads = True
+        threading.Thread(
+            target=self.server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+        ).start()
+        self.base = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.config_patcher.stop()
+        self.tmpdir.cleanup()
+
+    def test_downloads_jobs_and_runs_callback(self):
+        done = []
+        jobs = [
+            DownloadJob(f"{self.base}/img/{i}.png", f"Item {i}", "kroger", "2025-W01")
+            for i in range(10)
+        ]
+        with ImageDownloader(max_workers=4) as downloader:
+            results = downloader.download_all(jobs, callback=done.append)
+
+        self.assertEqual(len(done), 10)
+        self.assertTrue(all(r.ok for r in results))
+        self.assertEqual([r.job for r in results], jobs)
+        # Identical bytes are stored once, named by their digest.
+        self.assertEqual({r.digest for r in results}, {hashlib.sha256(PNG).hexdigest()})
+        self.assertEqual(os.path.basename(results[3].path), results[3].digest)
+        with open(results[3].path, "rb") as f:
+            self.assertEqual(f.read(), PNG)
+
+    def test_connections_are_reused(self):
+        jobs = [
+            DownloadJob(f"{self.base}/img/{i}.png", f"Item {i}", "kroger", "2025-W01")
+            for i in range(20)
+        ]
+        with ImageDownloader(max_workers=2, per_host_limit=2) as downloader:
+            downloader.download_all(jobs)
+        self.assertEqual(self.server.requests, 20)
+        self.assertLessEqual(len(self.server.ports), 2)
+
+    def test_per_host_limit(self):
+        jobs = [
+            DownloadJob(f"{self.base}/slow/{i}.png", f"Item {i}", "kroger", "2025-W01")
+            for i in range(12)
+        ]
+        with ImageDownloader(max_workers=8, per_host_limit=2) as downloader:
+            results = downloader.download_all(jobs)
+        self.assertTrue(all(r.ok for r in results))
+        self.assertLessEqual(self.server.max_active, 2)
+
+    def test_retries_transient_errors(self):
+        job = DownloadJob(f"{self.base}/flaky/a.png", "Flaky", "kroger", "2025-W01")
+        with ImageDownloader(retries=3, backoff=0.01) as downloader:
+            result = downloader.submit(job).result()
+            stats = downloader.stats()
+        self.assertTrue(result.ok)
+        self.assertEqual(result.attempts, 3)
+        self.assertEqual(stats["retries"], 2)
+
+    def test_does_not_retry_client_errors(self):
+        job = DownloadJob(f"{self.base}/missing/a.png", "Missing", "kroger", "2025-W01")
+        with ImageDownloader(retries=3, backoff=0.01) as downloader:
+            result = downloader.submit(job).result()
+        self.assertFalse(result.ok)
+        self.assertEqual(result.attempts, 1)
+        self.assertIsNone(result.path)
+        self.assertIsNone(result.digest)
+
+    def test_conditional_requests_reuse_unchanged_images(self):
+        url = f"{self.base}/img/montage.png"
+        cache = HttpCacheIndex()
+        with ImageDownloader(cache=cache) as downloader:
+            first = downloader.submit(DownloadJob(url, "Montage", "kroger", "2025-W01")).result()
+        cache.save()
+        self.assertFalse(first.cached)
+        past = time.time() - 7200
+        os.utime(first.path, (past, past))
+
+        # A later crawl (fresh index loaded from disk) gets a 304 and reuses the blob.
+        cache = HttpCacheIndex()
+        with ImageDownloader(cache=cache) as downloader:
+            second = downloader.submit(DownloadJob(url, "Montage", "kroger", "2025-W02")).result()
+            stats = downloader.stats()
+        self.assertTrue(second.ok)
+        self.assertTrue(second.cached)
+        self.assertEqual(stats["not_modified"], 1)
+        self.assertEqual(stats["bytes"], 0)
+        self.assertEqual(second.digest, first.digest)
+        self.assertEqual(second.path, first.path)
+        self.assertEqual(cache.stats()["hits"], 1)
+        self.assertEqual(cache.stats()["bytes_saved"], len(PNG))
+        # reuse refreshes the blob's mtime, restarting the GC grace window
+        self.assertGreater(os.stat(first.path).st_mtime, past + 3600)
+
+    def test_changed_image_is_downloaded_again(self):
+        url = f"{self.base}/img/montage.png"
+        cache = HttpCacheIndex()
+        with ImageDownloader(cache=cache) as downloader:
+            downloader.submit(DownloadJob(url, "Montage", "kroger", "2025-W01")).result()
+            self.server.etag = "v2"
+            result = downloader.submit(DownloadJob(url, "Montage", "kroger", "2025-W02")).result()
+        self.assertFalse(result.cached)
+        self.assertEqual(cache.stats()["misses"], 2)
+        self.assertEqual(cache.lookup(url)["etag"], '"v2"')
+
+    def _published_files(self):
+        blobs = os.path.join(self.tmpdir.name, "blobs")
+        return [f for _, _, files in os.walk(blobs) for f in files]
+
+    def test_rejects_non_image_and_oversized_bodies(self):
+        with ImageDownloader(retries=0, max_bytes=len(PNG) - 1, chunk_size=16) as downloader:
+            html = downloader.submit(DownloadJob(f"{self.base}/html/a.png", "Html", "kroger")).result()
+            big = downloader.submit(DownloadJob(f"{self.base}/img/a.png", "Big", "kroger")).result()
+        self.assertIn("InvalidImageError", html.error)
+        self.assertIn("InvalidImageError", big.error)
+        self.assertEqual(big.attempts, 1)
+        self.assertEqual(self._published_files(), [])
+
+    def test_truncated_body_is_never_published(self):
+        job = DownloadJob(f"{self.base}/truncated/a.png", "Cut", "kroger")
+        with ImageDownloader(retries=1, backoff=0.01) as downloader:
+            result = downloader.submit(job).result()
+        self.assertFalse(result.ok)
+        self.assertEqual(result.attempts, 2)
+        self.assertEqual(self._published_files(), [])
+
+    def test_download_image_streams_into_blob_store(self):
+        path = download_image(f"{self.base}/img/a.png", "Item", "kroger", chunk_size=8)
+        self.assertEqual(os.path.basename(path), hashlib.sha256(PNG).hexdigest())
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), PNG)
+        self.assertIsNone(download_image(f"{self.base}/html/a.png", "Html", "kroger"))
+        self.assertIsNone(download_image(f"{self.base}/truncated/a.png", "Cut", "kroger"))
+        self.assertEqual(self._published_files(), [os.path.basename(path)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -19,7 +19,7 @@ class TestGetImageBytes(unittest.TestCase):
             with open(file_path, "wb") as f:
                 f.write(data)
 
-            with patch("crawler.utility.get_store_week_folder", return_value=tmpdir):
+            with patch("api.get_store_week_folder", return_value=tmpdir):
                 response = client.get(
                     f"/getimagebytes/?storename=Kroger&week=2025-12-29&image_filename={fname}"
                 )
@@ -30,7 +30,7 @@ class TestGetImageBytes(unittest.TestCase):
     def test_get_image_bytes_not_found(self):
         # folder exists but file does not
         with tempfile.TemporaryDirectory() as tmpdir:
-            with patch("crawler.utility.get_store_week_folder", return_value=tmpdir):
+            with patch("api.get_store_week_folder", return_value=tmpdir):
                 response = client.get(
                     "/getimagebytes/?storename=Kroger&week=2025-12-29&image_filename=missing.png"
                 )
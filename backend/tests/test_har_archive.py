@@ -0,0 +1,111 @@
+import os
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+from crawler import har_archive
+from crawler.har_archive import HarArchive, get_archive_folder
+
+PAGE = b'<html><body><p id="deal">Milk $2.99</p><script src="/data.js"></script></body></html>'
+DATA = b'document.body.dataset.loaded = "yes";'
+
+
+class _AdHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body, content_type = (DATA, "text/javascript") if self.path == "/data.js" else (PAGE, "text/html")
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Set-Cookie", "store=796; Path=/")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestHarArchive(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.config_patcher = patch.dict(har_archive.FILE_SYSTEM_CONFIG, {"DATA_BASE_DIR": self.tmpdir.name})
+        self.config_patcher.start()
+
+    def tearDown(self):
+        self.config_patcher.stop()
+        self.tmpdir.cleanup()
+
+    def test_archive_folder(self):
+        folder = get_archive_folder("kroger", "2025-W01")
+        self.assertEqual(folder, os.path.join(self.tmpdir.name, "har", "kroger", "2025-W01"))
+        self.assertTrue(os.path.isdir(folder))
+
+    def test_record_options(self):
+        archive = HarArchive(os.path.join(self.tmpdir.name, "new"), "record")
+        self.assertTrue(os.path.isdir(archive.folder))
+        self.assertEqual(archive.context_options(), {
+            "record_har_path": archive.har_path,
+            "record_har_mode": "full",
+            "record_har_content": "attach",
+        })
+
+    def test_replay_needs_a_recording(self):
+        folder = get_archive_folder("heb", "2025-W01")
+        with self.assertRaises(FileNotFoundError):
+            HarArchive(folder, "replay")
+        with self.assertRaises(ValueError):
+            HarArchive(folder, "live")
+
+        open(os.path.join(folder, har_archive.HAR_FILENAME), "wb").close()
+        archive = HarArchive(folder, "replay")
+        self.assertEqual(archive.context_options(), {})
+        open(archive.state_path, "w").close()
+        self.assertEqual(archive.context_options(), {"storage_state": archive.state_path})
+
+    def test_recorded_crawl_replays_without_the_server(self):
+        try:
+            from playwright.sync_api import sync_playwright
+        except ImportError:
+            self.skipTest("Playwright is not installed")
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _AdHandler)
+        url = f"http://127.0.0.1:{server.server_port}/weeklyad"
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        folder = get_archive_folder("kroger", "test")
+
+        with sync_playwright() as p:
+            try:
+                browser = p.chromium.launch()
+            except Exception as e:
+                server.shutdown()
+                server.server_close()
+                self.skipTest(f"Chromium is not available: {e}")
+            try:
+                archive = HarArchive(folder, "record")
+                context = browser.new_context(**archive.context_options())
+                page = context.new_page()
+                page.goto(url)
+                page.wait_for_function("document.body.dataset.loaded === 'yes'")
+                archive.finish(context)
+                context.close()
+            finally:
+                server.shutdown()
+                server.server_close()
+
+            try:
+                self.assertTrue(os.path.exists(archive.state_path))
+                archive = HarArchive(folder, "replay")
+                context = browser.new_context(**archive.context_options())
+                archive.attach(context)
+                self.assertEqual(context.cookies()[0]["name"], "store")
+                page = context.new_page()
+                page.goto(url)
+                page.wait_for_function("document.body.dataset.loaded === 'yes'")
+                self.assertEqual(page.inner_text("#deal"), "Milk $2.99")
+                context.close()
+            finally:
+                browser.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import os
+import tempfile
+import unittest
+
+from crawler.http_cache import HttpCacheIndex, normalize_url
+
+
+class TestNormalizeUrl(unittest.TestCase):
+    def test_equivalent_urls_share_a_key(self):
+        self.assertEqual(
+            normalize_url("HTTPS://Example.com:443/a.png?b=2&a=1#frag"),
+            normalize_url("https://example.com/a.png?a=1&b=2"),
+        )
+
+    def test_keeps_non_default_port_and_path_case(self):
+        self.assertEqual(
+            normalize_url("http://example.com:8080/Img.PNG"),
+            "http://example.com:8080/Img.PNG",
+        )
+
+
+class TestHttpCacheIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.index_path = os.path.join(self.tmpdir.name, "http_cache.json")
+        self.image_path = os.path.join(self.tmpdir.name, "a.png")
+        with open(self.image_path, "wb") as f:
+            f.write(b"image")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _record(self, cache, url="https://example.com/a.png", etag='"v1"'):
+        cache.record_download(
+            url, {"ETag": etag, "Last-Modified": "Mon, 06 Jan 2025 00:00:00 GMT"},
+            self.image_path, 5, "abc",
+        )
+
+    def test_conditional_headers(self):
+        cache = HttpCacheIndex(self.index_path)
+        self._record(cache)
+        self.assertEqual(
+            cache.conditional_headers(cache.lookup("https://example.com/a.png")),
+            {"If-None-Match": '"v1"', "If-Modified-Since": "Mon, 06 Jan 2025 00:00:00 GMT"},
+        )
+        self.assertEqual(cache.conditional_headers(None), {})
+
+    def test_lookup_ignores_missing_local_copy(self):
+        cache = HttpCacheIndex(self.index_path)
+        self._record(cache)
+        os.remove(self.image_path)
+        self.assertIsNone(cache.lookup("https://example.com/a.png"))
+
+    def test_save_merges_with_other_writers(self):
+        first = HttpCacheIndex(self.index_path)
+        second = HttpCacheIndex(self.index_path)
+        self._record(first, "https://example.com/a.png")
+        self._record(second, "https://example.com/b.png")
+        first.save()
+        second.save()
+
+        reloaded = HttpCacheIndex(self.index_path)
+        self.assertEqual(len(reloaded), 2)
+        self.assertEqual(len(second), 2)
+
+    def test_report(self):
+        cache = HttpCacheIndex(self.index_path)
+        self._record(cache)
+        cache.record_hit("https://example.com/a.png")
+        cache.record_hit("https://example.com/a.png")
+        self.assertEqual(cache.stats()["hit_rate"], 2 / 3)
+        self.assertIn("2/3 not modified (67% hit rate)", cache.report())
+
+
+if __name__ == "__main__":
+    unittest.main()
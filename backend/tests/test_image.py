@@ -0,0 +1,89 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from api import app, WEEK_IMAGE_CACHE_CONTROL
+
+client = TestClient(app)
+
+
+class TestGetImage(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.fname = "test_image.png"
+        self.data = b"\x89PNG\r\n\x1a\n" + bytes(range(256))
+        with open(os.path.join(self.tmpdir.name, self.fname), "wb") as f:
+            f.write(self.data)
+        self.patcher = patch("api.get_store_week_folder", return_value=self.tmpdir.name)
+        self.patcher.start()
+        self.url = f"/image/?storename=Kroger&week=2025-12-29&image_filename={self.fname}"
+
+    def tearDown(self):
+        self.patcher.stop()
+        self.tmpdir.cleanup()
+
+    def test_get_image_streams_raw_bytes(self):
+        response = client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, self.data)
+        self.assertEqual(response.headers["content-type"], "image/png")
+        # recrawls overwrite name-keyed images, so clients must revalidate
+        self.assertEqual(response.headers["cache-control"], WEEK_IMAGE_CACHE_CONTROL)
+        self.assertIn("etag", response.headers)
+        self.assertIn("last-modified", response.headers)
+
+    def test_get_image_if_none_match_returns_304(self):
+        etag = client.get(self.url).headers["etag"]
+        response = client.get(self.url, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(response.headers["etag"], etag)
+
+    def test_get_image_if_modified_since_returns_304(self):
+        last_modified = client.get(self.url).headers["last-modified"]
+        response = client.get(self.url, headers={"If-Modified-Since": last_modified})
+        self.assertEqual(response.status_code, 304)
+
+    def test_get_image_stale_etag_returns_body(self):
+        response = client.get(self.url, headers={"If-None-Match": '"stale"'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, self.data)
+
+    def test_get_image_range_request(self):
+        response = client.get(self.url, headers={"Range": "bytes=0-7"})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.content, self.data[:8])
+        self.assertEqual(
+            response.headers["content-range"], f"bytes 0-7/{len(self.data)}"
+        )
+
+    def test_get_image_not_found(self):
+        response = client.get(
+            "/image/?storename=Kroger&week=2025-12-29&image_filename=missing.png"
+        )
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json().get("detail"), "Image file not found.")
+
+    def test_get_image_rejects_path_traversal(self):
+        response = client.get(
+            "/image/?storename=Kroger&week=2025-12-29&image_filename=../weekly_ad.json"
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_get_image_rejects_store_and_week_traversal(self):
+        self.patcher.stop()
+        try:
+            for query in (
+                "storename=/etc&week=.&image_filename=passwd",
+                "storename=..&week=..&image_filename=passwd",
+                "storename=Kroger&week=../..&image_filename=passwd",
+            ):
+                self.assertEqual(client.get(f"/image/?{query}").status_code, 400, query)
+                self.assertEqual(client.get(f"/getimagebytes/?{query}").status_code, 400, query)
+        finally:
+            self.patcher.start()
+
+
+if __name__ == "__main__":
+    unittest.main()
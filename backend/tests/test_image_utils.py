@@ -0,0 +1,61 @@
+import unittest
+
+from crawler.image_utils import InvalidImageError, iter_validated_chunks, sniff_image_type
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 40
+JPEG = b"\xff\xd8\xff\xe0" + b"\x00" * 40
+WEBP = b"RIFF\x00\x00\x00\x00WEBPVP8 " + b"\x00" * 40
+
+
+class TestSniffImageType(unittest.TestCase):
+    def test_known_formats(self):
+        self.assertEqual(sniff_image_type(PNG), "image/png")
+        self.assertEqual(sniff_image_type(JPEG), "image/jpeg")
+        self.assertEqual(sniff_image_type(b"GIF89a" + b"\x00" * 10), "image/gif")
+        self.assertEqual(sniff_image_type(WEBP), "image/webp")
+        self.assertEqual(sniff_image_type(b"\x00\x00\x00\x1cftypavif"), "image/avif")
+
+    def test_unknown(self):
+        self.assertIsNone(sniff_image_type(b"<html><body>Access denied"))
+
+
+class TestIterValidatedChunks(unittest.TestCase):
+    def _chunks(self, data, size=5):
+        return [data[i:i + size] for i in range(0, len(data), size)]
+
+    def test_passes_image_through_unchanged(self):
+        out = b"".join(iter_validated_chunks(self._chunks(PNG), "image/png"))
+        self.assertEqual(out, PNG)
+
+    def test_short_image_is_checked_at_end(self):
+        self.assertEqual(b"".join(iter_validated_chunks([b"GIF89a"])), b"GIF89a")
+
+    def test_generic_content_type_is_decided_by_magic_bytes(self):
+        out = b"".join(iter_validated_chunks([JPEG], "binary/octet-stream"))
+        self.assertEqual(out, JPEG)
+        with self.assertRaises(InvalidImageError):
+            list(iter_validated_chunks([b"not an image at all"], "application/octet-stream"))
+
+    def test_rejects_declared_non_image(self):
+        with self.assertRaises(InvalidImageError):
+            list(iter_validated_chunks([PNG], "text/html; charset=utf-8"))
+
+    def test_rejects_oversized_body_before_reading_it_all(self):
+        read = []
+
+        def chunks():
+            for chunk in self._chunks(PNG * 10, 16):
+                read.append(chunk)
+                yield chunk
+
+        with self.assertRaises(InvalidImageError):
+            list(iter_validated_chunks(chunks(), "image/png", max_bytes=64))
+        self.assertEqual(len(read), 5)
+
+    def test_rejects_truncated_body(self):
+        with self.assertRaises(InvalidImageError):
+            list(iter_validated_chunks([PNG], "image/png", expected_length=len(PNG) + 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
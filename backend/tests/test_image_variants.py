@@ -0,0 +1,146 @@
+import io
+import os
+import random
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from api import app
+from crawler import blob_store, image_variants, storage
+
+client = TestClient(app)
+
+
+def make_png(width=1200, height=900) -> bytes:
+    # Noisy pixels so the encoder cannot shrink the original to nothing.
+    rng = random.Random(0)
+    image = image_variants.Image.frombytes(
+        "RGB", (width, height), bytes(rng.getrandbits(8) for _ in range(width * height * 3))
+    )
+    buffer = io.BytesIO()
+    image.save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+@unittest.skipIf(image_variants.Image is None, "Pillow is not installed")
+class TestImageVariants(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.png = make_png()
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.config_patcher = patch.dict(
+            storage.FILE_SYSTEM_CONFIG, {"DATA_BASE_DIR": self.tmpdir.name}
+        )
+        self.config_patcher.start()
+        self.digest, _ = blob_store.put_bytes(self.png)
+
+    def tearDown(self):
+        self.config_patcher.stop()
+        self.tmpdir.cleanup()
+
+    def _variants(self, digest):
+        return image_variants.process_image(digest)["image_variants"]
+
+    def _open(self, digest):
+        return image_variants.Image.open(blob_store.get_blob_path(digest))
+
+    def test_generates_webp_variants(self):
+        variants = self._variants(self.digest)
+        self.assertEqual(set(variants), {"thumb", "medium"})
+        with self._open(variants["thumb"]) as thumb:
+            self.assertEqual(thumb.format, "WEBP")
+            self.assertEqual(thumb.size, (200, 150))
+        with self._open(variants["medium"]) as medium:
+            self.assertEqual(medium.size, (600, 450))
+        thumb_size = os.path.getsize(blob_store.get_blob_path(variants["thumb"]))
+        self.assertLess(thumb_size * 10, len(self.png))
+        self.assertEqual(blob_store.get_variants(self.digest), variants)
+
+    def test_second_run_reuses_recorded_variants(self):
+        first = self._variants(self.digest)
+        path = blob_store.get_blob_path(first["thumb"])
+        mtime = os.stat(path).st_mtime_ns
+        self.assertEqual(self._variants(self.digest), first)
+        self.assertEqual(os.stat(path).st_mtime_ns, mtime)
+
+    def test_small_images_are_not_enlarged(self):
+        digest, _ = blob_store.put_bytes(make_png(120, 80))
+        variants = self._variants(digest)
+        with self._open(variants["medium"]) as medium:
+            self.assertEqual(medium.size, (120, 80))
+
+    def test_undecodable_blob_has_no_variants(self):
+        digest, _ = blob_store.put_bytes(b"\x89PNG\r\n\x1a\nbroken")
+        self.assertEqual(
+            image_variants.process_image(digest), {"image_variants": {}, "image_meta": {}}
+        )
+
+    def test_generator_runs_in_worker_processes(self):
+        with image_variants.ImageProcessor(max_workers=2) as processor:
+            result = processor.submit(self.digest).result()
+            self.assertEqual(processor.submit(None).result()["image_variants"], {})
+        self.assertEqual(result["image_variants"], blob_store.get_variants(self.digest))
+        self.assertEqual(result["image_meta"], blob_store.get_metadata(self.digest))
+
+    def test_metadata(self):
+        meta = image_variants.process_image(self.digest)["image_meta"]
+        self.assertEqual(meta["width"], 1200)
+        self.assertEqual(meta["height"], 900)
+        self.assertEqual(meta["format"], "png")
+        self.assertEqual(meta["bytes"], len(self.png))
+        self.assertEqual(meta["sha256"], self.digest)
+        self.assertEqual(len(meta["blurhash"]), 28)  # 4x3 components
+
+    def test_weekly_ad_returns_image_fields(self):
+        fields = image_variants.process_image(self.digest)
+        item = {"name": "A", "price": "$1", "image_digest": self.digest, **fields}
+        storage.save_grocery_items([item], "kroger", "2025-W01")
+        response = client.get("/weeklyadfromfile/?storename=kroger&week=2025-W01")
+        self.assertEqual(response.json(), [{**item, "item_key": storage.weekly_item_key("kroger", "2025-W01", item)}])
+
+    def test_blob_endpoint_serves_requested_size(self):
+        response = client.get(f"/blob/{self.digest}?size=thumb")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["etag"], f'"{self.digest}"')
+        self.assertEqual(response.headers["cache-control"], "no-cache")
+
+        variants = self._variants(self.digest)
+        response = client.get(f"/blob/{self.digest}?size=thumb")
+        self.assertEqual(response.headers["content-type"], "image/webp")
+        self.assertEqual(response.headers["etag"], f'"{variants["thumb"]}"')
+        self.assertIn("immutable", response.headers["cache-control"])
+        self.assertLess(len(response.content) * 10, len(self.png))
+
+        response = client.get(f"/getimagebytes/?image_digest={self.digest}&size=medium")
+        self.assertEqual(response.headers["etag"], f'"{variants["medium"]}"')
+        self.assertEqual(client.get(f"/blob/{self.digest}?size=huge").status_code, 400)
+
+    def test_garbage_collection_keeps_variants_of_referenced_images(self):
+        variants = self._variants(self.digest)
+        storage.save_grocery_items(
+            [{"name": "A", "image_digest": self.digest, "image_variants": variants}],
+            "kroger",
+            "2025-W01",
+        )
+        orphan, orphan_path = blob_store.put_bytes(make_png(300, 300))
+        orphan_variants = self._variants(orphan)
+        past = time.time() - 7200
+        for _, path in blob_store.iter_blobs():
+            os.utime(path, (past, past))
+
+        result = blob_store.collect_garbage(grace_seconds=3600)
+        self.assertEqual(result["removed"], 3)
+        for digest in [self.digest, *variants.values()]:
+            self.assertIsNotNone(blob_store.get_blob_path(digest))
+        for digest in [orphan, *orphan_variants.values()]:
+            self.assertIsNone(blob_store.get_blob_path(digest))
+        self.assertFalse(os.path.exists(orphan_path + blob_store.VARIANTS_SUFFIX))
+
+
+if __name__ == "__main__":
+    unittest.main()
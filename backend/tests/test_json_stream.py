@@ -0,0 +1,27 @@
+import json
+import unittest
+from unittest.mock import patch
+
+import json_stream
+from json_stream import iter_json_array
+
+
+class TestIterJsonArray(unittest.TestCase):
+    def test_empty_iterable(self):
+        self.assertEqual(b"".join(iter_json_array([])), b"[]")
+
+    def test_round_trip_in_small_chunks(self):
+        items = [{"name": f"Item{i}", "price": i} for i in range(100)]
+        chunks = list(iter_json_array(iter(items), chunk_bytes=128))
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(json.loads(b"".join(chunks)), items)
+
+    def test_stdlib_fallback(self):
+        items = [{"name": "Café", "price": "$1.00"}]
+        with patch.object(json_stream, "orjson", None):
+            body = b"".join(iter_json_array(items))
+        self.assertEqual(json.loads(body), items)
+
+
+if __name__ == "__main__":
+    unittest.main()
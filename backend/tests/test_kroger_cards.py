@@ -0,0 +1,77 @@
+import unittest
+from pathlib import Path
+
+from crawler.kroger_cards import extract_card_records, parse_card_record, pick_img_src, process_image_url
+
+FIXTURE = Path(__file__).resolve().parents[1] / "benchmarks" / "fixtures" / "kroger_cards.html"
+MONTAGES = "https://www.krogercdn.com/weeklyads/images/Kroger/Montages/"
+
+EXPECTED = [
+    {"kind": "omni", "name": "Fresh Strawberries, 1 lb", "image_url": MONTAGES + "a1.jpg?w=300",
+     "price": "With Card $2.99 each"},
+    {"kind": "omni", "name": "Kroger Milk", "image_url": MONTAGES + "a2.jpg", "price": "2/$5"},
+    {"kind": "feature", "name": "Boneless Chicken Breast", "image_url": MONTAGES + "f1.jpg",
+     "price": "$1.99 per lb"},
+    {"kind": "feature", "name": "Coca-Cola 12 pack", "image_url": MONTAGES + "f2.jpg",
+     "price": "Buy 2 Get 1 Free"},
+]
+
+
+class TestParseCardRecord(unittest.TestCase):
+    def test_omni_description_overrides_alt_and_promo_prefixes_price(self):
+        record = {
+            "kind": "omni",
+            "img_attrs": {"src": " https://x/a.jpg "},
+            "alt": " Alt name ",
+            "descriptions": [" ", "Fresh Strawberries"],
+            "promo": " With Card ",
+            "price": " $2.99 ",
+        }
+        self.assertEqual(
+            parse_card_record(record), ("Fresh Strawberries", "https://x/a.jpg", "With Card $2.99")
+        )
+
+    def test_feature_falls_back_to_alt(self):
+        record = {"kind": "feature", "img_attrs": {}, "alt": "Cola", "descriptions": [], "price": "$5"}
+        self.assertEqual(parse_card_record(record), ("Cola", "", "$5"))
+
+    def test_other_cards_are_skipped(self):
+        self.assertIsNone(parse_card_record({"kind": None, "img_attrs": {"src": "x"}}))
+
+    def test_pick_img_src_prefers_src_then_first_srcset_url(self):
+        self.assertEqual(pick_img_src({"src": "a.jpg", "data-src": "b.jpg"}.get), "a.jpg")
+        self.assertEqual(pick_img_src({"src": "", "srcset": "c.jpg 1x, d.jpg 2x"}.get), "c.jpg")
+        self.assertEqual(pick_img_src({}.get), "")
+
+
+class TestProcessImageUrl(unittest.TestCase):
+    def test_cdn_urls_move_to_s3_without_query(self):
+        self.assertEqual(
+            process_image_url(MONTAGES + "a1.jpg?w=300"),
+            "https://s3.us-west-1.wasabisys.com/kroger/Kroger/Montages/a1.jpg",
+        )
+        self.assertEqual(process_image_url("https://x/y.png?z=1"), "https://x/y.png")
+        self.assertEqual(process_image_url(""), "")
+
+
+class TestExtractCardRecords(unittest.TestCase):
+    def test_single_evaluate_on_fixture(self):
+        try:
+            from playwright.sync_api import sync_playwright
+        except ImportError:
+            self.skipTest("Playwright is not installed")
+        with sync_playwright() as p:
+            try:
+                browser = p.chromium.launch()
+            except Exception as e:
+                self.skipTest(f"Chromium is not available: {e}")
+            try:
+                page = browser.new_page()
+                page.set_content(FIXTURE.read_text(encoding="utf-8"))
+                self.assertEqual(extract_card_records(page), EXPECTED)
+            finally:
+                browser.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,160 @@
+import asyncio
+import time
+import unittest
+from contextlib import asynccontextmanager
+
+from crawler.orchestrator import CrawlResult, format_summary, run_crawls
+from crawler.stores import STORE_PLUGINS, StorePlugin, get_plugin, register
+from crawler.stores.kroger import VIEW_AD_SELECTORS, try_click
+
+
+class _Pool:
+    """Stands in for ContextPool; the fake crawls below never touch the context."""
+
+    def __init__(self):
+        self.open = 0
+        self.max_open = 0
+
+    @asynccontextmanager
+    async def context(self, crawl):
+        self.open += 1
+        self.max_open = max(self.max_open, self.open)
+        try:
+            yield None
+        finally:
+            self.open -= 1
+
+
+class _FakePlugin(StorePlugin):
+    def __init__(self, name, url, seconds, items=1, error=None):
+        self.name, self.url = name, url
+        self.seconds, self.items, self.error = seconds, items, error
+
+    async def crawl(self, context, pipeline):
+        await asyncio.sleep(self.seconds)
+        if self.error:
+            raise self.error
+        return self.items
+
+
+def _crawl(store, url, seconds, items=1, error=None):
+    return _FakePlugin(store, url, seconds, items, error)
+
+
+class TestRunCrawls(unittest.TestCase):
+    def run_crawls(self, crawls, timeout=5):
+        pool = _Pool()
+        started = time.monotonic()
+        results = asyncio.run(run_crawls(crawls, pool, pipeline=None, timeout=timeout))
+        return results, time.monotonic() - started, pool
+
+    def test_stores_run_concurrently(self):
+        crawls = [
+            _crawl("kroger", "https://www.kroger.com/weeklyad", 0.3, items=10),
+            _crawl("tomthumb", "https://www.tomthumb.com/weeklyad", 0.3, items=20),
+            _crawl("heb", "https://www.heb.com/weekly-ad", 0.3, items=30),
+        ]
+        results, wall, pool = self.run_crawls(crawls)
+
+        self.assertEqual([(r.store, r.status, r.items) for r in results],
+                         [("kroger", "ok", 10), ("tomthumb", "ok", 20), ("heb", "ok", 30)])
+        self.assertLess(wall, 0.8)
+        self.assertEqual(pool.max_open, 3)
+
+    def test_same_site_crawls_are_serialized(self):
+        crawls = [
+            _crawl("kroger-a", "https://www.kroger.com/weeklyad", 0.2),
+            _crawl("kroger-b", "https://kroger.com/weeklyad?ad=2", 0.2),
+        ]
+        results, wall, pool = self.run_crawls(crawls)
+
+        self.assertTrue(all(r.status == "ok" for r in results))
+        self.assertGreaterEqual(wall, 0.4)
+        self.assertEqual(pool.max_open, 1)
+
+    def test_failures_and_timeouts_are_reported(self):
+        crawls = [
+            _crawl("kroger", "https://www.kroger.com/weeklyad", 0, error=RuntimeError("no cards")),
+            _crawl("tomthumb", "https://www.tomthumb.com/weeklyad", 10),
+            _crawl("heb", "https://www.heb.com/weekly-ad", 0, items=5),
+        ]
+        results, wall, _ = self.run_crawls(crawls, timeout=0.3)
+
+        self.assertLess(wall, 2)
+        self.assertEqual([r.status for r in results], ["failed", "timeout", "ok"])
+        self.assertEqual(results[0].error, "RuntimeError: no cards")
+        self.assertEqual(results[2].items, 5)
+
+
+class _Locator:
+    def __init__(self, page, selector):
+        self.page, self.selector = page, selector
+        self.first = self
+
+    async def count(self):
+        return 1 if self.selector in self.page.present else 0
+
+    async def click(self, timeout=None):
+        if self.selector in self.page.broken:
+            raise RuntimeError("detached")
+        self.page.clicked.append(self.selector)
+
+
+class _Page:
+    def __init__(self, present, broken=()):
+        self.present, self.broken, self.clicked = set(present), set(broken), []
+
+    def locator(self, selector):
+        return _Locator(self, selector)
+
+
+class TestKrogerFallbacks(unittest.TestCase):
+    def test_try_click_falls_back_through_selectors(self):
+        page = _Page(present=VIEW_AD_SELECTORS, broken=VIEW_AD_SELECTORS[:1])
+        self.assertTrue(asyncio.run(try_click(page, VIEW_AD_SELECTORS)))
+        self.assertEqual(page.clicked, [VIEW_AD_SELECTORS[1]])
+        self.assertFalse(asyncio.run(try_click(_Page(present=()), VIEW_AD_SELECTORS)))
+
+
+class TestRegistry(unittest.TestCase):
+    def test_builtin_stores(self):
+        self.assertEqual(set(STORE_PLUGINS), {"heb", "kroger", "tomthumb"})
+        plugin = get_plugin("kroger")
+        self.assertEqual(plugin.site, "kroger.com")
+        self.assertEqual(
+            plugin.normalize_image_url(
+                "https://www.krogercdn.com/weeklyads/images/Kroger/Montages/a.jpg?w=300"),
+            "https://s3.us-west-1.wasabisys.com/kroger/Kroger/Montages/a.jpg",
+        )
+        # per-crawl state is not shared between crawls
+        self.assertIsNot(get_plugin("tomthumb").collector, get_plugin("tomthumb").collector)
+
+    def test_register_rejects_duplicates_and_unnamed_plugins(self):
+        class Unnamed(StorePlugin):
+            pass
+
+        class Duplicate(StorePlugin):
+            name = "kroger"
+
+        with self.assertRaises(ValueError):
+            register(Unnamed)
+        with self.assertRaises(ValueError):
+            register(Duplicate)
+        self.assertIsNot(STORE_PLUGINS["kroger"], Duplicate)
+
+
+class TestFormatSummary(unittest.TestCase):
+    def test_lines_per_store_and_totals(self):
+        summary = format_summary([
+            CrawlResult("kroger", "ok", 120, 41.5),
+            CrawlResult("tomthumb", "timeout", 0, 900.0, "cancelled after 900s"),
+        ], 900.2)
+        lines = summary.splitlines()
+        self.assertEqual(len(lines), 4)
+        self.assertIn("kroger", lines[1])
+        self.assertTrue(lines[2].endswith("cancelled after 900s"))
+        self.assertEqual(lines[3], "2 store(s), 120 item(s) in 900.2s")
+
+
+if __name__ == "__main__":
+    unittest.main()
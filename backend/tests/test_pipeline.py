@@ -0,0 +1,166 @@
+import asyncio
+import hashlib
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+from http.server import ThreadingHTTPServer
+from unittest.mock import patch
+
+from crawler import storage
+from db_engine import sqlite_engine
+from crawler.pipeline import ItemPipeline, dedupe, normalize_item, normalize_text
+from crawler.heb_cards import parse_card_record
+import test_downloader
+
+
+class TestStages(unittest.TestCase):
+    def test_normalize(self):
+        self.assertEqual(normalize_text(" Large\n Avocados\u00a0 "), "Large Avocados")
+        item = normalize_item(
+            {"name": " Milk\n", "image_url": " https://x/a.jpg?w=1 ", "price": None, "in_stock": True},
+            lambda url: url.split("?")[0],
+        )
+        self.assertEqual(item, {"name": "Milk", "image_url": "https://x/a.jpg", "price": "", "in_stock": True})
+        self.assertIsNone(normalize_item({"name": "Milk", "image_url": "", "price": "$1"}))
+        self.assertIsNone(normalize_item({"name": " ", "image_url": "https://x/a.jpg", "price": "$1"}))
+
+    def test_dedupe_keeps_first_per_name_and_price(self):
+        items = [
+            {"name": "Milk", "price": "$1", "image_url": "a"},
+            {"name": "MILK", "price": "$1", "image_url": "b"},
+            {"name": "Milk", "price": "$2", "image_url": "c"},
+        ]
+        self.assertEqual([i["image_url"] for i in dedupe(items)], ["a", "c"])
+
+
+class TestHebCardRecord(unittest.TestCase):
+    def test_rules_match_the_selenium_extractor(self):
+        record = {
+            "image_url": "https://images.heb.com/a.jpg",
+            "alt": "alt name",
+            "titles": ["", "H-E-B Whole Milk"],
+            "prices": ["$3.48 / gal", "$3.48"],
+            "unit_prices": ["$3.48 / gal"],
+            "has_coupon": True,
+            "buttons": ["Add to cart"],
+        }
+        self.assertEqual(parse_card_record(record), {
+            "name": "H-E-B Whole Milk",
+            "image_url": "https://images.heb.com/a.jpg",
+            "price": "$3.48 ($3.48 / gal) [Coupon]",
+            "in_stock": True,
+        })
+        self.assertEqual(
+            parse_card_record({"alt": " Eggs ", "prices": [], "buttons": ["Out of stock"]}),
+            {"name": "Eggs", "image_url": "", "price": "", "in_stock": False},
+        )
+
+
+class TestItemPipeline(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.config_patcher = patch.dict(storage.FILE_SYSTEM_CONFIG, {"DATA_BASE_DIR": self.tmpdir.name})
+        self.config_patcher.start()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), test_downloader.StandInHandler)
+        self.server.lock = threading.Lock()
+        self.server.requests = 0
+        self.server.ports = set()
+        self.server.active = 0
+        self.server.max_active = 0
+        self.server.flaky_hits = 0
+        self.server.etag = "v1"
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+        self.base = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.config_patcher.stop()
+        self.tmpdir.cleanup()
+
+    def test_run_downloads_dedupes_and_persists_in_batches(self):
+        raw = [{"name": f"Item {i}", "image_url": f"{self.base}/img/{i}.png", "price": "$1"} for i in range(5)]
+        raw += [
+            {"name": "item 0", "image_url": f"{self.base}/img/dup.png", "price": "$1"},
+            {"name": "No image", "image_url": "", "price": "$1"},
+            {"name": "Gone", "image_url": f"{self.base}/missing/x.png", "price": "$1"},
+        ]
+        pipeline = ItemPipeline(batch_size=2)
+        try:
+            with patch("crawler.pipeline.save_grocery_items", wraps=storage.save_grocery_items) as save:
+                saved = asyncio.run(pipeline.run("heb", raw))
+        finally:
+            pipeline.close()
+
+        self.assertEqual(saved, 5)
+        self.assertEqual(pipeline.stats["heb"],
+                         {"extracted": 8, "invalid": 1, "duplicates": 1, "unchanged": 0, "removed": 0,
+                          "failed": 1, "saved": 5})
+        week_folder = storage.get_store_week_folder("heb", storage.current_week(), False)
+        self.assertEqual([len(call.args[0]) for call in save.call_args_list], [2, 2, 1])
+        # the batch segments are compacted once the crawl is saved
+        self.assertEqual(os.listdir(os.path.join(week_folder, storage.SEGMENTS_DIRNAME)), [])
+        items = storage.get_store_ads("heb", storage.current_week())
+        self.assertEqual(sorted(i["name"] for i in items), [f"Item {i}" for i in range(5)])
+        self.assertTrue(all(i["image_digest"] == hashlib.sha256(test_downloader.PNG).hexdigest() for i in items))
+        self.assertTrue(all("image_variants" in i and "image_meta" in i for i in items))
+
+    def test_backfill_files_db_rows_under_its_week(self):
+        db_path = os.path.join(self.tmpdir.name, "crawler_results.db")
+        with patch.object(sqlite_engine, "DB_PATH", db_path):
+            try:
+                pipeline = ItemPipeline(write_db=True)
+                try:
+                    raw = [{"name": "Milk", "image_url": f"{self.base}/img/1.png", "price": "$3"}]
+                    asyncio.run(pipeline.run("heb", raw, week="2025-W01", ad_id="deals"))
+                    # the ad changed: Milk is removed from the backfilled week only
+                    asyncio.run(pipeline.run(
+                        "heb", [{"name": "Eggs", "image_url": f"{self.base}/img/2.png", "price": "$2"}]))
+                    raw = [{"name": "Eggs", "image_url": f"{self.base}/img/2.png", "price": "$2"}]
+                    asyncio.run(pipeline.run("heb", raw, week="2025-W01", ad_id="deals"))
+                finally:
+                    pipeline.close()
+            finally:
+                sqlite_engine.close_pool()
+            with sqlite3.connect(db_path) as conn:
+                rows = conn.execute(
+                    "SELECT weekly_ad_starting_date, product FROM crawler_results ORDER BY id"
+                ).fetchall()
+            conn.close()
+        self.assertEqual(rows, [(sqlite_engine.week_start_date(), "Eggs"), ("2025-01-06", "Eggs")])
+
+    def test_incremental_runs_save_only_changes(self):
+        def crawl(raw):
+            pipeline = ItemPipeline()
+            try:
+                saved = asyncio.run(pipeline.run("kroger", raw, ad_id="ViewAd-1"))
+            finally:
+                pipeline.close()
+            return saved, pipeline.stats["kroger"]
+
+        raw = [{"name": f"Item {i}", "image_url": f"{self.base}/img/{i}.png", "price": "$1"} for i in range(3)]
+        self.assertEqual(crawl(raw)[0], 3)
+
+        saved, stats = crawl(raw)
+        self.assertEqual((saved, stats["unchanged"], stats["failed"]), (0, 3, 0))
+
+        # one card replaced, one whose download fails
+        changed = raw[:2] + [
+            {"name": "Item 9", "image_url": f"{self.base}/img/9.png", "price": "$2"},
+            {"name": "Gone", "image_url": f"{self.base}/missing/x.png", "price": "$1"},
+        ]
+        saved, stats = crawl(changed)
+        self.assertEqual((saved, stats["unchanged"], stats["removed"], stats["failed"]), (1, 2, 1, 1))
+        items = storage.get_store_ads("kroger", storage.current_week())
+        self.assertEqual(sorted(i["name"] for i in items), ["Item 0", "Item 1", "Item 9"])
+
+        # the failed item is retried, nothing else is downloaded again
+        saved, stats = crawl(changed)
+        self.assertEqual((saved, stats["unchanged"], stats["failed"]), (0, 3, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
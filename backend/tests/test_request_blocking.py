@@ -0,0 +1,107 @@
+import unittest
+
+from crawler.request_blocking import ESTIMATED_BYTES, RequestBlocker
+
+
+class _Request:
+    def __init__(self, url, resource_type):
+        self.url = url
+        self.resource_type = resource_type
+
+
+class _Route:
+    def __init__(self, url, resource_type):
+        self.request = _Request(url, resource_type)
+        self.outcome = None
+
+    def continue_(self):
+        self.outcome = ("continue",)
+
+    def fulfill(self, **kwargs):
+        self.outcome = ("fulfill", kwargs)
+
+    def abort(self, error_code=None):
+        self.outcome = ("abort", error_code)
+
+
+class _Response:
+    def __init__(self, url, resource_type, length):
+        self.url = url
+        self.request = _Request(url, resource_type)
+        self.headers = {"content-length": str(length)}
+
+
+class TestClassify(unittest.TestCase):
+    def test_defaults(self):
+        blocker = RequestBlocker()
+        self.assertEqual(blocker.classify("https://www.google-analytics.com/g/collect", "xhr"), "tracker")
+        self.assertEqual(blocker.classify("https://www.kroger.com/fonts/a.woff2", "font"), "font")
+        self.assertEqual(blocker.classify("https://cdn.example.com/promo.mp4", "media"), "media")
+        self.assertIsNone(blocker.classify("https://www.krogercdn.com/a.jpg", "image"))
+        self.assertIsNone(blocker.classify("https://www.kroger.com/weeklyad", "document"))
+        self.assertIsNone(blocker.classify("data:image/png;base64,AAAA", "image"))
+        # a suffix match needs a dot boundary
+        self.assertIsNone(blocker.classify("https://notdoubleclick.net/x.js", "script"))
+
+    def test_images_and_allowed_hosts(self):
+        blocker = RequestBlocker(block_images=True, allowed_hosts=["krogercdn.com"])
+        self.assertEqual(blocker.classify("https://img.example.com/a.jpg", "image"), "image")
+        self.assertIsNone(blocker.classify("https://www.krogercdn.com/a.jpg", "image"))
+
+
+class TestRouting(unittest.TestCase):
+    def test_trackers_are_stubbed_and_resources_aborted(self):
+        blocker = RequestBlocker()
+        tracker = _Route("https://www.googletagmanager.com/gtm.js", "script")
+        font = _Route("https://fonts.gstatic.com/a.woff2", "font")
+        page = _Route("https://www.kroger.com/weeklyad", "document")
+        for route in (tracker, font, page):
+            blocker.handle_route(route)
+
+        self.assertEqual(tracker.outcome[0], "fulfill")
+        self.assertEqual(tracker.outcome[1]["content_type"], "application/javascript")
+        self.assertEqual(font.outcome, ("abort", "blockedbyclient"))
+        self.assertEqual(page.outcome, ("continue",))
+        stats = blocker.stats()
+        self.assertEqual((stats["requests"], stats["allowed"], stats["blocked"]), (3, 1, 2))
+        self.assertEqual(stats["blocked_by_reason"], {"tracker": 1, "font": 1})
+
+    def test_bytes_saved_uses_observed_sizes(self):
+        blocker = RequestBlocker(block_images=True, allowed_hosts=["krogercdn.com"])
+        for _ in range(2):
+            blocker.handle_route(_Route("https://img.example.com/a.jpg", "image"))
+        blocker.handle_route(_Route("https://fonts.gstatic.com/a.woff2", "font"))
+        blocker.handle_response(_Response("https://www.krogercdn.com/a.jpg", "image", 1000))
+        blocker.handle_response(_Response("https://www.krogercdn.com/b.jpg", "image", 3000))
+        # stubbed tracker responses do not count as observed sizes
+        blocker.handle_response(_Response("https://www.googletagmanager.com/gtm.js", "image", 0))
+
+        self.assertEqual(blocker.estimated_bytes_saved(), 2 * 2000 + ESTIMATED_BYTES["font"])
+        self.assertIn("3/3 requests blocked (font: 1, image: 2)", blocker.report())
+
+    def test_browser_requests_are_routed(self):
+        try:
+            from playwright.sync_api import sync_playwright
+        except ImportError:
+            self.skipTest("Playwright is not installed")
+        with sync_playwright() as p:
+            try:
+                browser = p.chromium.launch()
+            except Exception as e:
+                self.skipTest(f"Chromium is not available: {e}")
+            try:
+                context = browser.new_context()
+                blocker = RequestBlocker().install(context)
+                context.route("https://www.kroger.com/weeklyad", lambda route: route.fulfill(
+                    content_type="text/html",
+                    body='<script src="https://www.googletagmanager.com/gtm.js"></script><p>ad</p>'))
+                page = context.new_page()
+                page.goto("https://www.kroger.com/weeklyad")
+                self.assertEqual(page.inner_text("p"), "ad")
+                self.assertEqual(blocker.stats()["blocked_by_reason"], {"tracker": 1})
+            finally:
+                browser.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
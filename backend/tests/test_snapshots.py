@@ -0,0 +1,106 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from crawler import snapshots, storage
+from crawler.snapshots import (
+    parse_heb,
+    parse_kroger,
+    parse_snapshot,
+    parse_snapshots,
+    parse_tomthumb,
+    save_snapshot,
+    snapshot_location,
+)
+
+BACKEND = Path(__file__).resolve().parents[1]
+KROGER_FIXTURE = BACKEND / "benchmarks" / "fixtures" / "kroger_cards.html"
+TOMTHUMB_SNAPSHOT = BACKEND / "crawler" / "tomthumb.html"
+MONTAGES = "https://www.krogercdn.com/weeklyads/images/Kroger/Montages/"
+
+HEB_PAGE = """
+<html><body>
+<div data-component="product-card">
+  <img src="https://images.heb.com/milk.jpg" alt="milk alt">
+  <div data-qe-id="productTitle"><span> </span><span>H-E-B Whole Milk</span></div>
+  <div><span>$3.48</span><span>$3.48 / gal</span></div>
+  <div>Digital Coupon</div>
+  <button>Add to cart</button>
+</div>
+<div data-component="product-card">
+  <img src="https://images.heb.com/eggs.jpg" alt=" Eggs ">
+  <p>Was <b>$5.00</b></p>
+  <button>Out of stock</button>
+</div>
+</body></html>
+"""
+
+
+@unittest.skipIf(snapshots.lxml_html is None, "lxml is not installed")
+class TestParsers(unittest.TestCase):
+    def test_kroger_matches_the_browser_extractor(self):
+        # Same expectations as tests/test_kroger_cards.py for the browser DOM.
+        self.assertEqual(parse_kroger(KROGER_FIXTURE.read_text(encoding="utf-8")), [
+            {"kind": "omni", "name": "Fresh Strawberries, 1 lb", "image_url": MONTAGES + "a1.jpg?w=300",
+             "price": "With Card $2.99 each"},
+            {"kind": "omni", "name": "Kroger Milk", "image_url": MONTAGES + "a2.jpg", "price": "2/$5"},
+            {"kind": "feature", "name": "Boneless Chicken Breast", "image_url": MONTAGES + "f1.jpg",
+             "price": "$1.99 per lb"},
+            {"kind": "feature", "name": "Coca-Cola 12 pack", "image_url": MONTAGES + "f2.jpg",
+             "price": "Buy 2 Get 1 Free"},
+        ])
+
+    def test_heb(self):
+        self.assertEqual(parse_heb(HEB_PAGE), [
+            {"name": "H-E-B Whole Milk", "image_url": "https://images.heb.com/milk.jpg",
+             "price": "$3.48 ($3.48 / gal) [Coupon]", "in_stock": True},
+            {"name": "Eggs", "image_url": "https://images.heb.com/eggs.jpg", "price": "$5.00",
+             "in_stock": False},
+        ])
+
+    def test_tomthumb_saved_flyer(self):
+        items = parse_tomthumb(TOMTHUMB_SNAPSHOT.read_text(encoding="utf-8"))
+        self.assertGreater(len(items), 100)
+        self.assertIn(
+            {"id": "981309976", "name": "Boneless Skinless Chicken Breasts or Thighs",
+             "price": "$1.97", "image_url": ""},
+            items,
+        )
+        self.assertTrue(all(i["name"] and i["price"].startswith("$") for i in items))
+
+
+@unittest.skipIf(snapshots.lxml_html is None, "lxml is not installed")
+class TestSnapshotFiles(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.config_patcher = patch.dict(storage.FILE_SYSTEM_CONFIG, {"DATA_BASE_DIR": self.tmpdir.name})
+        self.config_patcher.start()
+
+    def tearDown(self):
+        self.config_patcher.stop()
+        self.tmpdir.cleanup()
+
+    def test_saved_snapshots_are_parsed_by_their_store(self):
+        heb_path = save_snapshot("heb", HEB_PAGE, week="2025-W01")
+        kroger_path = save_snapshot("kroger", KROGER_FIXTURE.read_text(encoding="utf-8"), week="2025-W02")
+        self.assertEqual(snapshot_location(heb_path), ("heb", "2025-W01"))
+        self.assertTrue(heb_path.startswith(os.path.join(self.tmpdir.name, "heb", "2025-W01", "snapshots")))
+
+        parsed = parse_snapshots([heb_path, kroger_path], max_workers=2)
+        self.assertEqual(list(parsed), [heb_path, kroger_path])
+        self.assertEqual(len(parsed[heb_path]), 2)
+        self.assertEqual(len(parsed[kroger_path]), 4)
+
+    def test_unknown_store(self):
+        path = os.path.join(self.tmpdir.name, "page.html")
+        with open(path, "w") as f:
+            f.write(HEB_PAGE)
+        with self.assertRaises(ValueError):
+            parse_snapshot(path)
+        self.assertEqual(len(parse_snapshot(path, "heb")), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,7 @@
 import os
 import sqlite3
 import tempfile
+import threading
 import unittest
 from pathlib import Path
 from unittest.mock import patch, MagicMock
@@ -27,12 +28,15 @@ class TestSQLiteEngine(unittest.TestCase):
 
     def tearDown(self):
         """Clean up after each test."""
+        # Close pooled connections so WAL side files are cleaned up
+        sqlite_engine.close_pool()
+
         # Restore original DB_PATH
         sqlite_engine.DB_PATH = self.original_db_path
 
-        # Remove test database if it exists
-        if self.test_db_path.exists():
-            self.test_db_path.unlink()
+        # Remove test database (and any WAL side files) if it exists
+        for path in Path(self.test_dir).iterdir():
+            path.unlink()
 
         # Remove test directory
         Path(self.test_dir).rmdir()
@@ -72,9 +76,101 @@ class TestSQLiteEngine(unittest.TestCase):
         self.assertIn("weekly_ad_starting_date TEXT NOT NULL", table_sql)
         self.assertIn("product TEXT NOT NULL", table_sql)
         self.assertIn("image_url TEXT", table_sql)
-        self.assertIn("image BLOB", table_sql)
+        self.assertIn("image_hash TEXT REFERENCES images(hash)", table_sql)
         self.assertIn("price TEXT NOT NULL", table_sql)
 
+    def test_init_db_creates_images_table_and_index(self):
+        """Test init_db creates the images table, the store/week index and sets the version."""
+        sqlite_engine.init_db()
+
+        with sqlite3.connect(str(self.test_db_path)) as conn:
+            tables = {
+                row[0]
+                for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")
+            }
+            indexes = {
+                row[0]
+                for row in conn.execute("SELECT name FROM sqlite_master WHERE type='index'")
+            }
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+
+        self.assertIn("images", tables)
+        self.assertIn("idx_crawler_results_store_week", indexes)
+        self.assertIn("idx_crawler_results_image_hash", indexes)
+        self.assertEqual(version, sqlite_engine.SCHEMA_VERSION)
+
+    def test_store_week_lookup_uses_covering_index(self):
+        """Test the /weeklyad/ lookup is answered from the composite index."""
+        sqlite_engine.init_db()
+
+        with sqlite3.connect(str(self.test_db_path)) as conn:
+            plan = conn.execute(
+                """EXPLAIN QUERY PLAN SELECT product, price, image_hash FROM crawler_results
+                   WHERE storename = ? AND weekly_ad_starting_date = ?""",
+                ("Kroger", "2025-01-06"),
+            ).fetchall()
+
+        detail = " ".join(row[-1] for row in plan)
+        self.assertIn("COVERING INDEX idx_crawler_results_store_week", detail)
+
+    def test_init_db_migrates_v1_database_in_place(self):
+        """Test a pre-versioning database is migrated and its BLOBs de-duplicated."""
+        with sqlite3.connect(str(self.test_db_path)) as conn:
+            conn.execute("""
+                CREATE TABLE crawler_results (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    storename TEXT NOT NULL,
+                    weekly_ad_starting_date TEXT NOT NULL,
+                    product TEXT NOT NULL,
+                    image_url TEXT,
+                    image BLOB,
+                    price TEXT NOT NULL
+                )
+            """)
+            conn.executemany(
+                """INSERT INTO crawler_results (storename, weekly_ad_starting_date, product, image_url, image, price)
+                   VALUES (?, ?, ?, ?, ?, ?)""",
+                [
+                    ("Kroger", "2025-01-06", "Bananas", "url1", b"same", "0.59"),
+                    ("Kroger", "2025-01-13", "Bananas", "url1", b"same", "0.49"),
+                    ("HEB", "2025-01-06", "Apples", None, None, "1.99"),
+                ],
+            )
+        conn.close()
+
+        sqlite_engine.init_db()
+
+        with sqlite3.connect(str(self.test_db_path)) as conn:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            images = conn.execute("SELECT hash, data, size FROM images").fetchall()
+            rows = conn.execute(
+                "SELECT id, product, image_hash, price FROM crawler_results ORDER BY id"
+            ).fetchall()
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(crawler_results)")]
+        conn.close()
+
+        digest = sqlite_engine.image_hash(b"same")
+        self.assertEqual(version, sqlite_engine.SCHEMA_VERSION)
+        self.assertEqual(images, [(digest, b"same", 4)])
+        self.assertEqual(
+            rows,
+            [
+                (1, "Bananas", digest, "0.59"),
+                (2, "Bananas", digest, "0.49"),
+                (3, "Apples", None, "1.99"),
+            ],
+        )
+        self.assertNotIn("image", columns)
+
+        # Ids keep counting from where the old table stopped.
+        sqlite_engine.insert_crawler_result("HEB", "2025-01-13", "Pears", None, None, "2.49")
+        with sqlite3.connect(str(self.test_db_path)) as conn:
+            new_id = conn.execute(
+                "SELECT id FROM crawler_results WHERE product = 'Pears'"
+            ).fetchone()[0]
+        conn.close()
+        self.assertEqual(new_id, 4)
+
     def test_get_connection_initializes_db_if_not_exists(self):
         """Test get_connection initializes database if it doesn't exist."""
         self.assertFalse(self.test_db_path.exists())
@@ -82,6 +178,68 @@ class TestSQLiteEngine(unittest.TestCase):
         self.assertTrue(self.test_db_path.exists())
         conn.close()
 
+    def test_get_connection_uses_wal_and_tuned_pragmas(self):
+        """Test pooled connections are opened with WAL and the tuned pragmas."""
+        with sqlite_engine.get_connection() as conn:
+            self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+            self.assertEqual(conn.execute("PRAGMA synchronous").fetchone()[0], 1)
+            self.assertEqual(conn.execute("PRAGMA busy_timeout").fetchone()[0], 5000)
+            self.assertEqual(conn.execute("PRAGMA cache_size").fetchone()[0], -16000)
+
+    def test_get_connection_reuses_pooled_connection(self):
+        """Test leaving the with block returns the connection to the pool."""
+        with sqlite_engine.get_connection() as first:
+            pass
+        with sqlite_engine.get_connection() as second:
+            pass
+        self.assertIs(first, second)
+        stats = sqlite_engine.get_pool_stats()
+        self.assertEqual(stats["created"], 1)
+        self.assertEqual(stats["acquired"], 2)
+        self.assertEqual(stats["in_use"], 0)
+
+    def test_init_db_runs_once_per_pool(self):
+        """Test schema init runs when the pool is created, not per connection."""
+        with patch.object(sqlite_engine, "init_db", wraps=sqlite_engine.init_db) as init:
+            for _ in range(3):
+                sqlite_engine.get_connection().close()
+        self.assertEqual(init.call_count, 1)
+
+    def test_released_connection_rolls_back_open_transaction(self):
+        """Test a connection is returned to the pool without a pending transaction."""
+        conn = sqlite_engine.get_connection()
+        conn.execute(
+            "INSERT INTO crawler_results (storename, weekly_ad_starting_date, product, price) "
+            "VALUES ('S', '2025-01-01', 'P', '1')"
+        )
+        conn.close()
+        with sqlite_engine.get_connection() as conn:
+            count = conn.execute("SELECT COUNT(*) FROM crawler_results").fetchone()[0]
+        self.assertEqual(count, 0)
+
+    def test_pool_waits_when_exhausted(self):
+        """Test acquire blocks until a connection is released and records the wait."""
+        pool = sqlite_engine.ConnectionPool(self.test_db_path, max_size=1, timeout=5)
+        held = pool.acquire()
+        threading.Timer(0.05, held.close).start()
+        conn = pool.acquire()
+        self.assertIs(conn, held)
+        conn.close()
+        stats = pool.stats()
+        self.assertEqual(stats["waits"], 1)
+        self.assertGreater(stats["wait_max_seconds"], 0)
+        pool.close()
+
+    def test_pool_times_out(self):
+        """Test acquire raises once the pool timeout elapses."""
+        pool = sqlite_engine.ConnectionPool(self.test_db_path, max_size=1, timeout=0.01)
+        held = pool.acquire()
+        with self.assertRaises(sqlite3.OperationalError):
+            pool.acquire()
+        self.assertEqual(pool.stats()["timeouts"], 1)
+        held.close()
+        pool.close()
+
     def test_get_connection_returns_valid_connection(self):
         """Test get_connection returns a valid SQLite connection."""
         conn = sqlite_engine.get_connection()
@@ -116,8 +274,25 @@ class TestSQLiteEngine(unittest.TestCase):
         self.assertEqual(result[2], "2025-01-01")  # weekly_ad_starting_date
         self.assertEqual(result[3], "Bananas")  # product
         self.assertEqual(result[4], "http://example.com/banana.jpg")  # image_url
-        self.assertEqual(result[5], b"fake_image_data")  # image
+        self.assertEqual(result[5], sqlite_engine.image_hash(b"fake_image_data"))  # image_hash
         self.assertEqual(result[6], "0.59")  # price
+        self.assertEqual(
+            sqlite_engine.get_image_blob(result[5]), b"fake_image_data"
+        )
+
+    def test_insert_crawler_result_deduplicates_images(self):
+        """Test the same image bytes are stored once across items and weeks."""
+        for week in ("2025-01-06", "2025-01-13", "2025-01-20"):
+            sqlite_engine.insert_crawler_result(
+                "Kroger", week, "Bananas", "url", b"banana_png", "0.59"
+            )
+
+        with sqlite3.connect(str(self.test_db_path)) as conn:
+            image_count = conn.execute("SELECT COUNT(*) FROM images").fetchone()[0]
+            result_count = conn.execute("SELECT COUNT(*) FROM crawler_results").fetchone()[0]
+
+        self.assertEqual(image_count, 1)
+        self.assertEqual(result_count, 3)
 
     def test_insert_crawler_result_with_null_image(self):
         """Test inserting a crawler result with null image data."""
@@ -138,7 +313,7 @@ class TestSQLiteEngine(unittest.TestCase):
         self.assertIsNotNone(result)
         self.assertEqual(result[1], "HEB")
         self.assertIsNone(result[4])  # image_url
-        self.assertIsNone(result[5])  # image
+        self.assertIsNone(result[5])  # image_hash
 
     def test_insert_multiple_crawler_results(self):
         """Test inserting multiple crawler results."""
@@ -173,7 +348,9 @@ class TestSQLiteEngine(unittest.TestCase):
 
         with sqlite3.connect(str(self.test_db_path)) as conn:
             cursor = conn.cursor()
-            cursor.execute("SELECT image FROM crawler_results")
+            cursor.execute(
+                "SELECT i.data FROM crawler_results r JOIN images i ON i.hash = r.image_hash"
+            )
             result = cursor.fetchone()
 
         self.assertEqual(len(result[0]), 1024 * 1024)
@@ -230,6 +407,212 @@ class TestSQLiteEngine(unittest.TestCase):
 
         self.assertEqual(ids, [1, 2, 3])
 
+    def test_insert_crawler_results_many_tuples_and_dicts(self):
+        """Test bulk insert accepts tuples and dicts and writes every row."""
+        rows = [
+            ("Kroger", "2025-01-06", "Bananas", "url1", b"img1", "0.59"),
+            {
+                "storename": "Kroger",
+                "weekly_ad_starting_date": "2025-01-06",
+                "product": "Apples",
+                "image_url": None,
+                "image_bytes": None,
+                "price": "1.29",
+            },
+        ]
+        written = sqlite_engine.insert_crawler_results_many(rows)
+        self.assertEqual(written, 2)
+
+        with sqlite3.connect(str(self.test_db_path)) as conn:
+            result = conn.execute(
+                """SELECT r.product, i.data, r.price FROM crawler_results r
+                   LEFT JOIN images i ON i.hash = r.image_hash ORDER BY r.id"""
+            ).fetchall()
+        self.assertEqual(
+            result, [("Bananas", b"img1", "0.59"), ("Apples", None, "1.29")]
+        )
+
+    def test_insert_crawler_results_many_chunks_generator(self):
+        """Test a generator is consumed in chunked transactions."""
+        rows = (
+            ("Store", "2025-01-06", f"Product{i}", None, None, "1.00")
+            for i in range(25)
+        )
+        written = sqlite_engine.insert_crawler_results_many(rows, chunk_size=10)
+        self.assertEqual(written, 25)
+
+    def test_insert_crawler_results_many_upsert_replaces(self):
+        """Test upsert replaces rows with the same store, week and product."""
+        sqlite_engine.insert_crawler_results_many(
+            [("Kroger", "2025-01-06", "Bananas", None, None, "0.59")]
+        )
+        sqlite_engine.insert_crawler_results_many(
+            [
+                ("Kroger", "2025-01-06", "Bananas", None, None, "0.49"),
+                ("Kroger", "2025-01-13", "Bananas", None, None, "0.69"),
+            ],
+            upsert=True,
+        )
+        with sqlite3.connect(str(self.test_db_path)) as conn:
+            result = conn.execute(
+                "SELECT weekly_ad_starting_date, price FROM crawler_results ORDER BY weekly_ad_starting_date"
+            ).fetchall()
+        self.assertEqual(result, [("2025-01-06", "0.49"), ("2025-01-13", "0.69")])
+
+    def test_rewriting_an_item_does_not_duplicate_it(self):
+        """Test retries of the same item (same key) leave one row."""
+        for image_url in ("url1", "url2"):
+            sqlite_engine.insert_crawler_result("Kroger", "2025-01-06", "Bananas", image_url, b"png", "0.59")
+        sqlite_engine.insert_crawler_results_many(
+            [("Kroger", "2025-01-06", " bananas\n", "url3", b"png", "0.59")]
+        )
+        sqlite_engine.insert_crawler_result("Kroger", "2025-01-06", "Bananas", "url4", b"new png", "0.59")
+
+        with sqlite3.connect(str(self.test_db_path)) as conn:
+            rows = conn.execute(
+                "SELECT id, product, image_url, item_key FROM crawler_results ORDER BY id"
+            ).fetchall()
+        # a different image is a different item
+        self.assertEqual([row[1:3] for row in rows], [("Bananas", "url3"), ("Bananas", "url4")])
+        self.assertEqual(
+            rows[0][3],
+            sqlite_engine.item_key("kroger", "2025-01-06", "BANANAS", "0.59", sqlite_engine.image_hash(b"png")),
+        )
+
+    def test_init_db_migrates_v3_database_dropping_duplicates(self):
+        """Test the v4 migration keys existing rows and keeps the newest of each item."""
+        with sqlite3.connect(str(self.test_db_path)) as conn:
+            conn.execute("""
+                CREATE TABLE crawler_results (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    storename TEXT NOT NULL,
+                    weekly_ad_starting_date TEXT NOT NULL,
+                    product TEXT NOT NULL,
+                    image_url TEXT,
+                    image_hash TEXT,
+                    price TEXT NOT NULL
+                )
+            """)
+            conn.execute("CREATE TABLE images (hash TEXT PRIMARY KEY, data BLOB NOT NULL, size INTEGER NOT NULL)")
+            conn.executemany(
+                "INSERT INTO images (hash, data, size) VALUES (?, ?, ?)",
+                [(sqlite_engine.image_hash(data), data, len(data)) for data in (b"milk", b"replaced")],
+            )
+            conn.executemany(
+                """INSERT INTO crawler_results (storename, weekly_ad_starting_date, product, image_url, image_hash, price)
+                   VALUES (?, ?, ?, ?, ?, ?)""",
+                [
+                    ("Kroger", "2025-01-06", "Bananas", "old", None, "0.59"),
+                    ("Kroger", "2025-01-06", "Milk", None, sqlite_engine.image_hash(b"milk"), "2.99"),
+                    ("Kroger", "2025-01-06", "Bananas", "new", None, "0.59"),
+                ],
+            )
+            conn.execute("PRAGMA user_version=3")
+        conn.close()
+
+        sqlite_engine.init_db()
+
+        with sqlite3.connect(str(self.test_db_path)) as conn:
+            rows = conn.execute("SELECT id, product, image_url FROM crawler_results ORDER BY id").fetchall()
+            indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='index'")}
+            images = conn.execute("SELECT data FROM images").fetchall()
+        conn.close()
+        self.assertEqual(rows, [(2, "Milk", None), (3, "Bananas", "new")])
+        self.assertEqual(images, [(b"milk",)])
+        self.assertIn("idx_crawler_results_item_key", indexes)
+
+    def test_delete_crawler_results_only_touches_the_store_week(self):
+        """Test deleting products leaves other weeks and products, and their images, alone."""
+        sqlite_engine.insert_crawler_results_many(
+            [
+                ("Kroger", "2025-01-06", "Bananas", None, b"only", "0.49"),
+                ("Kroger", "2025-01-06", "Milk", None, b"shared", "2.99"),
+                ("Kroger", "2025-01-13", "Bananas", None, b"shared", "0.69"),
+            ]
+        )
+        deleted = sqlite_engine.delete_crawler_results("Kroger", "2025-01-06", ["Bananas", "Eggs"])
+        self.assertEqual(deleted, 1)
+        with sqlite3.connect(str(self.test_db_path)) as conn:
+            result = conn.execute(
+                "SELECT weekly_ad_starting_date, product FROM crawler_results ORDER BY id"
+            ).fetchall()
+            images = conn.execute("SELECT data FROM images").fetchall()
+        conn.close()
+        self.assertEqual(result, [("2025-01-06", "Milk"), ("2025-01-13", "Bananas")])
+        self.assertEqual(images, [(b"shared",)])
+
+    def test_upsert_drops_the_replaced_image(self):
+        """Test an upsert that changes a product's image does not leave the old one behind."""
+        sqlite_engine.insert_crawler_results_many([("Kroger", "2025-01-06", "Milk", None, b"old", "2.99")])
+        sqlite_engine.insert_crawler_results_many(
+            [("Kroger", "2025-01-06", "Milk", None, b"new", "2.99")], upsert=True
+        )
+        with sqlite3.connect(str(self.test_db_path)) as conn:
+            images = conn.execute("SELECT data FROM images").fetchall()
+        conn.close()
+        self.assertEqual(images, [(b"new",)])
+
+    def test_unreferenced_image_check_uses_the_image_hash_index(self):
+        """Test writes probe the image_hash index instead of scanning every row."""
+        sqlite_engine.init_db()
+        with sqlite3.connect(str(self.test_db_path)) as conn:
+            plan = conn.execute(
+                "EXPLAIN QUERY PLAN " + sqlite_engine.DELETE_UNREFERENCED_IMAGE_SQL, ("a", "a")
+            ).fetchall()
+        conn.close()
+        detail = " ".join(row[-1] for row in plan)
+        self.assertIn("idx_crawler_results_image_hash", detail)
+        self.assertNotIn("SCAN crawler_results", detail)
+
+    def test_delete_orphaned_images_sweeps_everything_unreferenced(self):
+        """Test the maintenance sweep drops images no row uses and keeps the rest."""
+        sqlite_engine.insert_crawler_results_many([("Kroger", "2025-01-06", "Milk", None, b"kept", "2.99")])
+        with sqlite3.connect(str(self.test_db_path)) as conn:
+            conn.execute(
+                "INSERT INTO images (hash, data, size) VALUES (?, ?, ?)",
+                (sqlite_engine.image_hash(b"orphan"), b"orphan", 6),
+            )
+        conn.close()
+        self.assertEqual(sqlite_engine.delete_orphaned_images(), 1)
+        self.assertEqual(sqlite_engine.delete_orphaned_images(), 0)
+        self.assertEqual(sqlite_engine.get_image_blob(sqlite_engine.image_hash(b"kept")), b"kept")
+
+    def test_insert_crawler_results_many_rejects_short_rows(self):
+        """Test malformed rows raise and leave nothing half-written."""
+        with self.assertRaises(ValueError):
+            sqlite_engine.insert_crawler_results_many([("Kroger", "2025-01-06")])
+        with sqlite3.connect(str(self.test_db_path)) as conn:
+            count = conn.execute("SELECT COUNT(*) FROM crawler_results").fetchone()[0]
+        self.assertEqual(count, 0)
+
+    def test_crawler_result_writer_flushes_in_chunks(self):
+        """Test the streaming writer flushes full chunks and the remainder on exit."""
+        with sqlite_engine.CrawlerResultWriter(chunk_size=2) as writer:
+            for i in range(5):
+                writer.add("HEB", "2025-01-06", f"Item{i}", None, None, "2.00")
+            self.assertEqual(writer.written, 4)
+        self.assertEqual(writer.written, 5)
+
+    def test_week_start_date_is_monday(self):
+        """Test week_start_date returns the Monday of the given week."""
+        from datetime import date
+
+        self.assertEqual(sqlite_engine.week_start_date(date(2025, 9, 4)), "2025-09-01")
+        self.assertEqual(sqlite_engine.week_start_date(date(2025, 9, 1)), "2025-09-01")
+
+    def test_week_start_date_of_week_folder(self):
+        """Test folder names map to the same Monday as the live crawl, Sundays included."""
+        from datetime import date
+
+        self.assertEqual(sqlite_engine.week_start_date_of("2025-W01"), "2025-01-06")
+        self.assertEqual(sqlite_engine.week_start_date_of("2025-W00"), "2024-12-30")
+        # 2025-09-07 is a Sunday, the first day of folder 2025-W36
+        sunday = date(2025, 9, 7)
+        self.assertEqual(sunday.strftime("%Y-W%U"), "2025-W36")
+        self.assertEqual(sqlite_engine.week_start_date(sunday), "2025-09-08")
+        self.assertEqual(sqlite_engine.week_start_date_of("2025-W36"), sqlite_engine.week_start_date(sunday))
+        self.assertEqual(sqlite_engine.week_start_date(date(2025, 9, 13)), "2025-09-08")
+
 
 class TestDBPathConfiguration(unittest.TestCase):
     """Test cases for DB_PATH configuration logic."""
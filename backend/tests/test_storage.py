@@ -0,0 +1,266 @@
+import errno
+import json
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+from fastapi.testclient import TestClient
+from api import app
+from crawler import storage
+from crawler.storage import WeeklyAdCache
+
+client = TestClient(app)
+
+
+class WeeklyAdCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.config_patcher = patch.dict(
+            storage.FILE_SYSTEM_CONFIG, {"DATA_BASE_DIR": self.tmpdir.name}
+        )
+        self.config_patcher.start()
+        storage.WEEKLY_AD_CACHE.clear()
+
+    def tearDown(self):
+        storage.WEEKLY_AD_CACHE.clear()
+        self.config_patcher.stop()
+        self.tmpdir.cleanup()
+
+    def write_week(self, storename, week, items):
+        path = storage.get_json_file_path(storename, week)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(items, f)
+        return path
+
+
+class TestWeeklyAdCache(WeeklyAdCacheTestCase):
+    def test_second_read_is_a_hit(self):
+        self.write_week("kroger", "2025-W01", [{"name": "Bananas", "price": "$0.59"}])
+        first = storage.get_store_ads("kroger", "2025-W01")
+        second = storage.get_store_ads("kroger", "2025-W01")
+        self.assertIs(first, second)
+        stats = storage.WEEKLY_AD_CACHE.stats()
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["hits"], 1)
+
+    def test_payload_matches_data(self):
+        items = [{"name": "Apples", "price": "$1.29"}]
+        self.write_week("heb", "2025-W02", items)
+        payload = storage.get_store_ads_json("heb", "2025-W02")
+        self.assertEqual(json.loads(payload), items)
+
+    def test_rewritten_file_is_reloaded(self):
+        path = self.write_week("kroger", "2025-W01", [{"name": "Old"}])
+        self.assertEqual(storage.get_store_ads("kroger", "2025-W01")[0]["name"], "Old")
+
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump([{"name": "New"}, {"name": "Newer"}], f)
+        st = os.stat(path)
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+
+        self.assertEqual(len(storage.get_store_ads("kroger", "2025-W01")), 2)
+
+    def test_save_grocery_items_invalidates(self):
+        storage.save_grocery_items([{"name": "Milk"}], "kroger", "2025-W03")
+        self.assertEqual(len(storage.get_store_ads("kroger", "2025-W03")), 1)
+        storage.save_grocery_items([{"name": "Eggs"}], "kroger", "2025-W03")
+        self.assertEqual(len(storage.get_store_ads("kroger", "2025-W03")), 2)
+
+    def test_missing_file_raises(self):
+        with self.assertRaises(FileNotFoundError):
+            storage.get_store_ads("kroger", "1999-W01")
+        self.assertFalse(
+            os.path.exists(os.path.join(self.tmpdir.name, "kroger", "1999-W01"))
+        )
+
+    def test_lru_eviction_by_entries(self):
+        cache = WeeklyAdCache(max_entries=2)
+        for week in ("2025-W01", "2025-W02", "2025-W03"):
+            self.write_week("kroger", week, [{"name": week}])
+            cache.get("kroger", week)
+        stats = cache.stats()
+        self.assertEqual(stats["entries"], 2)
+        self.assertEqual(stats["evictions"], 1)
+
+    def test_memory_cap(self):
+        self.write_week("kroger", "2025-W01", [{"name": "x" * 100}])
+        self.write_week("kroger", "2025-W02", [{"name": "y" * 100}])
+        cache = WeeklyAdCache(max_bytes=150)
+        cache.get("kroger", "2025-W01")
+        cache.get("kroger", "2025-W02")
+        stats = cache.stats()
+        self.assertEqual(stats["entries"], 1)
+        self.assertLessEqual(stats["bytes"], 150)
+        self.assertEqual(stats["evictions"], 1)
+
+
+class TestSegmentStore(WeeklyAdCacheTestCase):
+    def segments(self, storename, week):
+        return storage._pending_segments(storage.get_segments_folder(storename, week))
+
+    def keyed(self, storename, week, item):
+        return {**item, "item_key": storage.weekly_item_key(storename, week, item)}
+
+    def test_save_writes_segment_without_touching_weekly_file(self):
+        path = self.write_week("kroger", "2025-W05", [{"name": "Old"}])
+        with open(path, "rb") as f:
+            before = f.read()
+        storage.save_grocery_items([{"name": "New"}], "kroger", "2025-W05")
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), before)
+        self.assertEqual(len(self.segments("kroger", "2025-W05")), 1)
+
+    def test_compaction_merges_in_save_order_and_removes_segments(self):
+        self.write_week("kroger", "2025-W05", [{"name": "A"}])
+        storage.save_grocery_items([{"name": "B"}, {"name": "C"}], "kroger", "2025-W05")
+        storage.save_grocery_items([{"name": "D"}], "kroger", "2025-W05")
+
+        merged = storage.compact_store_week("kroger", "2025-W05")
+
+        self.assertEqual(merged, 3)
+        self.assertEqual(self.segments("kroger", "2025-W05"), [])
+        with open(storage.get_json_file_path("kroger", "2025-W05"), encoding="utf-8") as f:
+            names = [item["name"] for item in json.load(f)]
+        self.assertEqual(names, ["A", "B", "C", "D"])
+        self.assertEqual(storage.compact_store_week("kroger", "2025-W05"), 0)
+
+    def test_read_merges_pending_segments_without_writing(self):
+        self.write_week("heb", "2025-W06", [{"name": "Eggs"}])
+        storage.save_grocery_items([{"name": "Milk"}], "heb", "2025-W06")
+        expected = [self.keyed("heb", "2025-W06", {"name": "Eggs"}), self.keyed("heb", "2025-W06", {"name": "Milk"})]
+        with patch.object(storage, "_exclusive_lock") as lock:
+            self.assertEqual(storage.get_store_ads("heb", "2025-W06"), expected)
+            self.assertEqual(json.loads(storage.get_store_ads_json("heb", "2025-W06")), expected)
+        lock.assert_not_called()
+        self.assertEqual(len(self.segments("heb", "2025-W06")), 1)
+        with open(storage.get_json_file_path("heb", "2025-W06"), encoding="utf-8") as f:
+            self.assertEqual(json.load(f), [{"name": "Eggs"}])
+
+        # another process compacting is picked up from the segments folder's mtime
+        storage.compact_store_week("heb", "2025-W06")
+        self.assertEqual(storage.get_store_ads("heb", "2025-W06"), expected)
+
+    def test_segments_without_a_weekly_file_are_readable(self):
+        storage.save_grocery_items([{"name": "Milk"}], "heb", "2025-W06")
+        self.assertEqual(storage.get_store_ads("heb", "2025-W06"), [self.keyed("heb", "2025-W06", {"name": "Milk"})])
+        with self.assertRaises(FileNotFoundError):
+            storage.get_store_ads("heb", "2025-W07")
+
+    def test_temp_files_are_not_merged(self):
+        storage.save_grocery_items([{"name": "Kept"}], "heb", "2025-W06")
+        folder = storage.get_segments_folder("heb", "2025-W06")
+        with open(os.path.join(folder, "partial.jsonl.123.tmp"), "w") as f:
+            f.write('{"name": "Trunc')
+        self.assertEqual(storage.get_store_ads("heb", "2025-W06"), [self.keyed("heb", "2025-W06", {"name": "Kept"})])
+
+    def test_concurrent_saves_lose_nothing(self):
+        def crawl(worker):
+            for batch in range(10):
+                storage.save_grocery_items(
+                    [{"name": f"w{worker}-b{batch}-{i}"} for i in range(3)],
+                    "kroger",
+                    "2025-W07",
+                )
+                if batch % 3 == 0:
+                    storage.compact_store_week("kroger", "2025-W07")
+
+        threads = [threading.Thread(target=crawl, args=(w,)) for w in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        items = storage.get_store_ads("kroger", "2025-W07")
+        self.assertEqual(len(items), 4 * 10 * 3)
+        self.assertEqual(len({item["name"] for item in items}), 4 * 10 * 3)
+
+    def test_remove_items_compacts_first(self):
+        self.write_week("kroger", "2025-W09", [{"name": "A"}, {"name": "B"}])
+        storage.save_grocery_items([{"name": "C"}], "kroger", "2025-W09")
+        self.assertEqual(storage.get_store_ads("kroger", "2025-W09")[-1]["name"], "C")
+        storage.save_grocery_items([{"name": "D"}], "kroger", "2025-W09")
+
+        removed = storage.remove_grocery_items("kroger", "2025-W09", lambda item: item["name"] in ("B", "D"))
+
+        self.assertEqual(removed, 2)
+        self.assertEqual([item["name"] for item in storage.get_store_ads("kroger", "2025-W09")], ["A", "C"])
+        self.assertEqual(storage.remove_grocery_items("heb", "2025-W09", lambda item: True), 0)
+
+    def test_repeated_saves_are_upserts(self):
+        milk = {"name": "Milk", "price": "$2.99", "image_digest": "abc"}
+        storage.save_grocery_items([milk, {"name": "Eggs", "price": "$1"}], "kroger", "2025-W10")
+        self.assertEqual(storage.compact_store_week("kroger", "2025-W10"), 2)
+        # a retry of the same batch, with a field that changed since
+        storage.save_grocery_items([{**milk, "name": " milk ", "in_stock": False}], "kroger", "2025-W10")
+        storage.save_grocery_items([{**milk, "image_digest": "def"}], "kroger", "2025-W10")
+
+        items = storage.get_store_ads("kroger", "2025-W10")
+
+        self.assertEqual([(i["name"], i.get("image_digest")) for i in items],
+                         [(" milk ", "abc"), ("Eggs", None), ("Milk", "def")])
+        self.assertFalse(items[0]["in_stock"])
+        self.assertEqual(len({i["item_key"] for i in items}), 3)
+
+    def test_dedupe_drops_repeats_saved_before_keys(self):
+        self.write_week("heb", "2025-W11", [{"name": "A", "price": "$1"}, {"name": "a", "price": "$1 "},
+                                            {"name": "B", "price": "$2"}])
+        storage.save_grocery_items([{"name": "B", "price": "$2"}], "heb", "2025-W11")
+        self.write_week("kroger", "2025-W11", [{"name": "C"}, {"name": "C"}])
+
+        self.assertEqual(storage.dedupe_store_week("heb", "2025-W11"), 2)
+        self.assertEqual(self.segments("heb", "2025-W11"), [])
+        self.assertEqual([i["name"] for i in storage.get_store_ads("heb", "2025-W11")], ["a", "B"])
+        self.assertEqual(storage.dedupe_all(), 1)
+        self.assertEqual(storage.dedupe_all(), 0)
+
+    def test_msvcrt_lock_retries_only_contention_and_gives_up(self):
+        lock_path = os.path.join(self.tmpdir.name, "weekly_ad.lock")
+
+        def lock_with(*errors):
+            msvcrt = MagicMock(LK_LOCK=1, LK_UNLCK=0)
+            msvcrt.locking.side_effect = [OSError(e, os.strerror(e)) for e in errors] + [None] * 2
+            with patch.object(storage, "fcntl", None), patch.object(storage, "msvcrt", msvcrt, create=True):
+                with storage._exclusive_lock(lock_path):
+                    pass
+            return msvcrt.locking.call_count
+
+        # two timed-out LK_LOCK waits, then the lock and the unlock
+        self.assertEqual(lock_with(errno.EDEADLK, errno.EACCES), 4)
+        with self.assertRaises(OSError) as raised:
+            lock_with(errno.EBADF)
+        self.assertEqual(raised.exception.errno, errno.EBADF)
+        with self.assertRaises(TimeoutError):
+            lock_with(*[errno.EDEADLK] * storage.MSVCRT_LOCK_ATTEMPTS)
+
+    def test_compact_all(self):
+        storage.save_grocery_items([{"name": "A"}], "kroger", "2025-W08")
+        storage.save_grocery_items([{"name": "B"}], "heb", "2025-W08")
+        self.assertEqual(storage.compact_all(), 2)
+        self.assertEqual(storage.compact_all(), 0)
+
+
+class TestWeeklyAdFromFileAPI(WeeklyAdCacheTestCase):
+    def test_get_weekly_ad_from_file_success(self):
+        items = [{"name": "Bananas", "price": "$0.59", "image": "Bananas.png"}]
+        self.write_week("kroger", "2025-W01", items)
+        response = client.get("/weeklyadfromfile/?storename=kroger&week=2025-W01")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["content-type"], "application/json")
+        self.assertEqual(response.json(), items)
+
+    def test_get_weekly_ad_from_file_not_found(self):
+        response = client.get("/weeklyadfromfile/?storename=kroger&week=1999-W01")
+        self.assertEqual(response.status_code, 404)
+
+    def test_stats_endpoint(self):
+        self.write_week("kroger", "2025-W01", [])
+        client.get("/weeklyadfromfile/?storename=kroger&week=2025-W01")
+        client.get("/weeklyadfromfile/?storename=kroger&week=2025-W01")
+        stats = client.get("/stats/").json()["weekly_ad_cache"]
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import unittest
+from html.parser import HTMLParser
+from pathlib import Path
+
+from crawler.tomthumb_buttons import group_buttons_by_flyer, read_flyer_buttons
+
+SNAPSHOT = Path(__file__).resolve().parents[1] / "crawler" / "tomthumb.html"
+
+
+class _SnapshotParser(HTMLParser):
+    """Build the read_flyer_buttons() result for a saved page without a browser."""
+
+    def __init__(self):
+        super().__init__()
+        self.flyers = []
+        self.buttons = []
+        self._open_flyers = []
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "sfml-flyer-image":
+            index = len(self.flyers)
+            self.flyers.append({"index": index, "id": attrs.get("sfml-anchor-id") or attrs.get("id") or None})
+            self._open_flyers.append(index)
+        elif tag == "button" and "data-product-id" in attrs:
+            self.buttons.append({
+                "index": len(self.buttons),
+                "flyer_index": self._open_flyers[-1] if self._open_flyers else None,
+                "product_id": attrs["data-product-id"],
+                "global_id": attrs.get("data-global-id"),
+                "label": attrs.get("aria-label") or attrs.get("label") or "",
+            })
+
+    def handle_endtag(self, tag):
+        if tag == "sfml-flyer-image" and self._open_flyers:
+            self._open_flyers.pop()
+
+
+def parse_snapshot() -> dict:
+    parser = _SnapshotParser()
+    parser.feed(SNAPSHOT.read_text(encoding="utf-8"))
+    return {"flyers": parser.flyers, "buttons": parser.buttons}
+
+
+class TestGroupButtonsByFlyer(unittest.TestCase):
+    def test_groups_saved_snapshot(self):
+        snapshot = parse_snapshot()
+        groups = group_buttons_by_flyer(snapshot)
+
+        grouped = [i for indices in groups.values() for i in indices]
+        in_flyers = [b["index"] for b in snapshot["buttons"] if b["flyer_index"] is not None]
+        self.assertEqual(sorted(grouped), in_flyers)
+        self.assertGreater(len(groups), 1)
+        self.assertEqual(len(grouped), len(set(grouped)))
+        for flyer_id, indices in groups.items():
+            self.assertEqual(indices, sorted(indices))
+            flyer_ids = {
+                snapshot["flyers"][snapshot["buttons"][i]["flyer_index"]]["id"] for i in indices
+            }
+            self.assertEqual(flyer_ids, {flyer_id})
+
+    def test_unnamed_flyers_and_orphan_buttons(self):
+        snapshot = {
+            "flyers": [{"index": 0, "id": None}, {"index": 1, "id": "7"}, {"index": 2, "id": None}],
+            "buttons": [
+                {"index": 0, "flyer_index": 1},
+                {"index": 1, "flyer_index": None},
+                {"index": 2, "flyer_index": 0},
+                {"index": 3, "flyer_index": 1},
+            ],
+        }
+        self.assertEqual(group_buttons_by_flyer(snapshot), {"7": [0, 3], "flyer-0": [2]})
+
+
+class TestReadFlyerButtons(unittest.TestCase):
+    def test_single_evaluate_matches_snapshot(self):
+        try:
+            from playwright.sync_api import sync_playwright
+        except ImportError:
+            self.skipTest("Playwright is not installed")
+        with sync_playwright() as p:
+            try:
+                browser = p.chromium.launch()
+            except Exception as e:
+                self.skipTest(f"Chromium is not available: {e}")
+            try:
+                page = browser.new_page()
+                # Block the snapshot's external scripts and styles; only the markup matters.
+                page.route("**/*", lambda route: route.abort())
+                page.set_content(SNAPSHOT.read_text(encoding="utf-8"), wait_until="domcontentloaded")
+                self.assertEqual(read_flyer_buttons(page.main_frame), parse_snapshot())
+            finally:
+                browser.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+import unittest
+
+from crawler.tomthumb_network import (
+    FlyerResponseCollector,
+    format_price,
+    is_flyer_data_url,
+    iter_item_records,
+    parse_flyer_item,
+)
+
+CHICKEN = {
+    "id": 981309976,
+    "name": "Boneless Skinless Chicken Breasts or Thighs",
+    "price_text": "1.97",
+    "post_price_text": "lb",
+    "image_url": "https://f.wishabi.net/page_items/1/small.jpg",
+    "cutout_image_url": "https://f.wishabi.net/page_items/1/cutout.jpg",
+}
+AVOCADO = {
+    "id": 981309985,
+    "name": "Large Avocados or Mangos",
+    "pre_price_text": "2 for",
+    "price_text": "5",
+    "image_url": "https://f.wishabi.net/page_items/2/small.jpg",
+}
+
+
+class _Response:
+    def __init__(self, url, payload, content_type="application/json; charset=utf-8"):
+        self.url = url
+        self.headers = {"content-type": content_type}
+        self._payload = payload
+
+    def json(self):
+        if isinstance(self._payload, Exception):
+            raise self._payload
+        return self._payload
+
+
+class TestParsing(unittest.TestCase):
+    def test_flyer_data_urls(self):
+        self.assertTrue(is_flyer_data_url(
+            "https://dam.flippenterprise.net/flyerkit/publication/7684262/products?display_type=all"))
+        self.assertTrue(is_flyer_data_url("https://backflipp.flipp.com/flyer_items/1"))
+        self.assertFalse(is_flyer_data_url("https://cdn.flippenterprise.net/flyers/7684262/a.jpg"))
+        self.assertFalse(is_flyer_data_url("https://www.tomthumb.com/products/1"))
+
+    def test_item_records_in_lists_and_envelopes(self):
+        self.assertEqual(list(iter_item_records([CHICKEN, "x"])), [CHICKEN])
+        self.assertEqual(list(iter_item_records({"items": [AVOCADO]})), [AVOCADO])
+        self.assertEqual(list(iter_item_records({"meta": {}})), [])
+
+    def test_price_and_item(self):
+        self.assertEqual(format_price(AVOCADO), "2 for $5")
+        self.assertEqual(format_price({"sale_story": "BOGO"}), "BOGO")
+        self.assertEqual(parse_flyer_item(CHICKEN), {
+            "id": "981309976",
+            "name": "Boneless Skinless Chicken Breasts or Thighs",
+            "price": "$1.97 lb",
+            "image_url": "https://f.wishabi.net/page_items/1/cutout.jpg",
+        })
+        self.assertIsNone(parse_flyer_item({"id": 1, "name": " "}))
+
+
+class TestFlyerResponseCollector(unittest.TestCase):
+    def test_collects_flyer_json_only(self):
+        collector = FlyerResponseCollector()
+        url = "https://dam.flippenterprise.net/flyerkit/publication/1/products"
+        collector.handle_response(_Response(url, [CHICKEN]))
+        collector.handle_response(_Response(url, {"items": [CHICKEN, AVOCADO]}))
+        collector.handle_response(_Response(url, ValueError("no body")))
+        collector.handle_response(_Response(url, [{"id": 5, "name": "Page"}], "text/html"))
+        collector.handle_response(_Response("https://www.tomthumb.com/api/x", [{"id": 6, "name": "X"}]))
+
+        self.assertEqual(collector.responses, 2)
+        self.assertEqual(list(collector.products), ["981309976", "981309985"])
+        self.assertEqual(collector.products["981309985"]["price"], "2 for $5")
+
+    def test_browser_responses_are_captured(self):
+        try:
+            from playwright.sync_api import sync_playwright
+        except ImportError:
+            self.skipTest("Playwright is not installed")
+        import json
+
+        url = "https://dam.flippenterprise.net/flyerkit/publication/1/products"
+        with sync_playwright() as p:
+            try:
+                browser = p.chromium.launch()
+            except Exception as e:
+                self.skipTest(f"Chromium is not available: {e}")
+            try:
+                page = browser.new_page()
+                page.route(url, lambda route: route.fulfill(
+                    content_type="application/json", body=json.dumps([CHICKEN, AVOCADO])))
+                page.route("https://www.tomthumb.com/weeklyad", lambda route: route.fulfill(
+                    content_type="text/html", body=f"<script>fetch({json.dumps(url)})</script>"))
+                collector = FlyerResponseCollector().attach(page)
+                page.goto("https://www.tomthumb.com/weeklyad")
+                products = collector.wait_for_products(page, timeout=5000, settle=200)
+                self.assertEqual(set(products), {"981309976", "981309985"})
+            finally:
+                browser.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
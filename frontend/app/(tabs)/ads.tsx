@@ -13,7 +13,7 @@ import {
 
 import { ThemedText } from "@/components/ThemedText";
 import { ThemedView } from "@/components/ThemedView";
-import { get_image, get_store_ads } from "../utility";
+import { get_blob_image, get_image, get_store_ads } from "../utility";
 
 type Ad = {
   product: string;
@@ -21,6 +21,7 @@ type Ad = {
   image_base64?: string | null;
   image_uri?: string | null;
   image_filename?: string | null;
+  image_blurhash?: string | null;
   store?: string;
   date?: string; // YYYY-MM-DD
 };
@@ -67,6 +68,13 @@ export default function AdsScreen() {
                 store: s,
                 date: d.date ?? undefined,
               } as Ad;
+              if (d.image_digest) {
+                // Cards are small, so fetch the thumbnail variant, not the full montage.
+                ad.image_uri = get_blob_image(d.image_digest, "thumb");
+                ad.image_blurhash = d.image_meta?.blurhash ?? null;
+                annotated.push(ad);
+                continue;
+              }
               const imageVal = (d.image ||
                 d.image_filename ||
                 d.image_file ||
@@ -149,7 +157,14 @@ export default function AdsScreen() {
     return (
       <View style={styles.adItem}>
         {uri ? (
-          <Image source={{ uri }} style={styles.adImage} contentFit="cover" />
+          <Image
+            source={{ uri }}
+            // Painted from the item metadata right away; the image fades in over it.
+            placeholder={item.image_blurhash ? { blurhash: item.image_blurhash } : undefined}
+            transition={150}
+            style={styles.adImage}
+            contentFit="cover"
+          />
         ) : (
           <View style={[styles.adImage, styles.noImage]}>
             <Text>No image</Text>
@@ -2,25 +2,6 @@ const API_BASE = process.env.EXPO_PUBLIC_API_BASE || 'http://localhost:8000';
 
 
 
-function extToMime(filename: string): string {
-  const ext = filename.split('.').pop()?.toLowerCase() || '';
-  switch (ext) {
-    case 'jpg':
-    case 'jpeg':
-      return 'image/jpeg';
-    case 'png':
-      return 'image/png';
-    case 'gif':
-      return 'image/gif';
-    case 'webp':
-      return 'image/webp';
-    case 'svg':
-      return 'image/svg+xml';
-    default:
-      return 'application/octet-stream';
-  }
-}
-
 /**
  * Fetch weekly ad JSON from the FastAPI endpoint.
  * @param storename - store identifier (query param `storename`)
@@ -44,7 +25,9 @@ export async function get_store_ads(storename: string, week: string): Promise<an
 }
 
 /**
- * Fetch image bytes (base64) from the FastAPI endpoint and return a data URI.
+ * Build the URL of an ad image served as raw bytes by the FastAPI endpoint.
+ * The server sends ETag / Cache-Control headers, so the image component can
+ * cache and revalidate it instead of decoding a base64 data URI.
  * @param storename - store identifier
  * @param week - week date string in YYYY-MM-DD
  * @param imageFilename - filename of the image
@@ -54,20 +37,23 @@ export async function get_image(storename: string, week: string, imageFilename:
   if (!week) throw new Error('week is required');
   if (!imageFilename) throw new Error('imageFilename is required');
 
-  const url = `${API_BASE}/getimagebytes/?storename=${encodeURIComponent(storename)}&week=${encodeURIComponent(week)}&image_filename=${encodeURIComponent(imageFilename)}`;
-  const res = await fetch(url);
-  if (!res.ok) {
-    const body = await res.text();
-    throw new Error(`Failed to fetch image bytes: ${res.status} ${body}`);
-  }
-  const json = await res.json();
-  const b64 = json?.image_bytes;
-  if (!b64) throw new Error('No image_bytes returned from server');
-  const mime = extToMime(imageFilename);
-  return `data:${mime};base64,${b64}`;
+  return `${API_BASE}/image/?storename=${encodeURIComponent(storename)}&week=${encodeURIComponent(week)}&image_filename=${encodeURIComponent(imageFilename)}`;
+}
+
+/**
+ * Build the URL of an image in the server's content-addressed blob store.
+ * A digest always names the same bytes, so the response is cached forever.
+ * @param digest - SHA-256 hex digest from an ad's `image_digest`
+ * @param size - optional resized WebP variant ('thumb' or 'medium')
+ */
+export function get_blob_image(digest: string, size?: 'thumb' | 'medium'): string {
+  if (!digest) throw new Error('digest is required');
+  const query = size ? `?size=${size}` : '';
+  return `${API_BASE}/blob/${encodeURIComponent(digest)}${query}`;
 }
 
 export default {
   get_store_ads,
   get_image,
+  get_blob_image,
 };